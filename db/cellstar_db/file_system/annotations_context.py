@@ -5,26 +5,30 @@ from cellstar_db.models import AnnotationsMetadata, DescriptionData, EntryId, Se
 from cellstar_preprocessor.flows.common import save_dict_to_json_file
 
 class AnnnotationsEditContext:
-    async def update_annotations_json(self, annotations_json: AnnotationsMetadata):
+    def _save(self, annotations_json: AnnotationsMetadata):
         path = self.db._path_to_object(namespace=self.namespace, key=self.key)
         save_dict_to_json_file(annotations_json, ANNOTATION_METADATA_FILENAME, path)
+        self.db.invalidate_annotations(namespace=self.namespace, key=self.key)
+        self.db.update_keyword_index(namespace=self.namespace, key=self.key)
+
+    async def update_annotations_json(self, annotations_json: AnnotationsMetadata):
+        self._save(annotations_json)
 
     async def remove_descriptions(self, ids: list[str]):
         # 1. read annotations.json file using existing read_annotations function to AnnotationsMetadata TypedDict in d variable
-        d = await self.db.read_annotations(namespace=self.namespace, key=self.key)
+        d = await self.db.read_annotations(namespace=self.namespace, key=self.key, cached=False)
         # 2. for id in ids, if id exists in annotations.description.keys()
         for id in ids:
             if id in d["descriptions"].keys():
         # 3. remove that key from d variable
                 del d["descriptions"][id]
         # 4. write d back to annotations.json
-        path = self.db._path_to_object(namespace=self.namespace, key=self.key)
-        save_dict_to_json_file(d, ANNOTATION_METADATA_FILENAME, path)
+        self._save(d)
         
         
     async def add_or_modify_descriptions(self, xs: list[DescriptionData]):
         # 1. read annotations.json file using existing read_annotations function to AnnotationsMetadata TypedDict in d variable
-        d = await self.db.read_annotations(namespace=self.namespace, key=self.key)
+        d = await self.db.read_annotations(namespace=self.namespace, key=self.key, cached=False)
         # 2. loop over xs:
         for x in xs:
         # 2. if 'id' in x:    
@@ -63,25 +67,23 @@ class AnnnotationsEditContext:
             else:
                 d['descriptions'][descr_id] = x
         # 4. write d back to annotations.json
-        path = self.db._path_to_object(namespace=self.namespace, key=self.key)
-        save_dict_to_json_file(d, ANNOTATION_METADATA_FILENAME, path)
+        self._save(d)
 
     async def remove_segment_annotations(self, ids: list[str]):
         '''
         Removes (segment) annotations by annotation ids.
         '''
          # 1. read annotations.json file using existing read_annotations function to AnnotationsMetadata TypedDict in d variable
-        d = await self.db.read_annotations(namespace=self.namespace, key=self.key)
+        d = await self.db.read_annotations(namespace=self.namespace, key=self.key, cached=False)
         # filter annotations list to leave only those which id is not in ids
         old_annotations_list: list[SegmentAnnotationData] = d['segment_annotations']
         new_annotations_list = list(filter(lambda a: a['id'] not in ids, old_annotations_list))
         d['segment_annotations'] = new_annotations_list
-        path = self.db._path_to_object(namespace=self.namespace, key=self.key)
-        save_dict_to_json_file(d, ANNOTATION_METADATA_FILENAME, path)
+        self._save(d)
 
     async def add_or_modify_segment_annotations(self, xs: list[SegmentAnnotationData]):
         # 1. read annotations.json file using existing read_annotations function to AnnotationsMetadata TypedDict in d variable
-        d = await self.db.read_annotations(namespace=self.namespace, key=self.key)
+        d = await self.db.read_annotations(namespace=self.namespace, key=self.key, cached=False)
         # 2. loop over xs:
         for x in xs:
         # 2. if 'id' in x:    
@@ -105,8 +107,7 @@ class AnnnotationsEditContext:
                 d['segment_annotations'].append(x)
                 print(f'Annotation with id {annotation_id} was added')
 
-        path = self.db._path_to_object(namespace=self.namespace, key=self.key)
-        save_dict_to_json_file(d, ANNOTATION_METADATA_FILENAME, path)
+        self._save(d)
     
     def __enter__(self):
         return self
@@ -0,0 +1,200 @@
+import itertools
+import threading
+from collections import OrderedDict
+from typing import Hashable, Optional, Tuple
+
+import numpy as np
+import zarr
+
+DEFAULT_CHUNK_CACHE_SIZE_BYTES = 512 * 1024**2
+
+# (entry, array path, chunk index)
+ChunkKey = Tuple[Hashable, str, Tuple[int, ...]]
+
+
+class ChunkCache:
+    """
+    Process-wide LRU cache of decompressed zarr chunks with a memory budget in bytes.
+    Cached chunks are read-only numpy arrays
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_CHUNK_CACHE_SIZE_BYTES):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._chunks: OrderedDict[ChunkKey, np.ndarray] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: ChunkKey) -> Optional[np.ndarray]:
+        with self._lock:
+            chunk = self._chunks.get(key)
+            if chunk is None:
+                self.misses += 1
+                return None
+            self._chunks.move_to_end(key)
+            self.hits += 1
+            return chunk
+
+    def put(self, key: ChunkKey, chunk: np.ndarray):
+        if chunk.nbytes > self.max_bytes:
+            return
+        chunk.flags.writeable = False
+        with self._lock:
+            previous = self._chunks.pop(key, None)
+            if previous is not None:
+                self.current_bytes -= previous.nbytes
+            self._chunks[key] = chunk
+            self.current_bytes += chunk.nbytes
+            while self.current_bytes > self.max_bytes:
+                _, evicted = self._chunks.popitem(last=False)
+                self.current_bytes -= evicted.nbytes
+                self.evictions += 1
+
+    def __contains__(self, key: ChunkKey) -> bool:
+        # NOTE: does not count as hit or miss and does not change LRU order
+        with self._lock:
+            return key in self._chunks
+
+    def resize(self, max_bytes: int):
+        with self._lock:
+            self.max_bytes = max_bytes
+            while self.current_bytes > self.max_bytes and self._chunks:
+                _, evicted = self._chunks.popitem(last=False)
+                self.current_bytes -= evicted.nbytes
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._chunks.clear()
+            self.current_bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "max_bytes": self.max_bytes,
+                "current_bytes": self.current_bytes,
+                "chunks": len(self._chunks),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+    def __len__(self):
+        return len(self._chunks)
+
+
+_chunk_cache = ChunkCache()
+
+
+def get_chunk_cache() -> ChunkCache:
+    return _chunk_cache
+
+
+def configure_chunk_cache(max_bytes: int):
+    _chunk_cache.resize(max_bytes)
+
+
+class CachedChunkArray:
+    """
+    Read-only view of 3d zarr array which reads whole chunks through the chunk cache.
+    Supports basic selection with slices, so it can be sliced directly or wrapped by dask
+    """
+
+    def __init__(self, arr: zarr.core.Array, entry: Hashable, cache: Optional[ChunkCache] = None):
+        self.arr = arr
+        self.entry = entry
+        self.cache = cache if cache is not None else get_chunk_cache()
+        self.shape = arr.shape
+        self.dtype = arr.dtype
+        self.chunks = arr.chunks
+        self.ndim = arr.ndim
+        self.attrs = arr.attrs
+        self.path = arr.path
+
+    def __dask_tokenize__(self):
+        return (self.entry, self.path)
+
+    def read_chunk(self, chunk_coords: Tuple[int, ...]) -> np.ndarray:
+        """
+        Returns decoded chunk (always of full chunk shape, as stored by zarr)
+        """
+        key: ChunkKey = (self.entry, self.path, chunk_coords)
+        chunk = self.cache.get(key)
+        if chunk is not None:
+            return chunk
+
+        try:
+            # NOTE: private zarr Array methods (key of chunk in store, decompression + filters + reshape),
+            # checked against zarr==2.11.1 pinned in environment.yaml, check them when updating the pin
+            cdata = self.arr.chunk_store[self.arr._chunk_key(chunk_coords)]
+            chunk = self.arr._decode_chunk(cdata)
+        except KeyError:
+            # chunk was never written
+            fill_value = self.arr.fill_value if self.arr.fill_value is not None else 0
+            chunk = np.full(self.chunks, fill_value, dtype=self.dtype)
+
+        self.cache.put(key, chunk)
+        return chunk
+
+    def is_cached(self, chunk_coords: Tuple[int, ...]) -> bool:
+        return (self.entry, self.path, chunk_coords) in self.cache
+
+    def chunk_ranges(self, selection: Tuple[slice, ...]) -> list[range]:
+        """
+        Returns range of chunk indices intersecting the selection for each dimension
+        """
+        return [
+            range(s.start // c, (s.stop - 1) // c + 1) if s.stop > s.start else range(0)
+            for s, c in zip(selection, self.chunks)
+        ]
+
+    def copy_chunk_to(
+        self,
+        out: np.ndarray,
+        selection: Tuple[slice, ...],
+        chunk_coords: Tuple[int, ...],
+        chunk: Optional[np.ndarray] = None,
+    ):
+        """
+        Copies part of the chunk intersecting the selection into corresponding part of out.
+        Chunk is read if not provided
+        """
+        if chunk is None:
+            chunk = self.read_chunk(chunk_coords)
+        chunk_slices = []
+        out_slices = []
+        for s, c, ci in zip(selection, self.chunks, chunk_coords):
+            chunk_start = ci * c
+            start = max(s.start, chunk_start)
+            stop = min(s.stop, chunk_start + c)
+            chunk_slices.append(slice(start - chunk_start, stop - chunk_start))
+            out_slices.append(slice(start - s.start, stop - s.start))
+        out[tuple(out_slices)] = chunk[tuple(chunk_slices)]
+
+    def get_basic_selection(self, selection) -> np.ndarray:
+        selection = self._normalize_selection(selection)
+        out = np.empty(tuple(s.stop - s.start for s in selection), dtype=self.dtype)
+        for chunk_coords in itertools.product(*self.chunk_ranges(selection)):
+            self.copy_chunk_to(out, selection, chunk_coords)
+        return out
+
+    def __getitem__(self, selection) -> np.ndarray:
+        return self.get_basic_selection(selection)
+
+    def _normalize_selection(self, selection) -> Tuple[slice, ...]:
+        if not isinstance(selection, tuple):
+            selection = (selection,)
+        if any(s is Ellipsis for s in selection):
+            raise IndexError("Ellipsis is not supported")
+        selection = selection + (slice(None),) * (self.ndim - len(selection))
+        normalized = []
+        for s, dim in zip(selection, self.shape):
+            if not isinstance(s, slice):
+                raise IndexError(f"only slices are supported, got {s}")
+            start, stop, step = s.indices(dim)
+            if step != 1:
+                raise IndexError(f"only step 1 is supported, got {step}")
+            normalized.append(slice(start, max(start, stop)))
+        return tuple(normalized)
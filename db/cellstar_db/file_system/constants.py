@@ -1,6 +1,10 @@
 QUANTIZATION_DATA_DICT_ATTR_NAME = "quantization_data_dict"
 LATTICE_SEGMENTATION_DATA_GROUPNAME = "lattice_segmentation_data"
 MESH_SEGMENTATION_DATA_GROUPNAME = "mesh_segmentation_data"
+# all meshes of a detail lvl group concatenated into one array per component (pack_vertices etc.)
+MESH_PACK_ARRAYNAME_PREFIX = "pack_"
+MESH_PACK_OFFSETS_ARRAYNAME = "pack_offsets"
+MESH_PACK_COMPONENTS = ("vertices", "triangles", "normals")
 VOLUME_DATA_GROUPNAME = "volume_data"
 
 # TODO: the namespaces should NOT be hardcoded
@@ -12,4 +16,12 @@ ZIP_STORE_DATA_ZIP_NAME = "data.zip"
 ANNOTATION_METADATA_FILENAME = "annotations.json"
 GRID_METADATA_FILENAME = "metadata.json"
 GEOMETRIC_SEGMENTATION_FILENAME = "geometric_segmentation.json"
+# primitives of geometric_segmentation.json split by segmentation and timeframe: <dirname>/<segmentation_id>/<time>.json
+GEOMETRIC_SEGMENTATION_DIRNAME = "geometric_segmentation"
+# key of version of primitives in <time>.json and in its <time>.index.json, the index is used only for the same version
+GEOMETRIC_SEGMENTATION_VERSION_KEY = "primitives_version"
+# inverted index of entry ids and annotation text for keyword search, in the DB folder
+KEYWORD_INDEX_FILENAME = "keyword_index.json"
+# serialized responses rendered at preprocessing time, named by hash of the response key
+BAKED_RESPONSES_DIRNAME = "baked_responses"
 GEOMETRIC_SEGMENTATIONS_ZATTRS = 'geometric_segmentations'
@@ -1,24 +1,33 @@
+import asyncio
 import json
 import os
 import shutil
+import threading
 from argparse import ArgumentError
 from pathlib import Path
 from sys import stdout
-from typing import Dict
+from typing import Dict, Optional
+from urllib.parse import quote
 from cellstar_db.file_system.annotations_context import AnnnotationsEditContext
 
 import zarr
 
 from cellstar_db.file_system.constants import (
     ANNOTATION_METADATA_FILENAME,
+    BAKED_RESPONSES_DIRNAME,
     DB_NAMESPACES,
+    GEOMETRIC_SEGMENTATION_DIRNAME,
     GEOMETRIC_SEGMENTATION_FILENAME,
     GRID_METADATA_FILENAME,
+    KEYWORD_INDEX_FILENAME,
     VOLUME_DATA_GROUPNAME,
     ZIP_STORE_DATA_ZIP_NAME,
 )
+from cellstar_db.file_system.file_cache import DEFAULT_MAX_CACHED_FILES, ParsedFileCache
+from cellstar_db.file_system.keyword_index import KeywordIndex, entry_tokens, locked_keyword_index, modify_keyword_index
 from cellstar_db.file_system.models import FileSystemVolumeMedatada
 from cellstar_db.file_system.read_context import FileSystemDBReadContext
+from cellstar_db.file_system.store_pool import DEFAULT_MAX_OPEN_FILES, StorePool
 from cellstar_db.models import AnnotationsMetadata, Metadata, VolumeMetadata
 from cellstar_db.protocol import DBReadContext, VolumeServerDB
 from cellstar_db.file_system.volume_and_segmentation_context import VolumeAndSegmentationContext
@@ -26,6 +35,9 @@ from cellstar_db.file_system.volume_and_segmentation_context import VolumeAndSeg
 
 class FileSystemVolumeServerDB(VolumeServerDB):
     async def list_sources(self) -> list[str]:
+        return self._list_sources()
+
+    def _list_sources(self) -> list[str]:
         sources: list[str] = []
         for file in os.listdir(self.folder):
             d = os.path.join(self.folder, file)
@@ -52,7 +64,13 @@ class FileSystemVolumeServerDB(VolumeServerDB):
 
         return entries
 
-    def __init__(self, folder: Path, store_type: str = "zip"):
+    def __init__(
+        self,
+        folder: Path,
+        store_type: str = "zip",
+        max_open_files: int = DEFAULT_MAX_OPEN_FILES,
+        max_cached_files: int = DEFAULT_MAX_CACHED_FILES,
+    ):
         # either create of say it doesn't exist
         if not folder.is_dir():
             folder.mkdir(parents=True, exist_ok=True)
@@ -68,6 +86,11 @@ class FileSystemVolumeServerDB(VolumeServerDB):
             raise ArgumentError(f"store type is not supported: {store_type}")
 
         self.store_type = store_type
+        # open read-only stores shared by read contexts
+        self.store_pool = StorePool(store_type=store_type, max_open_files=max_open_files)
+        # parsed metadata.json and annotations.json files
+        self.file_cache = ParsedFileCache(max_files=max_cached_files)
+        self._keyword_index_lock = threading.Lock()
 
     def _path_to_object(self, namespace: str, key: str) -> Path:
         """
@@ -75,6 +98,23 @@ class FileSystemVolumeServerDB(VolumeServerDB):
         """
         return self.folder / namespace / key
 
+    def path_to_geometric_segmentation(self, namespace: str, key: str, segmentation_id: str, time: int) -> Path:
+        """
+        Returns path to file with shape primitives of one timeframe of geometric segmentation
+        """
+        return (
+            self._path_to_object(namespace=namespace, key=key)
+            / GEOMETRIC_SEGMENTATION_DIRNAME
+            / quote(segmentation_id, safe="")
+            / f"{time}.json"
+        )
+
+    def path_to_geometric_segmentation_index(self, namespace: str, key: str, segmentation_id: str, time: int) -> Path:
+        """
+        Returns path to spatial index (see build_primitive_index) of one timeframe of geometric segmentation
+        """
+        return self.path_to_geometric_segmentation(namespace, key, segmentation_id, time).with_suffix(".index.json")
+
     def path_to_zarr_root_data(self, namespace: str, key: str) -> Path:
         """
         Returns path to actual zarr structure root depending on store type
@@ -100,10 +140,13 @@ class FileSystemVolumeServerDB(VolumeServerDB):
         Removes entry
         """
         path = self._path_to_object(namespace=namespace, key=key)
+        self.store_pool.invalidate(namespace, key)
+        self.file_cache.invalidate_dir(path)
         if path.is_dir():
             shutil.rmtree(path, ignore_errors=True)
         else:
             raise Exception(f"Entry path {path} does not exists or is not a dir")
+        self.remove_from_keyword_index(namespace, key)
 
     def remove_all_entries(self):
         """
@@ -114,10 +157,14 @@ class FileSystemVolumeServerDB(VolumeServerDB):
         for namespace in DB_NAMESPACES:
             content = sorted((self.folder / namespace).glob("*"))
             for path in content:
+                self.store_pool.invalidate(namespace, path.name)
+                self.file_cache.invalidate_dir(path)
                 if path.is_file():
                     path.unlink()
                 if path.is_dir():
                     shutil.rmtree(path, ignore_errors=True)
+        with locked_keyword_index(self.folder / KEYWORD_INDEX_FILENAME, self._keyword_index_lock):
+            (self.folder / KEYWORD_INDEX_FILENAME).unlink(missing_ok=True)
     
     async def add_custom_annotations(self, namespace: str, key: str, temp_store_path: Path) -> bool:
         """
@@ -133,11 +180,13 @@ class FileSystemVolumeServerDB(VolumeServerDB):
         temp_store: zarr.storage.DirectoryStore = zarr.DirectoryStore(
             str(temp_store_path)
         )
+        self.invalidate_annotations(namespace, key)
         if (temp_store_path / ANNOTATION_METADATA_FILENAME).exists():
             shutil.copy2(
                 temp_store_path / ANNOTATION_METADATA_FILENAME,
                 self._path_to_object(namespace, key) / ANNOTATION_METADATA_FILENAME,
             )
+            self.update_keyword_index(namespace, key)
         else:
             print("no annotation metadata file found, continuing without copying it")
 
@@ -153,8 +202,10 @@ class FileSystemVolumeServerDB(VolumeServerDB):
             namespace=namespace,
             key=key
         )
+        self.update_keyword_index(namespace, key)
 
     def _store_entry_file(self, temp_store_path: Path, filename: str, namespace: str, key: str):
+        self.file_cache.invalidate(self._path_to_object(namespace, key) / filename)
         if (temp_store_path / filename).exists():
             shutil.copy2(
                 temp_store_path / filename,
@@ -190,6 +241,7 @@ class FileSystemVolumeServerDB(VolumeServerDB):
         # copy_store from temp store to perm zip store
 
         if self.store_type == "zip":
+            self.store_pool.invalidate(namespace, key)
             existing_store = zarr.ZipStore(
                 path=str(self.path_to_zarr_root_data(namespace, key)),
                 compression=0,
@@ -255,6 +307,7 @@ class FileSystemVolumeServerDB(VolumeServerDB):
         # WHAT NEEDS TO BE CHANGED
         # perm_store = zarr.ZipStore(self._path_to_object(namespace, key) + '.zip', mode='w', compression=12)
 
+        self.store_pool.invalidate(namespace, key)
         if self.store_type == "directory":
             perm_store = zarr.DirectoryStore(str(self._path_to_object(namespace, key)))
             zarr.copy_store(temp_store, perm_store) # , log=stdout)
@@ -301,17 +354,134 @@ class FileSystemVolumeServerDB(VolumeServerDB):
         path: Path = (
             self._path_to_object(namespace=namespace, key=key) / GRID_METADATA_FILENAME
         )
-        with open(path.resolve(), "r", encoding="utf-8") as f:
-            # reads into dict
-            read_json_of_metadata: Metadata = json.load(f)
-        return FileSystemVolumeMedatada(read_json_of_metadata)
+        return self.file_cache.get(path, _parse_metadata)
 
-    async def read_annotations(self, namespace: str, key: str) -> AnnotationsMetadata:
+    async def read_annotations(self, namespace: str, key: str, cached: bool = True) -> AnnotationsMetadata:
+        """
+        Returns annotations of the entry. Cached annotations are shared and must not be modified,
+        use cached=False to get a private copy (e.g. for editing)
+        """
         path: Path = (
             self._path_to_object(namespace=namespace, key=key)
             / ANNOTATION_METADATA_FILENAME
         )
-        with open(path.resolve(), "r", encoding="utf-8") as f:
-            # reads into dict
-            read_json_of_metadata: AnnotationsMetadata = json.load(f)
-        return read_json_of_metadata
+        if cached:
+            return self.file_cache.get(path, _read_json)
+        return _read_json(path)
+
+    async def data_version(self, namespace: str, key: str) -> str:
+        """
+        Returns string which changes whenever data (zarr store, metadata or geometric segmentation)
+        of the entry is modified, based on modification times and sizes of the files
+        """
+        entry_path = self._path_to_object(namespace=namespace, key=key)
+        paths = [
+            self.path_to_zarr_root_data(namespace=namespace, key=key),
+            entry_path / GRID_METADATA_FILENAME,
+            entry_path / GEOMETRIC_SEGMENTATION_FILENAME,
+        ]
+        parts = []
+        for path in paths:
+            try:
+                stat = os.stat(path)
+                parts.append(f"{stat.st_mtime_ns}-{stat.st_size}")
+            except FileNotFoundError:
+                parts.append("-")
+        return ".".join(parts)
+
+    async def read_baked_response(self, namespace: str, key: str, name: str) -> Optional[bytes]:
+        """
+        Returns response stored by store_baked_responses or None if there is no such response
+        """
+        path = self._path_to_object(namespace=namespace, key=key) / BAKED_RESPONSES_DIRNAME / name
+        # responses can be several MB, read off the event loop
+        return await asyncio.to_thread(_read_baked_response, path)
+
+    async def store_baked_responses(self, namespace: str, key: str, responses: Dict[str, bytes]):
+        """
+        Replaces all baked responses of the entry
+        """
+        path = self._path_to_object(namespace=namespace, key=key) / BAKED_RESPONSES_DIRNAME
+        if path.exists():
+            shutil.rmtree(path)
+        path.mkdir()
+        for name, data in responses.items():
+            (path / name).write_bytes(data)
+
+    def update_keyword_index(self, namespace: str, key: str):
+        """
+        Re-indexes entry id and annotations of the entry, to be called whenever annotations.json changes
+        """
+        annotations_path = self._path_to_object(namespace=namespace, key=key) / ANNOTATION_METADATA_FILENAME
+        annotations = _read_json(annotations_path) if annotations_path.exists() else None
+        tokens = entry_tokens(key, annotations)
+        modify_keyword_index(
+            self.folder / KEYWORD_INDEX_FILENAME,
+            lambda index: index.update_entry(namespace, key, tokens),
+            self._keyword_index_lock,
+            self._build_keyword_index,
+        )
+
+    def remove_from_keyword_index(self, namespace: str, key: str):
+        modify_keyword_index(
+            self.folder / KEYWORD_INDEX_FILENAME,
+            lambda index: index.update_entry(namespace, key, None),
+            self._keyword_index_lock,
+            self._build_keyword_index,
+        )
+
+    async def build_keyword_index(self):
+        """
+        Indexes all entries of the DB from scratch
+        """
+        path = self.folder / KEYWORD_INDEX_FILENAME
+        with locked_keyword_index(path, self._keyword_index_lock):
+            self._build_keyword_index().save(path)
+
+    def _build_keyword_index(self) -> KeywordIndex:
+        index = KeywordIndex.empty()
+        for namespace in self._list_sources():
+            for key in sorted(os.listdir(self.folder / namespace)):
+                entry_path = self._path_to_object(namespace=namespace, key=key)
+                if not entry_path.is_dir():
+                    continue
+                annotations_path = entry_path / ANNOTATION_METADATA_FILENAME
+                annotations = _read_json(annotations_path) if annotations_path.exists() else None
+                index.update_entry(namespace, key, entry_tokens(key, annotations))
+        return index
+
+    async def search_entries(self, namespace: str, keyword: str) -> list[str]:
+        """
+        Returns keys of entries of the namespace matching keyword, the best matching first.
+        The index is built on first search if the DB does not have one
+        """
+        path = self.folder / KEYWORD_INDEX_FILENAME
+        if not path.exists():
+            # no-op modification, builds and saves the index unless another process has just done it
+            modify_keyword_index(path, lambda index: None, self._keyword_index_lock, self._build_keyword_index)
+        index: KeywordIndex = self.file_cache.get(path, KeywordIndex.parse)
+        return index.search(namespace, keyword)
+
+    def invalidate_annotations(self, namespace: str, key: str):
+        self.file_cache.invalidate(
+            self._path_to_object(namespace=namespace, key=key) / ANNOTATION_METADATA_FILENAME
+        )
+
+
+def _read_json(path: Path) -> dict:
+    with open(path.resolve(), "r", encoding="utf-8") as f:
+        # reads into dict
+        return json.load(f)
+
+
+def _parse_metadata(path: Path) -> FileSystemVolumeMedatada:
+    read_json_of_metadata: Metadata = _read_json(path)
+    return FileSystemVolumeMedatada(read_json_of_metadata)
+
+
+def _read_baked_response(path: Path) -> Optional[bytes]:
+    try:
+        with open(path, "rb") as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
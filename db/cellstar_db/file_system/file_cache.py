@@ -0,0 +1,65 @@
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, TypeVar
+
+DEFAULT_MAX_CACHED_FILES = 256
+
+T = TypeVar("T")
+
+
+class ParsedFileCache:
+    """
+    Bounded LRU cache of parsed entry files (metadata.json, annotations.json etc.)
+    keyed by file path. Cached value is dropped when mtime or size of the file changes.
+    NOTE: cached objects are shared between callers and must not be modified
+    """
+
+    def __init__(self, max_files: int = DEFAULT_MAX_CACHED_FILES):
+        self.max_files = max_files
+        self._cache: OrderedDict[Path, tuple[tuple[int, int], Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, path: Path, parse: Callable[[Path], T]) -> T:
+        """
+        Returns parsed content of file at path, parsing it with parse
+        only if it is not cached or has changed since it was cached
+        """
+        stat = os.stat(path)
+        signature = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            cached = self._cache.get(path)
+            if cached is not None and cached[0] == signature:
+                self._cache.move_to_end(path)
+                return cached[1]
+
+        value = parse(path)
+
+        if self.max_files > 0:
+            with self._lock:
+                self._cache[path] = (signature, value)
+                self._cache.move_to_end(path)
+                while len(self._cache) > self.max_files:
+                    self._cache.popitem(last=False)
+
+        return value
+
+    def invalidate(self, path: Path):
+        with self._lock:
+            self._cache.pop(path, None)
+
+    def invalidate_dir(self, dir_path: Path):
+        """
+        Drops all cached files from directory (e.g. entry directory)
+        """
+        with self._lock:
+            for path in [p for p in self._cache.keys() if p.parent == dir_path]:
+                del self._cache[path]
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+    def __len__(self):
+        return len(self._cache)
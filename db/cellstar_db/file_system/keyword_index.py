@@ -0,0 +1,181 @@
+import bisect
+import fcntl
+import json
+import os
+import re
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Optional, TypedDict
+
+from cellstar_db.models import AnnotationsMetadata
+
+# weight of token found in entry id, entry name and in string fields of annotations with these names,
+# tokens of other string fields have weight 1
+ENTRY_ID_WEIGHT = 10
+ENTRY_NAME_WEIGHT = 8
+FIELD_WEIGHTS = {
+    "name": 5,
+    "source_db_id": 5,
+    "label": 3,
+    "accession": 3,
+}
+# string fields of annotations which are not searchable text
+SKIPPED_FIELDS = {"id", "url", "segment_kind", "target_kind", "kind", "format", "source_db_name"}
+# score of a query token matching only a prefix of the indexed token relative to exact match
+PREFIX_MATCH_FACTOR = 0.5
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+class NamespaceKeywordIndex(TypedDict):
+    # token => entry key => weight
+    tokens: dict[str, dict[str, int]]
+    # entry key => its tokens, to remove entry from tokens when it is updated
+    entries: dict[str, list[str]]
+
+
+class KeywordIndexData(TypedDict):
+    namespaces: dict[str, NamespaceKeywordIndex]
+
+
+def tokenize(text: str) -> list[str]:
+    return _TOKEN_PATTERN.findall(text.lower())
+
+
+def entry_tokens(key: str, annotations: Optional[AnnotationsMetadata]) -> dict[str, int]:
+    """
+    Weighted tokens of entry id and text of annotations (names, descriptions, external references etc.)
+    """
+    weights: dict[str, int] = {}
+
+    def add(text: str, weight: int):
+        for token in tokenize(text):
+            weights[token] = weights.get(token, 0) + weight
+
+    def walk(value: Any, field: Optional[str]):
+        if isinstance(value, str):
+            if field not in SKIPPED_FIELDS:
+                add(value, FIELD_WEIGHTS.get(field, 1))
+        elif isinstance(value, dict):
+            for k, v in value.items():
+                walk(v, k)
+        elif isinstance(value, list):
+            for v in value:
+                walk(v, field)
+
+    add(key, ENTRY_ID_WEIGHT)
+    if annotations is not None:
+        if annotations.get("name"):
+            add(annotations["name"], ENTRY_NAME_WEIGHT)
+        walk({k: v for k, v in annotations.items() if k != "name"}, None)
+    return weights
+
+
+class KeywordIndex:
+    """
+    Inverted index of entry tokens stored in a single JSON file in the DB folder.
+    Updates rewrite the file atomically under locked_keyword_index, parsed index is cached by the DB file cache
+    """
+
+    def __init__(self, data: KeywordIndexData):
+        self.data = data
+        # sorted tokens of each namespace for prefix lookup, sorted on first search after update
+        self._sorted_tokens: dict[str, list[str]] = {}
+
+    @staticmethod
+    def empty() -> "KeywordIndex":
+        return KeywordIndex(KeywordIndexData(namespaces={}))
+
+    @staticmethod
+    def parse(path: Path) -> "KeywordIndex":
+        with open(path, "r", encoding="utf-8") as f:
+            return KeywordIndex(json.load(f))
+
+    def search(self, namespace: str, keyword: str) -> list[str]:
+        """
+        Returns keys of entries containing every token of keyword (as a whole token or its prefix),
+        the best ranked first, ties by key
+        """
+        query = tokenize(keyword)
+        index = self.data["namespaces"].get(namespace)
+        if len(query) == 0 or index is None:
+            return []
+
+        sorted_tokens = self._sorted_tokens.get(namespace)
+        if sorted_tokens is None:
+            sorted_tokens = self._sorted_tokens[namespace] = sorted(index["tokens"].keys())
+        scores: Optional[dict[str, float]] = None
+        for query_token in set(query):
+            token_scores: dict[str, float] = {}
+            start = bisect.bisect_left(sorted_tokens, query_token)
+            for token in sorted_tokens[start:]:
+                if not token.startswith(query_token):
+                    break
+                factor = 1.0 if token == query_token else PREFIX_MATCH_FACTOR
+                for key, weight in index["tokens"][token].items():
+                    token_scores[key] = token_scores.get(key, 0.0) + factor * weight
+
+            if scores is None:
+                scores = token_scores
+            else:
+                scores = {key: score + token_scores[key] for key, score in scores.items() if key in token_scores}
+            if not scores:
+                return []
+
+        return sorted(scores.keys(), key=lambda key: (-scores[key], key))
+
+    def update_entry(self, namespace: str, key: str, tokens: Optional[dict[str, int]]):
+        """
+        Replaces tokens of the entry, tokens=None removes the entry
+        """
+        index = self.data["namespaces"].setdefault(namespace, NamespaceKeywordIndex(tokens={}, entries={}))
+        for token in index["entries"].pop(key, []):
+            postings = index["tokens"].get(token)
+            if postings is not None:
+                postings.pop(key, None)
+                if len(postings) == 0:
+                    del index["tokens"][token]
+
+        if tokens is not None:
+            index["entries"][key] = sorted(tokens.keys())
+            for token, weight in tokens.items():
+                index["tokens"].setdefault(token, {})[key] = weight
+
+        self._sorted_tokens.pop(namespace, None)
+
+    def save(self, path: Path):
+        # written to temporary file first so that readers never see partially written index
+        temp_path = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}")
+        with temp_path.open("w", encoding="utf-8") as f:
+            json.dump(self.data, f)
+        os.replace(temp_path, path)
+
+
+@contextmanager
+def locked_keyword_index(path: Path, lock: threading.Lock):
+    """
+    Exclusive access to the index for threads of this process (lock)
+    and other processes, e.g. parallel preprocessor runs (flock of .<index filename>.lock)
+    """
+    with lock:
+        with open(path.with_name(f".{path.name}.lock"), "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def modify_keyword_index(
+    path: Path, modify: Callable[[KeywordIndex], None], lock: threading.Lock, build: Callable[[], KeywordIndex]
+):
+    """
+    Reads the index, applies modify and saves it. If there is no index yet,
+    it is built (from all entries) with build first, so that it never holds only the modified entries
+    """
+    with locked_keyword_index(path, lock):
+        # read under the lock, other processes may have updated it
+        index = KeywordIndex.parse(path) if path.exists() else build()
+        modify(index)
+        index.save(path)
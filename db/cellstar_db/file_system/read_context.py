@@ -1,26 +1,97 @@
 import json
+import threading
 from fastapi import HTTPException
 import logging
 from pathlib import Path
 from timeit import default_timer as timer
-from typing import Tuple, Union
+from typing import Callable, Optional, Tuple, Union
 
 import dask.array as da
 import numpy as np
 import tensorstore as ts
 import zarr
 
+from cellstar_db.file_system.chunk_cache import CachedChunkArray
 from cellstar_db.file_system.constants import (
     GEOMETRIC_SEGMENTATION_FILENAME,
+    GEOMETRIC_SEGMENTATION_VERSION_KEY,
     MESH_SEGMENTATION_DATA_GROUPNAME,
     QUANTIZATION_DATA_DICT_ATTR_NAME,
     LATTICE_SEGMENTATION_DATA_GROUPNAME,
+    MESH_PACK_ARRAYNAME_PREFIX,
+    MESH_PACK_OFFSETS_ARRAYNAME,
     VOLUME_DATA_GROUPNAME,
 )
-from cellstar_db.models import GeometricSegmentationData, GeometricSegmentationJson, MeshData, ShapePrimitiveData, VolumeSliceData, MeshesData
+from cellstar_db.file_system.slicing import prefetch_chunks, slice_boxes_chunk_aligned, slice_chunk_aligned, slice_many_chunk_aligned
+from cellstar_db.file_system.store_pool import PooledStore
+from cellstar_db.models import BoxSliceRequest, GeometricSegmentationData, GeometricSegmentationJson, MeshData, ShapePrimitiveData, VolumeQuantizationData, VolumeSliceData, MeshesData
 from cellstar_db.protocol import DBReadContext, VolumeServerDB
 from cellstar_db.utils.box import normalize_box
-from cellstar_db.utils.quantization import decode_quantized_data
+from cellstar_db.utils.primitive_index import PrimitiveIndex, build_primitive_index, query_primitive_index
+from cellstar_db.utils.quantization import decode_quantized_data_lut
+
+
+def _read_json(path: Path):
+    with open(path.resolve(), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+class _TimeframePrimitives:
+    """
+    Shape primitives of one timeframe as parsed from file, cached by the DB file cache.
+    Spatial index is built from them on the first box query if there is no stored index of the same version
+    """
+
+    def __init__(self, primitives: ShapePrimitiveData, version: Optional[str]):
+        self.primitives = primitives
+        self.version = version
+        self._index: Optional[PrimitiveIndex] = None
+        self._lock = threading.Lock()
+
+    def built_index(self) -> PrimitiveIndex:
+        with self._lock:
+            if self._index is None:
+                self._index = build_primitive_index(self.primitives, self.version)
+            return self._index
+
+
+def _read_timeframe_primitives(path: Path) -> _TimeframePrimitives:
+    primitives = _read_json(path)
+    version = primitives.pop(GEOMETRIC_SEGMENTATION_VERSION_KEY, None)
+    return _TimeframePrimitives(primitives, version)
+
+
+def _index_geometric_segmentation(path: Path) -> dict[tuple[str, str], _TimeframePrimitives]:
+    """
+    Parses geometric_segmentation.json into (segmentation_id, timeframe) => shape primitives
+    """
+    read_json: GeometricSegmentationJson = _read_json(path)
+    return {
+        (g["segmentation_id"], str(time)): _TimeframePrimitives(primitives, None)
+        for g in read_json
+        for time, primitives in g["primitives"].items()
+    }
+
+
+def _read_mesh_pack(mesh_list_group: zarr.Group) -> MeshesData:
+    """
+    Reads meshes of a detail lvl stored as pack (see MESH_PACK_OFFSETS_ARRAYNAME),
+    one array read per mesh component
+    """
+    offsets_arr = mesh_list_group[MESH_PACK_OFFSETS_ARRAYNAME]
+    components: list[str] = offsets_arr.attrs["components"]
+    offsets = offsets_arr[...]
+    packed = {c: mesh_list_group[f"{MESH_PACK_ARRAYNAME_PREFIX}{c}"][...] for c in components}
+
+    mesh_list: MeshesData = []
+    for i, row in enumerate(offsets):
+        mesh_data: MeshData = {"mesh_id": int(row[0])}
+        for component_index, component_name in enumerate(components):
+            start = row[1 + component_index]
+            end = offsets[i + 1][1 + component_index] if i + 1 < len(offsets) else len(packed[component_name])
+            mesh_data[component_name] = packed[component_name][start:end]
+        mesh_list.append(mesh_data)
+    return mesh_list
 
 
 class FileSystemDBReadContext(DBReadContext):
@@ -30,9 +101,10 @@ class FileSystemDBReadContext(DBReadContext):
         box: Tuple[Tuple[int, int, int], Tuple[int, int, int]],
         channel_id: str,
         time: int,
-        mode: str = "dask",
+        mode: str = "native",
         timer_printout=False,
         lattice_id: str = '0',
+        decode_quantized: bool = True,
     ) -> VolumeSliceData:
         """
         Reads a slice from a specific (down)sampling of segmentation and volume data
@@ -44,7 +116,7 @@ class FileSystemDBReadContext(DBReadContext):
 
             box = normalize_box(box)
 
-            root: zarr.Group = zarr.group(self.store)
+            root: zarr.Group = self.root
 
             segm_arr = None
             segm_dict = None
@@ -84,16 +156,9 @@ class FileSystemDBReadContext(DBReadContext):
                 segm_slice = self._do_slicing(arr=segm_arr, box=box, mode=mode)
             end = timer()
 
-            # check if volume_arr was originally quantized data (e.g. some attr on array, e.g. data_dict attr with data_dict)
-            # if yes, decode volume_slice (reassamble data dict from data_dict attr, just add 'data' key with volume_slice)
-            # do .compute on output of decode_quantized_data function if output is da.Array
-
-            if QUANTIZATION_DATA_DICT_ATTR_NAME in volume_arr.attrs:
-                data_dict = volume_arr.attrs[QUANTIZATION_DATA_DICT_ATTR_NAME]
-                data_dict["data"] = volume_slice
-                volume_slice = decode_quantized_data(data_dict)
-                if isinstance(volume_slice, da.Array):
-                    volume_slice = volume_slice.compute()
+            volume_slice, volume_quantization = self._decode_volume_slice(
+                volume_arr=volume_arr, volume_slice=volume_slice, decode_quantized=decode_quantized
+            )
 
             if timer_printout == True:
                 print(f"read_slice with mode {mode}: {end - start}")
@@ -105,6 +170,7 @@ class FileSystemDBReadContext(DBReadContext):
                         "lattice_id": lattice_id
                     },
                     "volume_slice": volume_slice,
+                    "volume_quantization": volume_quantization,
                     "time": time,
                     "channel_id": channel_id
                 }
@@ -116,6 +182,7 @@ class FileSystemDBReadContext(DBReadContext):
                         "lattice_id": lattice_id
                     },
                     "volume_slice": volume_slice,
+                    "volume_quantization": volume_quantization,
                     "time": time,
                     "channel_id": channel_id
                 }
@@ -135,15 +202,17 @@ class FileSystemDBReadContext(DBReadContext):
         """
         try:
             mesh_list: MeshesData = []
-            root: zarr.Group = zarr.group(self.store)
+            root: zarr.Group = self.root
 
             # # segmentation_id => timeframe => segment_id => detail_lvl => mesh_id in meshlist
             # mesh_segmentation_data: list[str, dict[int, list[dict[int, list[dict[int, list[dict[int, SingleMeshSegmentationData]]]]]]]]
             mesh_list_group = root[MESH_SEGMENTATION_DATA_GROUPNAME][
                 segmentation_id
             ][time][segment_id][detail_lvl]
-            
-            
+
+            if MESH_PACK_OFFSETS_ARRAYNAME in mesh_list_group:
+                return _read_mesh_pack(mesh_list_group)
+
             for mesh_name, mesh in mesh_list_group.groups():
                 mesh_data: MeshData = {"mesh_id": int(mesh_name)}
                 for mesh_component_name, mesh_component_arr in mesh.arrays():
@@ -159,34 +228,63 @@ class FileSystemDBReadContext(DBReadContext):
 
     async def read_geometric_segmentation(self, segmentation_id: str, time: int) -> GeometricSegmentationData:
         try:
-            # GeometricSegmentationJson = list[GeometricSegmentationData]
-            path: Path = Path(self.store.path).parent / GEOMETRIC_SEGMENTATION_FILENAME
-            with open(path.resolve(), "r", encoding="utf-8") as f:
-                # reads into dict
-                read_json: list[GeometricSegmentationData] = json.load(f)
-                filter_results = list(filter(lambda i: i['segmentation_id'] == segmentation_id, read_json))
-                assert len(filter_results) == 1
-                target_segmentation: GeometricSegmentationData = filter_results[0]
-                target_timeframe_data = target_segmentation["primitives"][str(time)]
+            return self._read_timeframe_primitives(segmentation_id, time).primitives
         except Exception as e:
             logging.error(e, stack_info=True, exc_info=True)
             raise e
 
-        return target_timeframe_data
-    
+    def _read_timeframe_primitives(self, segmentation_id: str, time: int) -> _TimeframePrimitives:
+        path = self.db.path_to_geometric_segmentation(self.namespace, self.key, segmentation_id, time)
+        if path.exists():
+            # only the requested timeframe is parsed
+            return self.db.file_cache.get(path, _read_timeframe_primitives)
+
+        # entries stored before the split into files per timeframe
+        path: Path = Path(self.store.path).parent / GEOMETRIC_SEGMENTATION_FILENAME
+        timeframes = self.db.file_cache.get(path, _index_geometric_segmentation)
+        return timeframes[(segmentation_id, str(time))]
+
+    async def read_geometric_segmentation_box(
+        self,
+        segmentation_id: str,
+        time: int,
+        box: Tuple[Tuple[float, float, float], Tuple[float, float, float]],
+        max_primitives: Optional[int] = None,
+    ) -> ShapePrimitiveData:
+        timeframe = self._read_timeframe_primitives(segmentation_id, time)
+        index: Optional[PrimitiveIndex] = None
+        index_path = self.db.path_to_geometric_segmentation_index(self.namespace, self.key, segmentation_id, time)
+        if timeframe.version is not None and index_path.exists():
+            stored_index: PrimitiveIndex = self.db.file_cache.get(index_path, _read_json)
+            # index is replaced after primitives, while the entry is being updated it may belong to other version
+            if stored_index.get(GEOMETRIC_SEGMENTATION_VERSION_KEY) == timeframe.version:
+                index = stored_index
+        if index is None:
+            # not stored for entries without versioned files per timeframe, built once and cached with primitives
+            index = timeframe.built_index()
+
+        positions = query_primitive_index(index, box)
+        if max_primitives is not None:
+            positions = positions[:max_primitives]
+        # NOTE: cached primitives must not be modified
+        return ShapePrimitiveData(
+            shape_primitive_list=[timeframe.primitives["shape_primitive_list"][p] for p in positions]
+        )
+
     async def read_volume_slice(
         self,
         down_sampling_ratio: int,
         box: Tuple[Tuple[int, int, int], Tuple[int, int, int]],
         channel_id: str,
         time: int,
-        mode: str = "dask",
+        mode: str = "native",
         timer_printout=False,
+        decode_quantized: bool = True,
     ) -> VolumeSliceData:
         try:
             box = normalize_box(box)
 
-            root: zarr.Group = zarr.group(self.store)
+            root: zarr.Group = self.root
 
             if VOLUME_DATA_GROUPNAME in root and (down_sampling_ratio is not None):
                 volume_arr: zarr.core.Array = root[VOLUME_DATA_GROUPNAME][
@@ -204,22 +302,16 @@ class FileSystemDBReadContext(DBReadContext):
                 volume_slice = self._do_slicing(arr=volume_arr, box=box, mode=mode)
                 end = timer()
 
-                # check if volume_arr was originally quantized data (e.g. some attr on array, e.g. data_dict attr with data_dict)
-                # if yes, decode volume_slice (reassamble data dict from data_dict attr, just add 'data' key with volume_slice)
-                # do .compute on output of decode_quantized_data function if output is da.Array
-
-                if QUANTIZATION_DATA_DICT_ATTR_NAME in volume_arr.attrs:
-                    data_dict = volume_arr.attrs[QUANTIZATION_DATA_DICT_ATTR_NAME]
-                    data_dict["data"] = volume_slice
-                    volume_slice = decode_quantized_data(data_dict)
-                    if isinstance(volume_slice, da.Array):
-                        volume_slice = volume_slice.compute()
+                volume_slice, volume_quantization = self._decode_volume_slice(
+                    volume_arr=volume_arr, volume_slice=volume_slice, decode_quantized=decode_quantized
+                )
 
                 if timer_printout == True:
                     print(f"read_volume_slice with mode {mode}: {end - start}")
 
                 return {
                     "volume_slice": volume_slice,
+                    "volume_quantization": volume_quantization,
                     "time": time,
                     "channel_id": channel_id}
             else:
@@ -229,20 +321,245 @@ class FileSystemDBReadContext(DBReadContext):
             logging.error(e, stack_info=True, exc_info=True)
             raise e
 
+    async def read_volume_slices(
+        self,
+        down_sampling_ratio: int,
+        box: Tuple[Tuple[int, int, int], Tuple[int, int, int]],
+        channel_ids: list[str],
+        time: int,
+        mode: str = "native",
+        timer_printout=False,
+        decode_quantized: bool = True,
+    ) -> list[VolumeSliceData]:
+        """
+        Reads the same box of several channels of volume data, in the order of channel_ids.
+        Box is normalized and checked once, chunks of all channels are read in parallel
+        """
+        try:
+            return self._read_volume_slices_batch(
+                down_sampling_ratio=down_sampling_ratio,
+                box=box,
+                time_channel_ids=[(time, channel_id) for channel_id in channel_ids],
+                mode=mode,
+                timer_printout=timer_printout,
+                decode_quantized=decode_quantized,
+            )
+        except Exception as e:
+            logging.error(e, stack_info=True, exc_info=True)
+            raise e
+
+    async def read_volume_time_slices(
+        self,
+        down_sampling_ratio: int,
+        box: Tuple[Tuple[int, int, int], Tuple[int, int, int]],
+        channel_id: str,
+        times: list[int],
+        mode: str = "native",
+        timer_printout=False,
+        decode_quantized: bool = True,
+    ) -> list[VolumeSliceData]:
+        """
+        Reads the same box of one channel of volume data for several timeframes, in the order of times.
+        Chunks of all timeframes are read in parallel
+        """
+        try:
+            return self._read_volume_slices_batch(
+                down_sampling_ratio=down_sampling_ratio,
+                box=box,
+                time_channel_ids=[(time, channel_id) for time in times],
+                mode=mode,
+                timer_printout=timer_printout,
+                decode_quantized=decode_quantized,
+            )
+        except Exception as e:
+            logging.error(e, stack_info=True, exc_info=True)
+            raise e
+
+    async def read_box_slices(
+        self,
+        requests: list[BoxSliceRequest],
+        mode: str = "native",
+        timer_printout=False,
+        decode_quantized: bool = True,
+    ) -> list[VolumeSliceData]:
+        """
+        Reads several boxes of volume or segmentation data (e.g. regions of interest), in the order of requests.
+        Each chunk needed by any of the boxes is decoded once, all chunks are read in parallel.
+        Returned slices have the same content as read_volume_slice or read_segmentation_slice
+        """
+        try:
+            root: zarr.Group = self.root
+
+            arrs: list[zarr.core.Array] = []
+            boxes = []
+            for request in requests:
+                box = normalize_box(request["box"])
+                if request["kind"] == "volume":
+                    if VOLUME_DATA_GROUPNAME not in root:
+                        raise HTTPException(status_code=404, detail="No volume data is available for the the given entry")
+                    arr = root[VOLUME_DATA_GROUPNAME][request["down_sampling_ratio"]][request["time"]][request["channel_id"]]
+                else:
+                    if LATTICE_SEGMENTATION_DATA_GROUPNAME not in root or request["lattice_id"] is None:
+                        raise HTTPException(status_code=404, detail="No segmentation data is available for the the given entry or lattice_id is None")
+                    arr = root[LATTICE_SEGMENTATION_DATA_GROUPNAME][request["lattice_id"]][
+                        request["down_sampling_ratio"]
+                    ][request["time"]].grid
+
+                assert (
+                    np.array(box[0]) >= np.array([0, 0, 0])
+                ).all(), f"requested box {box} does not correspond to arr dimensions"
+                assert (
+                    np.array(box[1]) <= np.array(arr.shape)
+                ).all(), f"requested box {box} does not correspond to arr dimensions"
+                arrs.append(arr)
+                boxes.append(box)
+
+            start = timer()
+            if mode == "native":
+                data_slices = slice_boxes_chunk_aligned(
+                    [(CachedChunkArray(arr, entry=self.entry), box) for arr, box in zip(arrs, boxes)]
+                )
+            else:
+                data_slices = [self._do_slicing(arr=arr, box=box, mode=mode) for arr, box in zip(arrs, boxes)]
+            end = timer()
+
+            if timer_printout == True:
+                print(f"read of {len(arrs)} box slices with mode {mode}: {end - start}")
+
+            slices: list[VolumeSliceData] = []
+            # set tables are shared by all boxes of the same lattice, resolution and time
+            segm_dicts = {}
+            for request, arr, data_slice in zip(requests, arrs, data_slices):
+                if request["kind"] == "volume":
+                    volume_slice, volume_quantization = self._decode_volume_slice(
+                        volume_arr=arr, volume_slice=data_slice, decode_quantized=decode_quantized
+                    )
+                    slices.append({
+                        "volume_slice": volume_slice,
+                        "volume_quantization": volume_quantization,
+                        "time": request["time"],
+                        "channel_id": request["channel_id"]})
+                else:
+                    segm_key = (request["lattice_id"], request["down_sampling_ratio"], request["time"])
+                    if segm_key not in segm_dicts:
+                        segm_dicts[segm_key] = root[LATTICE_SEGMENTATION_DATA_GROUPNAME][request["lattice_id"]][
+                            request["down_sampling_ratio"]
+                        ][request["time"]].set_table[0]
+                    segm_dict = segm_dicts[segm_key]
+                    slices.append({
+                        "segmentation_slice": {
+                            "category_set_ids": data_slice,
+                            "category_set_dict": segm_dict,
+                            "lattice_id": request["lattice_id"]
+                        },
+                        "time": request["time"]})
+            return slices
+
+        except Exception as e:
+            logging.error(e, stack_info=True, exc_info=True)
+            raise e
+
+    async def prefetch_box_slices(
+        self,
+        requests: list[BoxSliceRequest],
+        max_bytes: int,
+        should_stop: Callable[[], bool] = lambda: False,
+    ) -> int:
+        """
+        Warms the chunk cache with chunks of boxes which are likely to be requested soon, in the order of requests.
+        Stops after max_bytes of decoded chunks or when should_stop returns True, boxes which do not exist are skipped.
+        Returns number of bytes of decoded chunks
+        """
+        root: zarr.Group = self.root
+        read_bytes = 0
+        for request in requests:
+            if read_bytes >= max_bytes or should_stop():
+                break
+            try:
+                if request["kind"] == "volume":
+                    arr = root[VOLUME_DATA_GROUPNAME][request["down_sampling_ratio"]][request["time"]][request["channel_id"]]
+                else:
+                    arr = root[LATTICE_SEGMENTATION_DATA_GROUPNAME][request["lattice_id"]][
+                        request["down_sampling_ratio"]
+                    ][request["time"]].grid
+            except KeyError:
+                continue
+
+            box = normalize_box(request["box"])
+            read_bytes += prefetch_chunks(
+                CachedChunkArray(arr, entry=self.entry), box, max_bytes=max_bytes - read_bytes, should_stop=should_stop
+            )
+        return read_bytes
+
+    def _read_volume_slices_batch(
+        self,
+        down_sampling_ratio: int,
+        box: Tuple[Tuple[int, int, int], Tuple[int, int, int]],
+        time_channel_ids: list[Tuple[int, str]],
+        mode: str,
+        timer_printout: bool,
+        decode_quantized: bool,
+    ) -> list[VolumeSliceData]:
+        box = normalize_box(box)
+
+        root: zarr.Group = self.root
+
+        if VOLUME_DATA_GROUPNAME not in root or down_sampling_ratio is None:
+            raise HTTPException(status_code=404, detail="No volume data is available for the the given entry or down_sampling_ratio is None")
+
+        resolution_group: zarr.Group = root[VOLUME_DATA_GROUPNAME][down_sampling_ratio]
+        volume_arrs: list[zarr.core.Array] = []
+        for time, channel_id in time_channel_ids:
+            if str(time) not in resolution_group or channel_id not in resolution_group[time]:
+                raise HTTPException(status_code=404, detail=f"No volume data is available for time {time} and channel_id {channel_id}")
+            volume_arrs.append(resolution_group[time][channel_id])
+
+        for volume_arr in volume_arrs:
+            assert (
+                np.array(box[0]) >= np.array([0, 0, 0])
+            ).all(), f"requested box {box} does not correspond to arr dimensions"
+            assert (
+                np.array(box[1]) <= np.array(volume_arr.shape)
+            ).all(), f"requested box {box} does not correspond to arr dimensions"
+
+        start = timer()
+        if mode == "native":
+            volume_slices = slice_many_chunk_aligned(
+                arrs=[CachedChunkArray(arr, entry=self.entry) for arr in volume_arrs], box=box
+            )
+        else:
+            volume_slices = [self._do_slicing(arr=arr, box=box, mode=mode) for arr in volume_arrs]
+        end = timer()
+
+        if timer_printout == True:
+            print(f"read of {len(volume_arrs)} volume slices with mode {mode}: {end - start}")
+
+        slices: list[VolumeSliceData] = []
+        for (time, channel_id), volume_arr, volume_slice in zip(time_channel_ids, volume_arrs, volume_slices):
+            volume_slice, volume_quantization = self._decode_volume_slice(
+                volume_arr=volume_arr, volume_slice=volume_slice, decode_quantized=decode_quantized
+            )
+            slices.append({
+                "volume_slice": volume_slice,
+                "volume_quantization": volume_quantization,
+                "time": time,
+                "channel_id": channel_id})
+        return slices
+
     async def read_segmentation_slice(
         self,
         lattice_id: str,
         down_sampling_ratio: int,
         box: Tuple[Tuple[int, int, int], Tuple[int, int, int]],
         time: int,
-        mode: str = "dask",
+        mode: str = "native",
         timer_printout=False,
     ) -> VolumeSliceData:
         try:
 
             box = normalize_box(box)
 
-            root: zarr.Group = zarr.group(self.store)
+            root: zarr.Group = self.root
 
             segm_arr = None
             segm_dict = None
@@ -280,14 +597,45 @@ class FileSystemDBReadContext(DBReadContext):
             logging.error(e, stack_info=True, exc_info=True)
             raise e
 
+    def _decode_volume_slice(
+        self, volume_arr: zarr.core.Array, volume_slice: np.ndarray, decode_quantized: bool
+    ) -> Tuple[np.ndarray, Optional[VolumeQuantizationData]]:
+        """
+        If volume_arr was originally quantized data (data_dict attr on array), either decodes volume_slice
+        via lookup table of all possible codes, or returns stored codes as they are together with quantization parameters
+        """
+        if QUANTIZATION_DATA_DICT_ATTR_NAME not in volume_arr.attrs:
+            return volume_slice, None
+
+        data_dict = volume_arr.attrs[QUANTIZATION_DATA_DICT_ATTR_NAME]
+        if not decode_quantized:
+            quantization: VolumeQuantizationData = {
+                "min": data_dict["min"],
+                "max": data_dict["max"],
+                "num_steps": data_dict["num_steps"],
+                "to_remove_negatives": data_dict["to_remove_negatives"],
+                "src_type": data_dict["src_type"],
+            }
+            return volume_slice, quantization
+
+        data_dict["data"] = volume_slice
+        return decode_quantized_data_lut(data_dict), None
+
     def _do_slicing(
         self,
         arr: zarr.core.Array,
         box: Tuple[Tuple[int, int, int], Tuple[int, int, int]],
         mode: str,
     ) -> np.ndarray:
-
-        if mode == "zarr_colon":
+        # NOTE: all modes except tensorstore (which reads files directly) read chunks through
+        # the process-wide cache of decoded chunks
+        if mode != "tensorstore":
+            arr = CachedChunkArray(arr, entry=self.entry)
+
+        if mode == "native":
+            # chunks intersecting the box are decoded in parallel into one preallocated array
+            arr_slice = slice_chunk_aligned(arr=arr, box=box)
+        elif mode == "zarr_colon":
             # 2: zarr slicing via : notation
             arr_slice = self.__get_slice_from_zarr_three_d_arr(arr=arr, box=box)
         elif mode == "zarr_gbs":
@@ -309,7 +657,7 @@ class FileSystemDBReadContext(DBReadContext):
 
     def __get_slice_from_zarr_three_d_arr(
         self,
-        arr: zarr.core.Array,
+        arr: CachedChunkArray,
         box: Tuple[Tuple[int, int, int], Tuple[int, int, int]],
     ):
         """
@@ -325,7 +673,7 @@ class FileSystemDBReadContext(DBReadContext):
 
     def __get_slice_from_zarr_three_d_arr_gbs(
         self,
-        arr: zarr.core.Array,
+        arr: CachedChunkArray,
         box: Tuple[Tuple[int, int, int], Tuple[int, int, int]],
     ):
         # TODO: check if slice is correct and equal to : notation slice
@@ -340,7 +688,7 @@ class FileSystemDBReadContext(DBReadContext):
 
     def __get_slice_from_zarr_three_d_arr_dask(
         self,
-        arr: zarr.core.Array,
+        arr: CachedChunkArray,
         box: Tuple[Tuple[int, int, int], Tuple[int, int, int]],
     ):
         # TODO: check if slice is correct and equal to : notation slice
@@ -355,10 +703,12 @@ class FileSystemDBReadContext(DBReadContext):
 
     def __get_slice_from_zarr_three_d_arr_dask_from_zarr(
         self,
-        arr: zarr.core.Array,
+        arr: CachedChunkArray,
         box: Tuple[Tuple[int, int, int], Tuple[int, int, int]],
     ):
-        zd = da.from_zarr(arr, chunks=arr.chunks)
+        # NOTE: da.from_zarr accepts only zarr arrays, so chunk-aligned dask array
+        # is created from cached array view directly
+        zd = da.from_array(arr, chunks=arr.chunks, asarray=False)
         sliced = zd[
             box[0][0] : box[1][0] + 1,
             box[0][1] : box[1][1] + 1,
@@ -408,30 +758,22 @@ class FileSystemDBReadContext(DBReadContext):
         return path
 
     def close(self):
-        if hasattr(self.store, "close"):
-            self.store.close()
-        else:
-            pass
+        # NOTE: store is owned by the pool, it is just returned there
+        if self._pooled is not None:
+            self.db.store_pool.release(self._pooled)
+            self._pooled = None
 
     def __enter__(self):
         return self
 
     def __exit__(self, exc_type, exc_value, traceback):
-        if hasattr(self.store, "close"):
-            self.store.close()
-        else:
-            pass
+        self.close()
 
     async def __aenter__(self):
         return self
 
     async def __aexit__(self, *args, **kwargs):
-        if hasattr(self.store, "aclose"):
-            await self.store.aclose()
-        if hasattr(self.store, "close"):
-            self.store.close()
-        else:
-            pass
+        self.close()
 
     def __init__(self, db: VolumeServerDB, namespace: str, key: str):
         self.db = db
@@ -439,9 +781,8 @@ class FileSystemDBReadContext(DBReadContext):
         assert self.path.exists(), f"Path {self.path} does not exist"
         self.key = key
         self.namespace = namespace
-        if self.db.store_type == "directory":
-            self.store = zarr.DirectoryStore(path=self.path)
-        elif self.db.store_type == "zip":
-            self.store = zarr.ZipStore(
-                path=self.path, compression=0, allowZip64=True, mode="r"
-            )
+        self._pooled: Optional[PooledStore] = self.db.store_pool.acquire(namespace, key, self.path)
+        self.store = self._pooled.store
+        self.root: zarr.Group = self._pooled.root
+        # identifies entry data in chunk cache, changes when data is rewritten
+        self.entry = (namespace, key, self._pooled.version)
@@ -0,0 +1,107 @@
+import itertools
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional, Tuple
+
+import numpy as np
+
+from cellstar_db.file_system.chunk_cache import CachedChunkArray
+
+# NOTE: blosc decompression and numpy copies release the GIL,
+# so chunks are fetched and decoded in parallel by threads
+_CHUNK_READ_POOL = ThreadPoolExecutor(
+    max_workers=min(32, (os.cpu_count() or 1) + 4), thread_name_prefix="chunk-read"
+)
+
+
+def slice_chunk_aligned(
+    arr: CachedChunkArray,
+    box: Tuple[Tuple[int, int, int], Tuple[int, int, int]],
+    out: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """
+    Reads box (inclusive corners) of 3d array by fetching and decoding chunks
+    intersecting the box in parallel, each copied directly into preallocated output array
+    """
+    selection = tuple(slice(box[0][i], box[1][i] + 1) for i in range(3))
+    shape = tuple(s.stop - s.start for s in selection)
+    if out is None:
+        out = np.empty(shape, dtype=arr.dtype)
+    else:
+        assert out.shape == shape, f"output array shape {out.shape} does not correspond to box {box}"
+
+    chunks = list(itertools.product(*arr.chunk_ranges(selection)))
+    if len(chunks) == 1:
+        arr.copy_chunk_to(out, selection, chunks[0])
+    else:
+        # NOTE: list() to propagate exceptions from workers
+        list(_CHUNK_READ_POOL.map(lambda c: arr.copy_chunk_to(out, selection, c), chunks))
+
+    return out
+
+
+def slice_many_chunk_aligned(
+    arrs: List[CachedChunkArray],
+    box: Tuple[Tuple[int, int, int], Tuple[int, int, int]],
+) -> List[np.ndarray]:
+    """
+    Same as slice_chunk_aligned for several arrays (e.g. channels) and the same box,
+    chunks of all arrays are fetched and decoded in parallel as one batch
+    """
+    return slice_boxes_chunk_aligned([(arr, box) for arr in arrs])
+
+
+def slice_boxes_chunk_aligned(
+    reads: List[Tuple[CachedChunkArray, Tuple[Tuple[int, int, int], Tuple[int, int, int]]]],
+) -> List[np.ndarray]:
+    """
+    Reads boxes (inclusive corners) of arrays, e.g. several regions of interest of one entry.
+    Chunks needed by overlapping boxes are fetched and decoded once and copied into every box intersecting them,
+    all distinct chunks are decoded in parallel
+    """
+    selections = [tuple(slice(box[0][i], box[1][i] + 1) for i in range(3)) for _, box in reads]
+    outs = [np.empty(tuple(s.stop - s.start for s in selection), dtype=arr.dtype) for (arr, _), selection in zip(reads, selections)]
+
+    # (array, chunk) => outputs the chunk is copied to
+    targets: dict[tuple, tuple[CachedChunkArray, Tuple[int, ...], list[int]]] = {}
+    for index, ((arr, _), selection) in enumerate(zip(reads, selections)):
+        for c in itertools.product(*arr.chunk_ranges(selection)):
+            key = (arr.entry, arr.path, c)
+            if key not in targets:
+                targets[key] = (arr, c, [])
+            targets[key][2].append(index)
+
+    def read_chunk(target: tuple[CachedChunkArray, Tuple[int, ...], list[int]]):
+        arr, c, indices = target
+        chunk = arr.read_chunk(c) if len(indices) > 1 else None
+        for index in indices:
+            arr.copy_chunk_to(outs[index], selections[index], c, chunk=chunk)
+
+    if len(targets) == 1:
+        read_chunk(next(iter(targets.values())))
+    else:
+        list(_CHUNK_READ_POOL.map(read_chunk, targets.values()))
+
+    return outs
+
+
+def prefetch_chunks(
+    arr: CachedChunkArray,
+    box: Tuple[Tuple[int, int, int], Tuple[int, int, int]],
+    max_bytes: int,
+    should_stop: Callable[[], bool],
+) -> int:
+    """
+    Reads chunks intersecting the box into the chunk cache one by one (in the calling thread),
+    until all are cached, max_bytes of chunks were decoded or should_stop returns True.
+    Returns number of bytes of decoded chunks
+    """
+    selection = tuple(slice(box[0][i], box[1][i] + 1) for i in range(3))
+    read_bytes = 0
+    for c in itertools.product(*arr.chunk_ranges(selection)):
+        if read_bytes >= max_bytes or should_stop():
+            break
+        if arr.is_cached(c):
+            continue
+        read_bytes += arr.read_chunk(c).nbytes
+    return read_bytes
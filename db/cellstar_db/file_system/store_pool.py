@@ -0,0 +1,114 @@
+import logging
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Union
+
+import zarr
+
+DEFAULT_MAX_OPEN_FILES = 128
+
+
+class PooledStore:
+    """
+    Open, read-only zarr store together with its root group.
+    Shared between all read contexts of the same entry, closed by the pool
+    once it is evicted and no read context uses it anymore
+    """
+
+    def __init__(self, store: Union[zarr.storage.ZipStore, zarr.storage.DirectoryStore], root: zarr.Group, version: int):
+        self.store = store
+        self.root = root
+        # mtime (ns) of the entry data at the time the store was opened
+        self.version = version
+        self.refcount = 0
+        self.evicted = False
+
+    def close(self):
+        if hasattr(self.store, "close"):
+            self.store.close()
+
+
+class StorePool:
+    """
+    LRU pool of open read-only zarr stores keyed by (namespace, key).
+    Stores are reopened when the mtime of the underlying data changes
+    """
+
+    def __init__(self, store_type: str, max_open_files: int = DEFAULT_MAX_OPEN_FILES):
+        if max_open_files < 1:
+            raise ValueError(f"max_open_files must be positive: {max_open_files}")
+
+        self.store_type = store_type
+        self.max_open_files = max_open_files
+        self._stores: OrderedDict[tuple[str, str], PooledStore] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def acquire(self, namespace: str, key: str, path: Path) -> PooledStore:
+        """
+        Returns pooled store for the entry, opening it if needed.
+        Every acquire must be followed by release
+        """
+        version = _data_version(path)
+        with self._lock:
+            pooled = self._stores.get((namespace, key))
+            if pooled is not None and pooled.version != version:
+                logging.info(f"Data of {namespace}/{key} changed, reopening store")
+                self._evict((namespace, key))
+                pooled = None
+
+            if pooled is None:
+                pooled = self._open(path, version)
+                self._stores[(namespace, key)] = pooled
+                while len(self._stores) > self.max_open_files:
+                    self._evict(next(iter(self._stores)))
+            else:
+                self._stores.move_to_end((namespace, key))
+
+            pooled.refcount += 1
+            return pooled
+
+    def release(self, pooled: PooledStore):
+        with self._lock:
+            pooled.refcount -= 1
+            if pooled.evicted and pooled.refcount == 0:
+                pooled.close()
+
+    def invalidate(self, namespace: str, key: str):
+        """
+        Drops pooled store of the entry (e.g. before its data is rewritten)
+        """
+        with self._lock:
+            if (namespace, key) in self._stores:
+                self._evict((namespace, key))
+
+    def clear(self):
+        with self._lock:
+            for pool_key in list(self._stores.keys()):
+                self._evict(pool_key)
+
+    def __len__(self):
+        return len(self._stores)
+
+    def _evict(self, pool_key: tuple[str, str]):
+        pooled = self._stores.pop(pool_key)
+        pooled.evicted = True
+        # NOTE: store still used by some read context will be closed on its release
+        if pooled.refcount == 0:
+            pooled.close()
+
+    def _open(self, path: Path, version: int) -> PooledStore:
+        if self.store_type == "directory":
+            store = zarr.DirectoryStore(path=str(path))
+        elif self.store_type == "zip":
+            store = zarr.ZipStore(path=str(path), compression=0, allowZip64=True, mode="r")
+        else:
+            raise ValueError(f"store type is not supported: {self.store_type}")
+
+        root = zarr.open_group(store=store, mode="r")
+        return PooledStore(store=store, root=root, version=version)
+
+
+def _data_version(path: Path) -> int:
+    return os.stat(path).st_mtime_ns
@@ -6,15 +6,28 @@
 # only those that provide access to data?
 
 from argparse import ArgumentError
+import json
+import os
 from pathlib import Path
+import threading
+import uuid
 from typing import Literal
-from cellstar_db.file_system.constants import ANNOTATION_METADATA_FILENAME, GEOMETRIC_SEGMENTATION_FILENAME, GEOMETRIC_SEGMENTATIONS_ZATTRS, GRID_METADATA_FILENAME, LATTICE_SEGMENTATION_DATA_GROUPNAME, MESH_SEGMENTATION_DATA_GROUPNAME, VOLUME_DATA_GROUPNAME
+from cellstar_db.file_system.constants import ANNOTATION_METADATA_FILENAME, GEOMETRIC_SEGMENTATION_DIRNAME, GEOMETRIC_SEGMENTATION_FILENAME, GEOMETRIC_SEGMENTATION_VERSION_KEY, GEOMETRIC_SEGMENTATIONS_ZATTRS, GRID_METADATA_FILENAME, LATTICE_SEGMENTATION_DATA_GROUPNAME, MESH_SEGMENTATION_DATA_GROUPNAME, VOLUME_DATA_GROUPNAME
 from cellstar_db.models import GeometricSegmentationData, ShapePrimitiveData
 from cellstar_db.protocol import VolumeServerDB
+from cellstar_db.utils.primitive_index import build_primitive_index
 from cellstar_preprocessor.flows.common import open_json_file, open_zarr_structure_from_path, open_zarr_zip, save_dict_to_json_file
 import zarr
 
 
+def _write_json_atomic(path: Path, obj) -> None:
+    # written to temporary file first so that readers never see partially written file
+    temp_path = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}")
+    with temp_path.open("w") as fp:
+        json.dump(obj, fp)
+    os.replace(temp_path, path)
+
+
 class VolumeAndSegmentationContext:
     def __init__(self, db: VolumeServerDB, namespace: str, key: str, working_folder: Path):
         self.working_folder = working_folder
@@ -53,6 +66,7 @@ class VolumeAndSegmentationContext:
             # 3. Closing existing store
             existing_store.close()
             # 3. Deleting existing store
+            self.db.store_pool.invalidate(namespace, key)
             self.db.path_to_zarr_root_data(namespace, key).unlink()
             
         else:
@@ -109,11 +123,7 @@ class VolumeAndSegmentationContext:
                 # add to list new segmentation
             d.append(target_geometric_segmentation)
             # save back to file
-            save_dict_to_json_file(
-                d,
-                GEOMETRIC_SEGMENTATION_FILENAME,
-                self.path_to_entry
-            )
+            self._save_geometric_segmentation(d)
 
         print('Segmentation added')
             
@@ -151,11 +161,41 @@ class VolumeAndSegmentationContext:
             d.pop(target_index)
 
             # save back to file
-            save_dict_to_json_file(
-                d,
-                GEOMETRIC_SEGMENTATION_FILENAME,
-                self.path_to_entry
-            )
+            self._save_geometric_segmentation(d)
+
+    def _save_geometric_segmentation(self, d: list[GeometricSegmentationData]):
+        """
+        Saves geometric_segmentation.json and, for reads of single timeframe,
+        primitives of each segmentation and timeframe with their spatial index to separate files
+        """
+        save_dict_to_json_file(
+            d,
+            GEOMETRIC_SEGMENTATION_FILENAME,
+            self.path_to_entry
+        )
+
+        # NOTE: files may be read by the server at the same time, so each is replaced atomically
+        # and files of removed segmentations and timeframes are deleted only after new files are in place
+        split_path = self.path_to_entry / GEOMETRIC_SEGMENTATION_DIRNAME
+        written: set[Path] = set()
+        for g in d:
+            for time, primitives in g["primitives"].items():
+                path = self.db.path_to_geometric_segmentation(self.namespace, self.key, g["segmentation_id"], time)
+                path.parent.mkdir(parents=True, exist_ok=True)
+                # primitives and index are replaced one after another, readers use the index only if versions match
+                version = uuid.uuid4().hex
+                _write_json_atomic(path, {**primitives, GEOMETRIC_SEGMENTATION_VERSION_KEY: version})
+                index_path = self.db.path_to_geometric_segmentation_index(self.namespace, self.key, g["segmentation_id"], time)
+                _write_json_atomic(index_path, build_primitive_index(primitives, version))
+                written.update((path, index_path))
+
+        if split_path.exists():
+            for segmentation_path in list(split_path.iterdir()):
+                for path in list(segmentation_path.iterdir()):
+                    if path not in written:
+                        path.unlink()
+                if not any(segmentation_path.iterdir()):
+                    segmentation_path.rmdir()
 
     def _before_closing(self):
         # NOTE: this part in atexit and in exit
@@ -194,6 +234,7 @@ class VolumeAndSegmentationContext:
             GRID_METADATA_FILENAME,
             self.path_to_entry,
         )
+        self.db.update_keyword_index(self.namespace, self.key)
 
     def close(self):
         if hasattr(self.store, "close"):
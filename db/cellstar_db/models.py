@@ -359,13 +359,33 @@ class LatticeSegmentationSliceData(TypedDict):
     category_set_dict: dict
     lattice_id: int
 
+class VolumeQuantizationData(TypedDict):
+    # parameters needed to decode quantized volume values:
+    # exp(code * (max - min) / (num_steps - 1) + min) - 1 + to_remove_negatives
+    min: float
+    max: float
+    num_steps: int
+    to_remove_negatives: Union[int, float]
+    src_type: str
+
 class VolumeSliceData(TypedDict):
     # changed segm slice to another typeddict
     segmentation_slice: Optional[LatticeSegmentationSliceData]
     volume_slice: Optional[np.ndarray]
+    # set if volume_slice contains stored quantized codes instead of decoded values
+    volume_quantization: Optional[VolumeQuantizationData]
     channel_id: Optional[str]
     time: int
 
+class BoxSliceRequest(TypedDict):
+    # volume reads channel_id of volume data, segmentation reads lattice_id of lattice segmentation data
+    kind: Literal["volume", "segmentation"]
+    down_sampling_ratio: int
+    box: tuple[tuple[int, int, int], tuple[int, int, int]]
+    time: int
+    channel_id: Optional[str]
+    lattice_id: Optional[str]
+
 # END SERVER OUTPUT DATA MODEL
 
 # INPUT DATA MODEL
@@ -1,7 +1,7 @@
 from pathlib import Path
-from typing import Dict, Protocol, Tuple
+from typing import Callable, Dict, Optional, Protocol, Tuple
 
-from cellstar_db.models import AnnotationsMetadata, GeometricSegmentationData, GeometricSegmentationJson, MeshesData, VolumeMetadata, VolumeSliceData
+from cellstar_db.models import AnnotationsMetadata, BoxSliceRequest, GeometricSegmentationData, GeometricSegmentationJson, MeshesData, ShapePrimitiveData, VolumeMetadata, VolumeSliceData
 
 
 class DBReadContext(Protocol):
@@ -11,15 +11,18 @@ class DBReadContext(Protocol):
         box: Tuple[Tuple[int, int, int], Tuple[int, int, int]],
         channel_id: str,
         time: int,
-        mode: str = "dask",
+        mode: str = "native",
         timer_printout=False,
         lattice_id: str = '0',
+        decode_quantized: bool = True,
     ) -> VolumeSliceData:
         """
         Reads a slice from a specific (down)sampling of segmentation and volume data
         from specific entry from DB based on key (e.g. EMD-1111), lattice_id (e.g. 0),
         downsampling ratio (1 => original data, 2 => downsampled by factor of 2 etc.),
-        and slice box (vec3, vec3)
+        and slice box (vec3, vec3).
+        If decode_quantized is False, quantized volume is returned as stored codes
+        together with quantization parameters
         """
         ...
 
@@ -39,24 +42,92 @@ class DBReadContext(Protocol):
         """
         ...
 
+    async def read_geometric_segmentation_box(
+        self,
+        segmentation_id: str,
+        time: int,
+        box: Tuple[Tuple[float, float, float], Tuple[float, float, float]],
+        max_primitives: Optional[int] = None,
+    ) -> ShapePrimitiveData:
+        """
+        Returns shape primitives of geometric segmentation intersecting the box (in angstroms),
+        in the stored order, at most max_primitives of them
+        """
+        ...
+
     async def read_volume_slice(
         self,
         down_sampling_ratio: int,
         box: Tuple[Tuple[int, int, int], Tuple[int, int, int]],
         channel_id: str,
         time: int,
-        mode: str = "dask",
+        mode: str = "native",
         timer_printout=False,
+        decode_quantized: bool = True,
     ) -> VolumeSliceData:
         ...
 
+    async def read_volume_slices(
+        self,
+        down_sampling_ratio: int,
+        box: Tuple[Tuple[int, int, int], Tuple[int, int, int]],
+        channel_ids: list[str],
+        time: int,
+        mode: str = "native",
+        timer_printout=False,
+        decode_quantized: bool = True,
+    ) -> list[VolumeSliceData]:
+        """
+        Reads the same box of several channels of volume data at once, in the order of channel_ids
+        """
+        ...
+
+    async def read_volume_time_slices(
+        self,
+        down_sampling_ratio: int,
+        box: Tuple[Tuple[int, int, int], Tuple[int, int, int]],
+        channel_id: str,
+        times: list[int],
+        mode: str = "native",
+        timer_printout=False,
+        decode_quantized: bool = True,
+    ) -> list[VolumeSliceData]:
+        """
+        Reads the same box of one channel of volume data for several timeframes at once, in the order of times
+        """
+        ...
+
+    async def read_box_slices(
+        self,
+        requests: list[BoxSliceRequest],
+        mode: str = "native",
+        timer_printout=False,
+        decode_quantized: bool = True,
+    ) -> list[VolumeSliceData]:
+        """
+        Reads several boxes of volume or segmentation data at once, chunks shared by boxes are read once
+        """
+        ...
+
+    async def prefetch_box_slices(
+        self,
+        requests: list[BoxSliceRequest],
+        max_bytes: int,
+        should_stop: Callable[[], bool] = lambda: False,
+    ) -> int:
+        """
+        Warms the chunk cache with chunks of boxes which are likely to be requested soon,
+        returns number of bytes of decoded chunks
+        """
+        ...
+
     async def read_segmentation_slice(
         self,
         lattice_id: int,
         down_sampling_ratio: int,
         box: Tuple[Tuple[int, int, int], Tuple[int, int, int]],
         time: int,
-        mode: str = "dask",
+        mode: str = "native",
         timer_printout=False,
     ) -> VolumeSliceData:
         ...
@@ -84,7 +155,23 @@ class VolumeServerDB(Protocol):
     async def read_metadata(self, namespace: str, key: str) -> VolumeMetadata:
         ...
 
-    async def read_annotations(self, namespace: str, key: str) -> AnnotationsMetadata:
+    async def read_annotations(self, namespace: str, key: str, cached: bool = True) -> AnnotationsMetadata:
+        """
+        Returns annotations of the entry. Cached annotations are shared between requests and must not be modified,
+        use cached=False to get a private copy (e.g. for editing)
+        """
+        ...
+
+    async def data_version(self, namespace: str, key: str) -> str:
+        """
+        Returns version of the entry data, changes whenever the data is modified
+        """
+        ...
+
+    async def read_baked_response(self, namespace: str, key: str, name: str) -> Optional[bytes]:
+        """
+        Returns response serialized at preprocessing time, None if it was not baked
+        """
         ...
 
     async def list_sources(self) -> list[str]:
@@ -93,6 +180,12 @@ class VolumeServerDB(Protocol):
     async def list_entries(self, source: str, limit: int) -> list[str]:
         ...
 
+    async def search_entries(self, namespace: str, keyword: str) -> list[str]:
+        """
+        Returns keys of entries matching keyword, the best matching first
+        """
+        ...
+
     async def store(self, namespace: str, key: str, temp_store_path: Path) -> bool:
         ...
 
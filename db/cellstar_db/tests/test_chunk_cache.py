@@ -0,0 +1,28 @@
+import numpy as np
+import zarr
+
+from cellstar_db.file_system.chunk_cache import CachedChunkArray, ChunkCache
+
+
+def test_cached_chunk_array_slicing():
+    data = np.arange(20 * 13 * 7, dtype=np.float32).reshape(20, 13, 7)
+    arr = zarr.array(data, chunks=(8, 8, 8))
+    cache = ChunkCache(max_bytes=10 * 8**3 * 4)
+    cached = CachedChunkArray(arr, entry="test", cache=cache)
+
+    assert np.array_equal(cached[3:17, 5:13, 0:7], data[3:17, 5:13, 0:7])
+    misses = cache.misses
+    assert np.array_equal(cached[4:9, 6:7, 1:2], data[4:9, 6:7, 1:2])
+    assert cache.misses == misses
+    assert cache.hits > 0
+
+
+def test_chunk_cache_byte_budget():
+    cache = ChunkCache(max_bytes=2 * 1000)
+    for i in range(3):
+        cache.put(("entry", "arr", (i,)), np.zeros(1000, dtype=np.uint8))
+
+    assert cache.current_bytes == 2000
+    assert cache.evictions == 1
+    assert cache.get(("entry", "arr", (0,))) is None
+    assert cache.get(("entry", "arr", (2,))) is not None
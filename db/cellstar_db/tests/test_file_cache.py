@@ -0,0 +1,27 @@
+import json
+import os
+from pathlib import Path
+
+from cellstar_db.file_system.file_cache import ParsedFileCache
+
+
+def _parse(path: Path) -> dict:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def test_file_cache_invalidated_by_file_change(tmp_path: Path):
+    path = tmp_path / "metadata.json"
+    path.write_text(json.dumps({"a": 1}))
+    cache = ParsedFileCache(max_files=1)
+
+    first = cache.get(path, _parse)
+    assert cache.get(path, _parse) is first
+
+    path.write_text(json.dumps({"a": 22}))
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert cache.get(path, _parse) == {"a": 22}
+
+    cache.invalidate(path)
+    assert len(cache) == 0
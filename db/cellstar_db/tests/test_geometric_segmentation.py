@@ -0,0 +1,167 @@
+import asyncio
+import json
+from pathlib import Path
+
+import numpy as np
+import zarr
+
+from cellstar_db.file_system.constants import GEOMETRIC_SEGMENTATION_FILENAME
+from cellstar_db.file_system.db import FileSystemVolumeServerDB
+from cellstar_db.file_system.volume_and_segmentation_context import VolumeAndSegmentationContext
+from cellstar_db.utils.primitive_index import build_primitive_index, primitive_bounding_sphere, query_primitive_index
+
+GEOMETRIC_SEGMENTATION = [
+    {
+        "segmentation_id": "primitives/a",
+        "primitives": {
+            "0": {"shape_primitive_list": [{"kind": "sphere", "id": 1}]},
+            "1": {"shape_primitive_list": [{"kind": "sphere", "id": 2}]},
+        },
+    },
+]
+
+
+def _write_store(db: FileSystemVolumeServerDB):
+    store = zarr.ZipStore(str(db.path_to_zarr_root_data("emdb", "emd-1")), mode="w", compression=0, allowZip64=True)
+    # NOTE: non-zero data, empty chunks are deleted from the store which ZipStore does not support (zarr 2.11)
+    zarr.group(store=store).create_dataset("volume_data/1/0/0", data=np.ones((2, 2, 2)))
+    store.close()
+
+
+def _create_entry(tmp_path: Path) -> FileSystemVolumeServerDB:
+    db = FileSystemVolumeServerDB(folder=tmp_path, store_type="zip")
+    entry_path = tmp_path / "emdb" / "emd-1"
+    entry_path.mkdir(parents=True)
+    _write_store(db)
+    (entry_path / GEOMETRIC_SEGMENTATION_FILENAME).write_text(json.dumps(GEOMETRIC_SEGMENTATION))
+    return db
+
+
+async def _read(db: FileSystemVolumeServerDB, segmentation_id: str, time: int):
+    with db.read("emdb", "emd-1") as context:
+        return await context.read_geometric_segmentation(segmentation_id=segmentation_id, time=time)
+
+
+def test_geometric_segmentation_read_from_combined_file(tmp_path: Path):
+    db = _create_entry(tmp_path)
+    primitives = asyncio.run(_read(db, "primitives/a", 1))
+    assert primitives == GEOMETRIC_SEGMENTATION[0]["primitives"]["1"]
+    # parsed file is cached
+    assert asyncio.run(_read(db, "primitives/a", 1)) is primitives
+
+
+def test_geometric_segmentation_read_from_timeframe_file(tmp_path: Path):
+    db = _create_entry(tmp_path)
+    path = db.path_to_geometric_segmentation("emdb", "emd-1", "primitives/a", 0)
+    path.parent.mkdir(parents=True)
+    timeframe_primitives = {"shape_primitive_list": [{"kind": "box", "id": 3}]}
+    path.write_text(json.dumps(timeframe_primitives))
+
+    assert path.parent.name == "primitives%2Fa"
+    assert asyncio.run(_read(db, "primitives/a", 0)) == timeframe_primitives
+
+
+def test_geometric_segmentation_save_replaces_timeframe_files(tmp_path: Path):
+    db = _create_entry(tmp_path)
+    context = VolumeAndSegmentationContext(db, "emdb", "emd-1", tmp_path / "work")
+    sphere = {"kind": "sphere", "id": 4, "center": [1, 2, 3], "radius": 1.0}
+    a = {"segmentation_id": "primitives/a", "primitives": {"0": _random_primitives(6, 2), "1": {"shape_primitive_list": [sphere]}}}
+    b = {"segmentation_id": "b", "primitives": {"0": {"shape_primitive_list": [sphere]}}}
+    context._save_geometric_segmentation([a, b])
+    path = db.path_to_geometric_segmentation("emdb", "emd-1", "primitives/a", 1)
+    assert json.loads(path.read_text())["shape_primitive_list"] == [sphere]
+
+    context._save_geometric_segmentation([a])
+    assert json.loads(path.read_text())["shape_primitive_list"] == [sphere]
+    # files of removed segmentation are deleted, no temporary files are left
+    assert not db.path_to_geometric_segmentation("emdb", "emd-1", "b", 0).parent.exists()
+    assert sorted(p.name for p in path.parent.iterdir()) == ["0.index.json", "0.json", "1.index.json", "1.json"]
+
+
+def _random_primitives(n: int, seed: int):
+    rng = np.random.default_rng(seed)
+    primitives = []
+    for i in range(n):
+        p = rng.random(3) * 100
+        kind = ["sphere", "box", "cylinder", "ellipsoid", "pyramid", "tube"][i % 6]
+        if kind == "sphere":
+            primitives.append({"id": i, "kind": kind, "center": p.tolist(), "radius": rng.random() * 10})
+        elif kind in ("box", "pyramid"):
+            primitives.append({"id": i, "kind": kind, "translation": p.tolist(), "scaling": (rng.random(3) * 5).tolist(),
+                               "rotation": {"axis": [0, 0, 1], "radians": 0.5}})
+        elif kind == "cylinder":
+            primitives.append({"id": i, "kind": kind, "start": p.tolist(), "end": (p + rng.random(3) * 20).tolist(),
+                               "radius_bottom": 2.0, "radius_top": 0.0})
+        elif kind == "ellipsoid":
+            primitives.append({"id": i, "kind": kind, "center": p.tolist(), "dir_major": [1, 0, 0], "dir_minor": [0, 1, 0],
+                               "radius_scale": (rng.random(3) * 5).tolist()})
+        else:
+            primitives.append({"id": i, "kind": kind})
+    return {"shape_primitive_list": primitives}
+
+
+def test_primitive_index_matches_brute_force():
+    primitives = _random_primitives(300, 0)
+    index = build_primitive_index(primitives)
+    for box in [((10, 10, 10), (30, 40, 50)), ((90, 0, 0), (80, 100, 5)), ((-50, -50, -50), (-40, -40, -40))]:
+        box_min, box_max = np.minimum(*box), np.maximum(*box)
+        expected = []
+        for position, primitive in enumerate(primitives["shape_primitive_list"]):
+            bounds = primitive_bounding_sphere(primitive)
+            if bounds is None or np.sum((bounds[0] - np.clip(bounds[0], box_min, box_max)) ** 2) <= bounds[1] ** 2:
+                expected.append(position)
+        assert query_primitive_index(index, box) == expected
+
+
+def test_geometric_segmentation_box_read(tmp_path: Path):
+    db = _create_entry(tmp_path)
+    primitives = _random_primitives(60, 1)
+    path = db.path_to_geometric_segmentation("emdb", "emd-1", "primitives/a", 0)
+    path.parent.mkdir(parents=True)
+    path.write_text(json.dumps(primitives))
+    db.path_to_geometric_segmentation_index("emdb", "emd-1", "primitives/a", 0).write_text(
+        json.dumps(build_primitive_index(primitives))
+    )
+
+    async def read_box(max_primitives=None):
+        with db.read("emdb", "emd-1") as context:
+            return await context.read_geometric_segmentation_box(
+                segmentation_id="primitives/a", time=0, box=((0, 0, 0), (50, 50, 50)), max_primitives=max_primitives
+            )
+
+    in_box = asyncio.run(read_box())["shape_primitive_list"]
+    expected = [primitives["shape_primitive_list"][p] for p in query_primitive_index(build_primitive_index(primitives), ((0, 0, 0), (50, 50, 50)))]
+    assert in_box == expected
+    assert 0 < len(in_box) < 60
+    assert asyncio.run(read_box(max_primitives=3))["shape_primitive_list"] == in_box[:3]
+
+
+def test_geometric_segmentation_box_read_checks_index_version(tmp_path: Path):
+    db = _create_entry(tmp_path)
+    context = VolumeAndSegmentationContext(db, "emdb", "emd-1", tmp_path / "work")
+    old, new = _random_primitives(60, 1), _random_primitives(20, 2)
+    context._save_geometric_segmentation([{"segmentation_id": "a", "primitives": {"0": new}}])
+    # store is moved out of the entry while it is being edited
+    _write_store(db)
+    index_path = db.path_to_geometric_segmentation_index("emdb", "emd-1", "a", 0)
+    stored_index = json.loads(index_path.read_text())
+    assert stored_index["primitives_version"] is not None
+
+    async def read_box():
+        with db.read("emdb", "emd-1") as reader:
+            return await reader.read_geometric_segmentation_box(segmentation_id="a", time=0, box=((0, 0, 0), (100, 100, 100)))
+
+    expected = [new["shape_primitive_list"][p] for p in query_primitive_index(build_primitive_index(new), ((0, 0, 0), (100, 100, 100)))]
+    assert asyncio.run(read_box())["shape_primitive_list"] == expected
+    # version is not served with primitives
+    with db.read("emdb", "emd-1") as reader:
+        assert asyncio.run(reader.read_geometric_segmentation(segmentation_id="a", time=0)) == new
+
+    # index of other primitives (e.g. not replaced yet during update) is not used
+    index_path.write_text(json.dumps(build_primitive_index(old, "other")))
+    assert asyncio.run(read_box())["shape_primitive_list"] == expected
+    # index built from primitives is cached with them
+    with db.read("emdb", "emd-1") as reader:
+        timeframe = reader._read_timeframe_primitives("a", 0)
+    assert timeframe.built_index() is timeframe.built_index()
+    assert timeframe.built_index()["primitives_version"] == stored_index["primitives_version"]
@@ -0,0 +1,104 @@
+import asyncio
+import json
+import multiprocessing
+from pathlib import Path
+
+from cellstar_db.file_system.constants import ANNOTATION_METADATA_FILENAME
+from cellstar_db.file_system.db import FileSystemVolumeServerDB
+from cellstar_db.file_system.keyword_index import KeywordIndex, entry_tokens
+
+
+def _annotations(name: str, description_name: str):
+    return {
+        "name": name,
+        "entry_id": {"source_db_name": "emdb", "source_db_id": "x"},
+        "descriptions": {
+            "d1": {"id": "d1", "target_kind": "lattice", "name": description_name, "external_references": [], "details": None}
+        },
+        "segment_annotations": [],
+        "details": None,
+    }
+
+
+def _create_db(tmp_path: Path) -> FileSystemVolumeServerDB:
+    db = FileSystemVolumeServerDB(folder=tmp_path, store_type="directory")
+    for namespace, key, annotations in [
+        ("emdb", "emd-1832", _annotations("Ribosome of yeast", "Large subunit")),
+        ("emdb", "emd-1547", _annotations("Actin filament", "Ribosome bound")),
+        ("empiar", "empiar-10070", None),
+    ]:
+        path = tmp_path / namespace / key
+        path.mkdir(parents=True)
+        if annotations is not None:
+            (path / ANNOTATION_METADATA_FILENAME).write_text(json.dumps(annotations))
+    return db
+
+
+def test_keyword_index_search(tmp_path: Path):
+    db = _create_db(tmp_path)
+    asyncio.run(db.build_keyword_index())
+
+    # entry name is ranked above description name
+    assert asyncio.run(db.search_entries("emdb", "ribosome")) == ["emd-1832", "emd-1547"]
+    # all tokens must match, prefixes of tokens match
+    assert asyncio.run(db.search_entries("emdb", "RIBO subunit")) == ["emd-1832"]
+    assert asyncio.run(db.search_entries("emdb", "183")) == ["emd-1832"]
+    assert asyncio.run(db.search_entries("empiar", "empiar-10070")) == ["empiar-10070"]
+    assert asyncio.run(db.search_entries("emdb", "nothing")) == []
+
+
+def test_keyword_index_updated_by_annotation_edits(tmp_path: Path):
+    db = _create_db(tmp_path)
+    asyncio.run(db.build_keyword_index())
+    assert asyncio.run(db.search_entries("emdb", "microtubule")) == []
+
+    with db.edit_annotations("emdb", "emd-1547") as context:
+        asyncio.run(context.update_annotations_json(_annotations("Microtubule", "Tubulin")))
+    assert asyncio.run(db.search_entries("emdb", "microtubule")) == ["emd-1547"]
+    assert asyncio.run(db.search_entries("emdb", "ribosome")) == ["emd-1832"]
+
+    asyncio.run(db.delete("emdb", "emd-1832"))
+    assert asyncio.run(db.search_entries("emdb", "ribosome")) == []
+
+
+def test_keyword_index_remove_entry():
+    index = KeywordIndex.empty()
+    index.update_entry("emdb", "emd-1", entry_tokens("emd-1", None))
+    index.update_entry("emdb", "emd-2", entry_tokens("emd-2", None))
+    index.update_entry("emdb", "emd-1", None)
+    assert index.search("emdb", "emd") == ["emd-2"]
+    assert "1" not in index.data["namespaces"]["emdb"]["tokens"]
+
+
+def test_keyword_index_update_without_index_keeps_other_entries(tmp_path: Path):
+    db = _create_db(tmp_path)
+    # DB built before the keyword index existed, first annotation edit must not drop other entries
+    with db.edit_annotations("emdb", "emd-1547") as context:
+        asyncio.run(context.update_annotations_json(_annotations("Ribosome tunnel", "Exit")))
+    assert asyncio.run(db.search_entries("emdb", "ribosome")) == ["emd-1547", "emd-1832"]
+    assert asyncio.run(db.search_entries("empiar", "10070")) == ["empiar-10070"]
+
+
+def _update_entries(folder: Path, keys: list[str]):
+    db = FileSystemVolumeServerDB(folder=folder, store_type="directory")
+    for key in keys:
+        path = folder / "emdb" / key
+        path.mkdir(parents=True)
+        (path / ANNOTATION_METADATA_FILENAME).write_text(json.dumps(_annotations("Proteasome", key)))
+        db.update_keyword_index("emdb", key)
+
+
+def test_keyword_index_concurrent_processes(tmp_path: Path):
+    db = _create_db(tmp_path)
+    asyncio.run(db.build_keyword_index())
+
+    keys = [[f"emd-{p}{i}" for i in range(10)] for p in range(1, 5)]
+    processes = [multiprocessing.Process(target=_update_entries, args=(tmp_path, k)) for k in keys]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+        assert process.exitcode == 0
+
+    assert asyncio.run(db.search_entries("emdb", "proteasome")) == sorted(k for ks in keys for k in ks)
+    assert asyncio.run(db.search_entries("emdb", "ribosome")) == ["emd-1832", "emd-1547"]
@@ -0,0 +1,27 @@
+import dask.array as da
+import numpy as np
+
+from cellstar_db.utils.quantization import decode_quantized_data, decode_quantized_data_lut, quantize_data
+
+
+def test_lut_decode_matches_arithmetic_decode():
+    data = np.random.default_rng(0).normal(size=(20, 15, 10)).astype(np.float32)
+    for dtype in ("u1", "u2"):
+        data_dict = quantize_data(da.from_array(data), dtype)
+        data_dict["data"] = data_dict["data"].compute()
+
+        decoded = decode_quantized_data_lut(data_dict)
+        expected = decode_quantized_data({**data_dict, "data": da.from_array(data_dict["data"])}).compute()
+
+        assert decoded.dtype == np.float32
+        assert np.allclose(decoded, expected, rtol=1e-5, atol=1e-5)
+        assert np.allclose(decoded, data, atol=0.05)
+
+
+def test_lut_decode_into_preallocated_output():
+    data = np.arange(64, dtype=np.float32).reshape(4, 4, 4)
+    data_dict = quantize_data(da.from_array(data), "u1")
+    data_dict["data"] = data_dict["data"].compute()
+    out = np.empty(data.shape, dtype=np.float32)
+
+    assert decode_quantized_data_lut(data_dict, out=out) is out
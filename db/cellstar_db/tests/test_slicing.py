@@ -0,0 +1,38 @@
+import numpy as np
+import zarr
+
+from cellstar_db.file_system.chunk_cache import CachedChunkArray, ChunkCache
+from cellstar_db.file_system.slicing import slice_boxes_chunk_aligned, slice_chunk_aligned, slice_many_chunk_aligned
+
+
+def test_slice_chunk_aligned():
+    data = np.arange(30 * 17 * 9, dtype=np.float32).reshape(30, 17, 9)
+    arr = CachedChunkArray(zarr.array(data, chunks=(8, 8, 8)), entry="test", cache=ChunkCache())
+
+    for box in (((0, 0, 0), (29, 16, 8)), ((3, 5, 1), (20, 9, 7)), ((9, 9, 2), (9, 9, 2))):
+        expected = data[box[0][0]:box[1][0] + 1, box[0][1]:box[1][1] + 1, box[0][2]:box[1][2] + 1]
+        assert np.array_equal(slice_chunk_aligned(arr, box), expected)
+
+
+def test_slice_many_chunk_aligned():
+    data = [np.random.default_rng(i).random((20, 11, 9), dtype=np.float32) for i in range(3)]
+    arrs = [CachedChunkArray(zarr.array(d, chunks=(8, 8, 8)), entry=("test", i), cache=ChunkCache()) for i, d in enumerate(data)]
+
+    box = ((2, 3, 1), (17, 10, 6))
+    slices = slice_many_chunk_aligned(arrs, box)
+    for d, s in zip(data, slices):
+        assert np.array_equal(s, d[2:18, 3:11, 1:7])
+
+
+def test_slice_boxes_chunk_aligned():
+    data = np.arange(40 * 20 * 10, dtype=np.int32).reshape(40, 20, 10)
+    cache = ChunkCache()
+    arr = CachedChunkArray(zarr.array(data, chunks=(8, 8, 8)), entry="test", cache=cache)
+
+    boxes = [((0, 0, 0), (9, 9, 9)), ((5, 5, 5), (12, 15, 9)), ((30, 2, 0), (39, 19, 3))]
+    slices = slice_boxes_chunk_aligned([(arr, box) for box in boxes])
+    for box, s in zip(boxes, slices):
+        assert np.array_equal(s, data[box[0][0]:box[1][0] + 1, box[0][1]:box[1][1] + 1, box[0][2]:box[1][2] + 1])
+
+    # chunks shared by the first two boxes are decoded only once
+    assert cache.stats()["misses"] == len(cache)
@@ -0,0 +1,51 @@
+import os
+import time
+from pathlib import Path
+
+import numpy as np
+import zarr
+
+from cellstar_db.file_system.store_pool import StorePool
+
+
+def _create_zip_store(path: Path):
+    store = zarr.ZipStore(str(path), mode="w", compression=0, allowZip64=True)
+    root = zarr.group(store=store)
+    root.create_dataset("volume_data/1/0/0", data=np.arange(27).reshape(3, 3, 3))
+    store.close()
+
+
+def test_store_pool_reuses_and_evicts(tmp_path: Path):
+    paths = [tmp_path / f"{i}.zip" for i in range(2)]
+    for p in paths:
+        _create_zip_store(p)
+
+    pool = StorePool(store_type="zip", max_open_files=1)
+    first = pool.acquire("emdb", "0", paths[0])
+    pool.release(first)
+    assert pool.acquire("emdb", "0", paths[0]) is first
+
+    # evicted while still in use, must stay readable until released
+    second = pool.acquire("emdb", "1", paths[1])
+    assert len(pool) == 1
+    assert first.evicted
+    assert first.root["volume_data/1/0/0"][0, 0, 2] == 2
+    pool.release(first)
+    pool.release(second)
+
+
+def test_store_pool_reopens_on_mtime_change(tmp_path: Path):
+    path = tmp_path / "data.zip"
+    _create_zip_store(path)
+
+    pool = StorePool(store_type="zip")
+    first = pool.acquire("emdb", "0", path)
+    pool.release(first)
+
+    later = time.time_ns() + 10**9
+    os.utime(path, ns=(later, later))
+    second = pool.acquire("emdb", "0", path)
+    pool.release(second)
+
+    assert second is not first
+    assert first.evicted
@@ -0,0 +1,137 @@
+import math
+from typing import Optional, Tuple, TypedDict
+
+import numpy as np
+
+from cellstar_db.models import ShapePrimitiveBase, ShapePrimitiveData, ShapePrimitiveKind
+
+
+class PrimitiveIndex(TypedDict):
+    """
+    Uniform grid over bounding sphere centers of shape primitives of one timeframe.
+    Primitives are referred to by their position in shape_primitive_list
+    """
+    origin: tuple[float, float, float]
+    cell_size: float
+    dimensions: tuple[int, int, int]
+    # "i,j,k" => positions of primitives with bounding sphere center in that cell
+    cells: dict[str, list[int]]
+    # primitives larger than cell or without known bounds, tested on every query
+    always: list[int]
+    # bounding sphere (x, y, z, radius) of each primitive, None if unknown (e.g. tube)
+    spheres: list[Optional[tuple[float, float, float, float]]]
+    # version of primitives the index was built for (see GEOMETRIC_SEGMENTATION_VERSION_KEY), None if not stored
+    primitives_version: Optional[str]
+
+
+def primitive_bounding_sphere(primitive: ShapePrimitiveBase) -> Optional[Tuple[np.ndarray, float]]:
+    """
+    Returns center and radius of a sphere enclosing the primitive, None for unsupported kinds.
+    NOTE: box and pyramid are assumed to span -scaling..scaling around translation
+    and to be rotated around their center
+    """
+    kind = primitive["kind"]
+    if kind == ShapePrimitiveKind.sphere:
+        return np.asarray(primitive["center"], dtype=float), float(primitive["radius"])
+    if kind in (ShapePrimitiveKind.box, ShapePrimitiveKind.pyramid):
+        return np.asarray(primitive["translation"], dtype=float), float(np.linalg.norm(primitive["scaling"]))
+    if kind == ShapePrimitiveKind.cylinder:
+        start = np.asarray(primitive["start"], dtype=float)
+        end = np.asarray(primitive["end"], dtype=float)
+        radius = float(np.linalg.norm(end - start)) / 2 + max(primitive["radius_bottom"], primitive["radius_top"])
+        return (start + end) / 2, radius
+    if kind == ShapePrimitiveKind.ellipsoid:
+        # directions may not be normalized
+        scale = np.abs(primitive["radius_scale"]) * max(
+            1.0, float(np.linalg.norm(primitive["dir_major"])), float(np.linalg.norm(primitive["dir_minor"]))
+        )
+        return np.asarray(primitive["center"], dtype=float), float(np.linalg.norm(scale))
+    return None
+
+
+def build_primitive_index(primitives: ShapePrimitiveData, primitives_version: Optional[str] = None) -> PrimitiveIndex:
+    spheres: list[Optional[tuple[float, float, float, float]]] = []
+    for primitive in primitives["shape_primitive_list"]:
+        bounds = primitive_bounding_sphere(primitive)
+        spheres.append(None if bounds is None else (*bounds[0].tolist(), bounds[1]))
+
+    bounded = [i for i, s in enumerate(spheres) if s is not None]
+    if len(bounded) == 0:
+        return PrimitiveIndex(
+            origin=(0.0, 0.0, 0.0),
+            cell_size=1.0,
+            dimensions=(1, 1, 1),
+            cells={},
+            always=list(range(len(spheres))),
+            spheres=spheres,
+            primitives_version=primitives_version,
+        )
+
+    centers = np.array([spheres[i][:3] for i in bounded])
+    origin = centers.min(axis=0)
+    extent = float((centers.max(axis=0) - origin).max())
+    # about one primitive per cell when centers are spread uniformly
+    cell_size = extent / math.ceil(len(bounded) ** (1 / 3)) if extent > 0 else 1.0
+    dimensions = np.floor((centers.max(axis=0) - origin) / cell_size).astype(int) + 1
+
+    cells: dict[str, list[int]] = {}
+    always = [i for i, s in enumerate(spheres) if s is None]
+    for i, center in zip(bounded, centers):
+        if spheres[i][3] > cell_size:
+            always.append(i)
+            continue
+        cell = np.minimum(np.floor((center - origin) / cell_size).astype(int), dimensions - 1)
+        cells.setdefault(",".join(str(c) for c in cell), []).append(i)
+
+    return PrimitiveIndex(
+        origin=tuple(origin.tolist()),
+        cell_size=cell_size,
+        dimensions=tuple(dimensions.tolist()),
+        cells=cells,
+        always=sorted(always),
+        spheres=spheres,
+        primitives_version=primitives_version,
+    )
+
+
+def query_primitive_index(
+    index: PrimitiveIndex, box: Tuple[Tuple[float, float, float], Tuple[float, float, float]]
+) -> list[int]:
+    """
+    Returns positions (ascending) of primitives whose bounding sphere intersects the box,
+    primitives without known bounds are always returned
+    """
+    box_min = np.minimum(box[0], box[1]).astype(float)
+    box_max = np.maximum(box[0], box[1]).astype(float)
+    origin = np.asarray(index["origin"], dtype=float)
+    cell_size = index["cell_size"]
+    dimensions = np.asarray(index["dimensions"])
+
+    # primitives in cells are not larger than cell, so their centers are at most one cell_size from the box
+    lo = np.maximum(np.floor((box_min - cell_size - origin) / cell_size).astype(int), 0)
+    hi = np.minimum(np.floor((box_max + cell_size - origin) / cell_size).astype(int), dimensions - 1)
+
+    candidates = list(index["always"])
+    if np.all(lo <= hi):
+        if int(np.prod(hi - lo + 1)) < len(index["cells"]):
+            for i in range(lo[0], hi[0] + 1):
+                for j in range(lo[1], hi[1] + 1):
+                    for k in range(lo[2], hi[2] + 1):
+                        candidates.extend(index["cells"].get(f"{i},{j},{k}", ()))
+        else:
+            for cell, positions in index["cells"].items():
+                c = np.fromiter(cell.split(","), dtype=int)
+                if np.all(lo <= c) and np.all(c <= hi):
+                    candidates.extend(positions)
+
+    result = []
+    for position in sorted(candidates):
+        sphere = index["spheres"][position]
+        if sphere is None:
+            result.append(position)
+            continue
+        center = np.asarray(sphere[:3])
+        closest = np.clip(center, box_min, box_max)
+        if float(np.sum((center - closest) ** 2)) <= sphere[3] ** 2:
+            result.append(position)
+    return result
@@ -1,4 +1,5 @@
-from typing import Union
+from functools import lru_cache
+from typing import Optional, Union
 
 import dask.array as da
 import numpy as np
@@ -66,6 +67,10 @@ def quantize_data(
 
 
 def decode_quantized_data(data_dict: dict) -> Union[da.Array, np.ndarray]:
+    data = data_dict["data"]
+    if isinstance(data, np.ndarray) and data.dtype in (np.uint8, np.uint16):
+        return decode_quantized_data_lut(data_dict)
+
     # this will decode back to log data
     delta = (data_dict["max"] - data_dict["min"]) / (data_dict["num_steps"] - 1)
     log_data = data_dict["data"].astype(dtype=data_dict["src_type"])
@@ -83,6 +88,51 @@ def decode_quantized_data(data_dict: dict) -> Union[da.Array, np.ndarray]:
     return original_data
 
 
+def decode_quantized_data_lut(data_dict: dict, out: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Decodes quantized numpy array (u1 or u2 codes) with a single np.take from the lookup table
+    of all possible codes, optionally into preallocated output array
+    """
+    codes: np.ndarray = data_dict["data"]
+    lut = decode_lookup_table(
+        min_value=data_dict["min"],
+        max_value=data_dict["max"],
+        num_steps=data_dict["num_steps"],
+        to_remove_negatives=data_dict["to_remove_negatives"],
+        src_type=data_dict["src_type"],
+        code_type=codes.dtype.str,
+    )
+    if out is None:
+        out = np.empty(codes.shape, dtype=lut.dtype)
+    # NOTE: lut covers every code, so clip never changes indices; unlike default mode='raise'
+    # it lets np.take write directly into out without an intermediate buffer
+    np.take(lut, codes, out=out, mode="clip")
+    return out
+
+
+@lru_cache(maxsize=256)
+def decode_lookup_table(
+    min_value: float,
+    max_value: float,
+    num_steps: int,
+    to_remove_negatives: Union[int, float],
+    src_type: str,
+    code_type: str,
+) -> np.ndarray:
+    """
+    Returns read-only table of decoded values for every code of code_type.
+    Cached by quantization parameters (stored in array attrs), so it is computed once per array
+    """
+    # float64 source data stays float64, everything else is decoded to float32
+    output_dtype = np.float64 if np.dtype(src_type) == np.float64 else np.float32
+    delta = (max_value - min_value) / (num_steps - 1)
+    codes = np.arange(np.iinfo(np.dtype(code_type)).max + 1, dtype=np.float64)
+    lut = np.exp(codes * delta + min_value) - 1 + to_remove_negatives
+    lut = lut.astype(output_dtype)
+    lut.flags.writeable = False
+    return lut
+
+
 def _convert_data_dict_to_python_dtypes(data_dict: dict) -> dict:
     for key in data_dict:
         if key != "data" and (
@@ -10,6 +10,10 @@ TEMP_ZARR_HIERARCHY_STORAGE_PATH = 'preprocessor/temp/temp_zarr_hierarchy_storag
 QUANTIZATION_DATA_DICT_ATTR_NAME = "quantization_data_dict"
 LATTICE_SEGMENTATION_DATA_GROUPNAME = "lattice_segmentation_data"
 MESH_SEGMENTATION_DATA_GROUPNAME = "mesh_segmentation_data"
+# all meshes of a detail lvl group concatenated into one array per component (pack_vertices etc.)
+MESH_PACK_ARRAYNAME_PREFIX = "pack_"
+MESH_PACK_OFFSETS_ARRAYNAME = "pack_offsets"
+MESH_PACK_COMPONENTS = ("vertices", "triangles", "normals")
 
 VOLUME_DATA_GROUPNAME = "volume_data"
 VOLUME_DATA_GROUPNAME_COPY = "volume_data_copy"
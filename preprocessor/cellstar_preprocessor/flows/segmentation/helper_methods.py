@@ -16,6 +16,11 @@ from cellstar_preprocessor.flows.common import (
     create_dataset_wrapper,
     decide_np_dtype,
 )
+from cellstar_preprocessor.flows.constants import (
+    MESH_PACK_ARRAYNAME_PREFIX,
+    MESH_PACK_COMPONENTS,
+    MESH_PACK_OFFSETS_ARRAYNAME,
+)
 from cellstar_preprocessor.flows.segmentation.category_set_downsampling_methods import (
     store_downsampling_levels_in_zarr,
 )
@@ -312,9 +317,53 @@ def store_mesh_data_in_zarr(
         for attr_name, attr_val in d[mesh_id]["attrs"].items():
             single_mesh_group.attrs[attr_name] = attr_val
 
+    if params_for_storing.pack_meshes:
+        store_mesh_pack_in_zarr(resolution_gr, params_for_storing)
+
     return resolution_gr
 
 
+def store_mesh_pack_in_zarr(mesh_list_group: zarr.hierarchy.Group, params_for_storing: dict):
+    """
+    Stores all meshes of mesh list group (single detail lvl of a segment) as concatenated arrays
+    (one per mesh component) and offsets table, so that they can be read with a few array reads.
+    Offsets table has a row per mesh: mesh_id followed by start index of the mesh in each component array
+    """
+    meshes = list(mesh_list_group.groups())
+    if not meshes:
+        return
+
+    # normals may be missing in some inputs
+    components = [
+        c for c in MESH_PACK_COMPONENTS if all(c in mesh for _, mesh in meshes)
+    ]
+    offsets = np.zeros((len(meshes), 1 + len(components)), dtype=np.int64)
+    for component_index, component_name in enumerate(components):
+        arrays = [mesh[component_name][...] for _, mesh in meshes]
+        starts = np.cumsum([0] + [len(a) for a in arrays[:-1]])
+        offsets[:, 1 + component_index] = starts
+        packed = np.concatenate(arrays, axis=0)
+        create_dataset_wrapper(
+            zarr_group=mesh_list_group,
+            data=packed,
+            name=f"{MESH_PACK_ARRAYNAME_PREFIX}{component_name}",
+            shape=packed.shape,
+            dtype=packed.dtype,
+            params_for_storing=params_for_storing,
+        )
+    offsets[:, 0] = [int(mesh_id) for mesh_id, _ in meshes]
+
+    offsets_arr = create_dataset_wrapper(
+        zarr_group=mesh_list_group,
+        data=offsets,
+        name=MESH_PACK_OFFSETS_ARRAYNAME,
+        shape=offsets.shape,
+        dtype=offsets.dtype,
+        params_for_storing=params_for_storing,
+    )
+    offsets_arr.attrs["components"] = components
+
+
 def simplify_meshes(
     mesh_list_group: zarr.hierarchy.Group, ratio: float, segment_id: int
 ):
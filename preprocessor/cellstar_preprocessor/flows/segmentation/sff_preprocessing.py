@@ -14,6 +14,7 @@ from cellstar_preprocessor.flows.segmentation.helper_methods import (
     lattice_data_to_np_arr,
     make_simplification_curve,
     map_value_to_segment_id,
+    store_mesh_pack_in_zarr,
     store_segmentation_data_in_zarr_structure,
     write_mesh_component_data_to_zarr_arr,
 )
@@ -132,3 +133,6 @@ def _process_mesh_segmentation_data(
                 ] = single_mesh_group.vertices.attrs["num_vertices"]
                 single_mesh_group.attrs["area"] = vedo_mesh_obj.area()
                 # single_mesh_group.attrs['volume'] = vedo_mesh_obj.volume()
+
+            if params_for_storing.pack_meshes:
+                store_mesh_pack_in_zarr(single_detail_lvl_group, params_for_storing)
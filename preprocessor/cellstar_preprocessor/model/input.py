@@ -76,6 +76,14 @@ class StoringParams(BaseModel):
     )
     # we use only 'zip'
     store_type: str = "zip"
+    # additionally store all meshes of each segment and detail lvl as one pack of concatenated arrays
+    pack_meshes: bool = False
+
+
+class BakedResponsesParams(BaseModel):
+    # responses of the default view are rendered at this max_points and mesh detail lvl
+    max_points: int = 1000000
+    mesh_detail_lvl: int = 5
 
 
 class EntryData(BaseModel):
@@ -105,6 +113,8 @@ class PreprocessorInput(BaseModel):
     # add_segmentation_to_entry: bool = False
     # add_custom_annotations: bool = False
     custom_data: Optional[dict[str, Any]]
+    # responses of the default view are stored with the entry if provided
+    baked_responses: Optional[BakedResponsesParams] = None
 
 
 DEFAULT_PREPROCESSOR_INPUT = PreprocessorInput(
@@ -34,6 +34,8 @@ import typer
 import zarr
 
 from cellstar_db.file_system.db import FileSystemVolumeServerDB
+from cellstar_query.core.baked import bake_default_responses
+from cellstar_query.core.service import VolumeServerService
 from pydantic import BaseModel
 from typing_extensions import Annotated
 from cellstar_db.models import AnnotationsMetadata, DescriptionData, GeometricSegmentationData, Metadata, SegmentAnnotationData
@@ -98,6 +100,7 @@ from cellstar_preprocessor.flows.volume.volume_downsampling import (
 )
 from cellstar_preprocessor.model.input import (
     OME_ZARR_PREPROCESSOR_INPUT,
+    BakedResponsesParams,
     DownsamplingParams,
     EntryData,
     InputKind,
@@ -880,7 +883,7 @@ class Preprocessor:
         self._execute_tasks(tasks)
         return
 
-    def store_to_db(self):
+    async def store_to_db(self):
         new_db_path = Path(self.preprocessor_input.db_path)
         if new_db_path.is_dir() == False:
             new_db_path.mkdir()
@@ -925,6 +928,27 @@ class Preprocessor:
 
         print("Data stored to db")
 
+        if self.preprocessor_input.baked_responses is not None:
+            await self._bake_responses(db, self.preprocessor_input.baked_responses)
+
+    async def _bake_responses(self, db: FileSystemVolumeServerDB, params: BakedResponsesParams):
+        # NOTE: must run after all data of the entry is stored, baked responses are bound to its data version
+        namespace = self.preprocessor_input.entry_data.source_db
+        key = self.preprocessor_input.entry_data.entry_id
+        volume_server = VolumeServerService(db)
+        try:
+            responses = await bake_default_responses(
+                volume_server,
+                namespace,
+                key,
+                max_points=params.max_points,
+                mesh_detail_lvl=params.mesh_detail_lvl,
+            )
+        finally:
+            volume_server.executor.shutdown()
+        await db.store_baked_responses(namespace, key, responses)
+        print(f"{len(responses)} responses baked")
+
 async def main_preprocessor(
     mode: PreprocessorMode,
     quantize_dtype_str: typing.Optional[QuantizationDtype],
@@ -943,6 +967,8 @@ async def main_preprocessor(
     input_paths: list[str],
     input_kinds: list[InputKind],
     min_size_per_downsampling_lvl_mb: typing.Optional[float] = 5.0,
+    pack_meshes: bool = False,
+    baked_responses: typing.Optional[BakedResponsesParams] = None,
 ):
     if quantize_downsampling_levels:
         quantize_downsampling_levels = quantize_downsampling_levels.split(" ")
@@ -971,8 +997,9 @@ async def main_preprocessor(
             source_db_name=source_db_name,
         ),
         working_folder=Path(working_folder),
-        storing_params=StoringParams(),
+        storing_params=StoringParams(pack_meshes=pack_meshes),
         db_path=Path(db_path),
+        baked_responses=baked_responses,
     )
 
     for input_path, input_kind in zip(input_paths, input_kinds):
@@ -991,7 +1018,7 @@ async def main_preprocessor(
     
     await preprocessor.initialization(mode=mode)
     preprocessor.preprocessing()
-    preprocessor.store_to_db()
+    await preprocessor.store_to_db()
 
 
 app = typer.Typer()
@@ -1013,6 +1040,10 @@ def main(
     min_downsampling_level: Annotated[typing.Optional[int], typer.Option(None)] = None,
     max_downsampling_level: Annotated[typing.Optional[int], typer.Option(None)] = None,
     remove_original_resolution: Annotated[typing.Optional[bool], typer.Option(None)] = False,
+    pack_meshes: Annotated[bool, typer.Option(help="Store meshes of each segment and detail level as one pack of concatenated arrays")] = False,
+    bake_responses: Annotated[bool, typer.Option(help="Store responses of the default view (volume and segmentation cell, meshes) with the entry")] = False,
+    bake_max_points: Annotated[int, typer.Option()] = BakedResponsesParams().max_points,
+    bake_mesh_detail_lvl: Annotated[int, typer.Option()] = BakedResponsesParams().mesh_detail_lvl,
     entry_id: str = typer.Option(default=...),
     source_db: str = typer.Option(default=...),
     source_db_id: str = typer.Option(default=...),
@@ -1043,6 +1074,8 @@ def main(
             min_downsampling_level=min_downsampling_level,
             max_downsampling_level=max_downsampling_level,
             remove_original_resolution=remove_original_resolution,
+            pack_meshes=pack_meshes,
+            baked_responses=BakedResponsesParams(max_points=bake_max_points, mesh_detail_lvl=bake_mesh_detail_lvl) if bake_responses else None,
             # add_segmentation_to_entry=add_segmentation_to_entry,
             # add_custom_annotations=add_custom_annotations
         )
@@ -0,0 +1,47 @@
+from cellstar_db.file_system.read_context import _read_mesh_pack
+from cellstar_preprocessor.flows.constants import MESH_PACK_OFFSETS_ARRAYNAME
+from cellstar_preprocessor.flows.segmentation.helper_methods import store_mesh_data_in_zarr
+from cellstar_preprocessor.model.input import StoringParams
+import numpy as np
+import zarr
+
+
+def _mesh_data(n_vertices: int, n_triangles: int, seed: int):
+    rng = np.random.default_rng(seed)
+    return {
+        "arrays": {
+            "vertices": rng.random((n_vertices, 3), dtype=np.float32),
+            "triangles": rng.integers(0, n_vertices, (n_triangles, 3), dtype=np.int32),
+            "normals": rng.random((n_triangles, 3), dtype=np.float32),
+        },
+        "attrs": {"num_vertices": n_vertices, "area": 1.0},
+    }
+
+
+def test_mesh_pack_matches_mesh_groups():
+    segment = zarr.group(store=zarr.MemoryStore())
+    mesh_data_dict = {
+        2: _mesh_data(5, 4, 0),
+        10: _mesh_data(7, 9, 1),
+        3: _mesh_data(3, 1, 2),
+    }
+
+    mesh_list_group = store_mesh_data_in_zarr(
+        mesh_data_dict, segment, detail_level=2, params_for_storing=StoringParams(pack_meshes=True)
+    )
+    assert MESH_PACK_OFFSETS_ARRAYNAME in mesh_list_group
+
+    packed = _read_mesh_pack(mesh_list_group)
+    # the same order as mesh groups
+    assert [m["mesh_id"] for m in packed] == [int(name) for name, _ in mesh_list_group.groups()]
+    for mesh in packed:
+        for component_name, arr in mesh_data_dict[mesh["mesh_id"]]["arrays"].items():
+            np.testing.assert_array_equal(mesh[component_name], arr)
+
+
+def test_mesh_pack_is_optional():
+    segment = zarr.group(store=zarr.MemoryStore())
+    mesh_list_group = store_mesh_data_in_zarr(
+        {1: _mesh_data(5, 4, 0)}, segment, detail_level=2, params_for_storing=StoringParams()
+    )
+    assert MESH_PACK_OFFSETS_ARRAYNAME not in mesh_list_group
@@ -0,0 +1,64 @@
+import argparse
+import asyncio
+import statistics
+from pathlib import Path
+from timeit import default_timer as timer
+
+from cellstar_db.file_system.chunk_cache import get_chunk_cache
+from cellstar_db.file_system.db import FileSystemVolumeServerDB
+from cellstar_preprocessor.flows.constants import DEFAULT_DB_PATH
+
+SLICING_MODES = ['native', 'zarr_colon', 'zarr_gbs', 'dask', 'dask_from_zarr', 'tensorstore']
+BOX_FRACTIONS = (0.1, 0.5, 1.0)
+
+
+def parse_script_args():
+    parser = argparse.ArgumentParser(description='Measures volume slicing time of each slicing mode')
+    parser.add_argument("--db_path", type=str, default=DEFAULT_DB_PATH, help='path to db folder')
+    parser.add_argument("--entries", type=str, nargs='+', required=True, help='entries as source/entry_id, e.g. emdb/emd-1832')
+    parser.add_argument("--modes", type=str, nargs='+', default=SLICING_MODES[:-1], choices=SLICING_MODES)
+    parser.add_argument("--repeats", type=int, default=5, help='number of measurements for each box and mode')
+    args = parser.parse_args()
+    return args
+
+
+async def _measure(db: FileSystemVolumeServerDB, source: str, entry_id: str, box, channel_id: str, mode: str, cold: bool) -> float:
+    if cold:
+        get_chunk_cache().clear()
+    start = timer()
+    with db.read(namespace=source, key=entry_id) as reader:
+        await reader.read_volume_slice(
+            down_sampling_ratio=1,
+            box=box,
+            channel_id=channel_id,
+            time=0,
+            mode=mode
+        )
+    return timer() - start
+
+
+async def benchmark_slicing_modes(db_path: Path, entries: list[str], modes: list[str], repeats: int):
+    db = FileSystemVolumeServerDB(db_path)
+    for entry in entries:
+        source, entry_id = entry.split('/')
+        metadata = await db.read_metadata(source, entry_id)
+        dims = metadata.sampled_grid_dimensions(1)
+        channel_id = metadata.json_metadata()['volumes']['channel_ids'][0]
+        print(f'ENTRY: {entry} {dims}')
+        for fraction in BOX_FRACTIONS:
+            box = ((0, 0, 0), tuple(max(0, int(fraction * d) - 1) for d in dims))
+            print(f'   BOX: {box}')
+            for mode in modes:
+                cold = [await _measure(db, source, entry_id, box, channel_id, mode, cold=True) for _ in range(repeats)]
+                warm = [await _measure(db, source, entry_id, box, channel_id, mode, cold=False) for _ in range(repeats)]
+                print(f'      {mode:15s} cold: {statistics.median(cold) * 1000:9.2f} ms   warm: {statistics.median(warm) * 1000:9.2f} ms')
+
+
+if __name__ == '__main__':
+    args = parse_script_args()
+    asyncio.run(benchmark_slicing_modes(
+        db_path=Path(args.db_path),
+        entries=args.entries,
+        modes=args.modes,
+        repeats=args.repeats
+    ))
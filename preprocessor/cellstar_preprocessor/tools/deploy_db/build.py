@@ -13,6 +13,7 @@ from pathlib import Path
 from typing import Optional
 
 # from _old.input_data_model import QuantizationDtype
+from cellstar_db.file_system.db import FileSystemVolumeServerDB
 from cellstar_db.models import InputForBuildingDatabase
 from cellstar_preprocessor.flows.constants import CSV_WITH_ENTRY_IDS_FILE, DB_BUILDING_PARAMETERS_JSON, DEFAULT_DB_PATH, TEMP_ZARR_HIERARCHY_STORAGE_PATH
 from cellstar_preprocessor.preprocess import PreprocessorMode, main_preprocessor
@@ -165,6 +166,9 @@ def build(args):
     # print('Input files have been downloaded')
     _preprocessor_external_wrapper(arguments_list)
 
+    # entries were indexed one by one as the workers stored them, index of the built DB is created in one pass
+    asyncio.run(FileSystemVolumeServerDB(Path(args.db_path)).build_keyword_index())
+
     # TODO: this should be done only after everything is build
     shutil.rmtree(temp_zarr_hierarchy_storage_path, ignore_errors=True)
 
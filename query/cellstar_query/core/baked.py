@@ -0,0 +1,88 @@
+from cellstar_query.core.response_cache import ResponseBytes
+from cellstar_query.core.service import VolumeServerService
+from cellstar_query.requests import MeshRequest, SegmentsMeshesRequest, VolumeRequestDataKind, VolumeRequestInfo
+
+DEFAULT_BAKED_MAX_POINTS = 1000000
+DEFAULT_BAKED_MESH_DETAIL_LVL = 5
+
+
+async def bake_default_responses(
+    volume_server: VolumeServerService,
+    source: str,
+    structure_id: str,
+    max_points: int = DEFAULT_BAKED_MAX_POINTS,
+    mesh_detail_lvl: int = DEFAULT_BAKED_MESH_DETAIL_LVL,
+) -> dict[str, bytes]:
+    """
+    Renders responses to the requests of a default view of the entry: volume cell of each channel
+    and cell of the first lattice segmentation (at the first timeframe and max_points),
+    meshes of all segments (each and all together) at mesh_detail_lvl.
+    Returns them by name under which the service looks them up (see VolumeServerDB.read_baked_response)
+    """
+    metadata = await volume_server.db.read_metadata(source, structure_id)
+    meta_js = metadata.json_metadata()
+    time = (meta_js["volumes"].get("time_info") or {}).get("start", 0)
+
+    responses: list[ResponseBytes] = []
+    for channel_id in meta_js["volumes"].get("channel_ids") or []:
+        responses.append(
+            await volume_server.get_volume_data(
+                VolumeRequestInfo(
+                    source=source,
+                    structure_id=structure_id,
+                    channel_id=channel_id,
+                    time=time,
+                    max_points=max_points,
+                    data_kind=VolumeRequestDataKind.volume,
+                )
+            )
+        )
+
+    lattice_ids = metadata.segmentation_lattice_ids() or []
+    if len(lattice_ids) > 0:
+        responses.append(
+            await volume_server.get_volume_data(
+                VolumeRequestInfo(
+                    source=source,
+                    structure_id=structure_id,
+                    segmentation_id=lattice_ids[0],
+                    time=time,
+                    max_points=max_points,
+                    data_kind=VolumeRequestDataKind.segmentation,
+                )
+            )
+        )
+
+    for segmentation_id in (meta_js.get("segmentation_meshes") or {}).get("segmentation_ids") or []:
+        # NOTE: meshes have no time
+        segments_levels = volume_server._extract_segments_detail_levels(metadata, timeframe=0, segmentation_id=segmentation_id)
+        if not segments_levels:
+            continue
+        for segment_id, levels in segments_levels.items():
+            if mesh_detail_lvl in levels:
+                responses.append(
+                    await volume_server.get_meshes_bcif(
+                        MeshRequest(
+                            source=source,
+                            structure_id=structure_id,
+                            segmentation_id=segmentation_id,
+                            segment_id=segment_id,
+                            detail_lvl=mesh_detail_lvl,
+                            time=0,
+                        )
+                    )
+                )
+        responses.append(
+            await volume_server.get_segments_meshes_bcif(
+                SegmentsMeshesRequest(
+                    source=source,
+                    structure_id=structure_id,
+                    segmentation_id=segmentation_id,
+                    detail_lvl=mesh_detail_lvl,
+                    time=0,
+                )
+            )
+        )
+
+    # strong ETag is the quoted response key hash
+    return {response.etag.strip('"'): bytes(response) for response in responses}
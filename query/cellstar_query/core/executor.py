@@ -0,0 +1,83 @@
+import asyncio
+import functools
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from enum import Enum
+from typing import Any, AsyncIterator, Callable, Coroutine, Iterator, Literal, Optional, TypeVar
+
+T = TypeVar("T")
+
+DEFAULT_CONCURRENCY_LIMITS = {
+    "volume": 4,
+    "segmentation": 4,
+    "mesh": 8,
+}
+
+
+class TaskKind(str, Enum):
+    volume = "volume"
+    segmentation = "segmentation"
+    mesh = "mesh"
+
+
+class BlockingTaskExecutor:
+    """
+    Runs blocking reads and CPU heavy encoding off the event loop.
+    Number of tasks of each kind running at the same time is limited,
+    so that big volume requests do not starve other requests.
+    Reads always run in a thread pool (read contexts hold open stores and cannot be pickled),
+    encoding runs either in the same thread pool or in a process pool
+    """
+
+    def __init__(
+        self,
+        kind: Literal["thread", "process"] = "thread",
+        max_workers: Optional[int] = None,
+        concurrency_limits: Optional[dict[str, int]] = None,
+    ):
+        if kind not in ("thread", "process"):
+            raise ValueError(f"executor kind is not supported: {kind}")
+
+        limits = {**DEFAULT_CONCURRENCY_LIMITS, **(concurrency_limits or {})}
+        self.kind = kind
+        self._semaphores = {TaskKind(k): asyncio.Semaphore(v) for k, v in limits.items()}
+        self._read_pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="volume-server-read")
+        self._encode_pool: Executor = (
+            ProcessPoolExecutor(max_workers=max_workers) if kind == "process" else self._read_pool
+        )
+
+    async def read(self, task_kind: TaskKind, coro: Coroutine[Any, Any, T]) -> T:
+        """
+        Runs read coroutine (e.g. DBReadContext.read_volume_slice) to completion in a worker thread
+        """
+        async with self._semaphores[task_kind]:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._read_pool, asyncio.run, coro)
+
+    async def encode(self, task_kind: TaskKind, fn: Callable[..., T], *args, **kwargs) -> T:
+        """
+        Runs blocking function (e.g. serialize_volume_slice) in the encoding pool.
+        With process pool fn and its arguments must be picklable
+        """
+        async with self._semaphores[task_kind]:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._encode_pool, functools.partial(fn, *args, **kwargs))
+
+    async def iterate(self, task_kind: TaskKind, iterator: Iterator[T]) -> AsyncIterator[T]:
+        """
+        Iterates blocking iterator (e.g. serialize_volume_slice_chunks) item by item in the read pool
+        (generators cannot be sent to process pool). The task kind limit is held only while an item is produced,
+        not while it is being sent, so slow clients do not block other reads and encodings
+        """
+        loop = asyncio.get_running_loop()
+        sentinel = object()
+        while True:
+            async with self._semaphores[task_kind]:
+                item = await loop.run_in_executor(self._read_pool, next, iterator, sentinel)
+            if item is sentinel:
+                return
+            yield item
+
+    def shutdown(self):
+        self._read_pool.shutdown(wait=False)
+        if self._encode_pool is not self._read_pool:
+            self._encode_pool.shutdown(wait=False)
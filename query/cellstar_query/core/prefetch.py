@@ -0,0 +1,172 @@
+import asyncio
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Hashable, Optional
+
+from cellstar_db.models import BoxSliceRequest, VolumeMetadata
+from cellstar_db.protocol import VolumeServerDB
+
+from cellstar_query.core.models import GridSliceBox
+
+DEFAULT_PREFETCH_MAX_BYTES = 64 * 1024**2
+
+
+class Prefetcher:
+    """
+    Tracks recent volume/segmentation requests of each client and entry and warms the chunk cache in background
+    for the requests likely to follow: the box shifted by one box-width along the last movement
+    and the next/previous timeframe. At most max_bytes of chunks are decoded for each observed request,
+    by a single background thread. Running prefetches are cancelled whenever a real request arrives
+    """
+
+    def __init__(self, db: VolumeServerDB, max_bytes: int = DEFAULT_PREFETCH_MAX_BYTES, max_history: int = 1024):
+        self.db = db
+        self.max_bytes = max_bytes
+        self.max_history = max_history
+        # (client, entry, data kind, channel, lattice) => time and box of the last request
+        self._history: OrderedDict[Hashable, tuple[int, GridSliceBox]] = OrderedDict()
+        # stop flags of scheduled or running prefetches
+        self._pending: set[threading.Event] = set()
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="prefetch")
+
+        self.scheduled = 0
+        self.cancelled = 0
+        self.prefetched_bytes = 0
+
+    def cancel(self):
+        with self._lock:
+            pending = list(self._pending)
+        for stop in pending:
+            if not stop.is_set():
+                stop.set()
+                self.cancelled += 1
+
+    def observe(
+        self,
+        client_id: Optional[str],
+        source: str,
+        structure_id: str,
+        data_kind: str,
+        channel_id: Optional[str],
+        lattice_id: Optional[str],
+        time: int,
+        box: GridSliceBox,
+        metadata: VolumeMetadata,
+    ):
+        """
+        Records request and schedules prefetch of its predicted successors
+        """
+        key = (client_id, source, structure_id, data_kind, channel_id, lattice_id)
+        previous = self._history.pop(key, None)
+        self._history[key] = (time, box)
+        while len(self._history) > self.max_history:
+            self._history.popitem(last=False)
+
+        predicted = self._predict(previous, time, box, metadata)
+        if not predicted:
+            return
+
+        requests: list[BoxSliceRequest] = []
+        for t, b in predicted:
+            common = {
+                "down_sampling_ratio": b.downsampling_rate,
+                "box": (b.bottom_left, b.top_right),
+                "time": t,
+            }
+            if data_kind != "segmentation" and channel_id is not None:
+                requests.append({"kind": "volume", "channel_id": channel_id, "lattice_id": None, **common})
+            if data_kind != "volume" and lattice_id is not None:
+                requests.append({"kind": "segmentation", "channel_id": None, "lattice_id": lattice_id, **common})
+
+        self._schedule(source, structure_id, requests)
+
+    def stats(self) -> dict:
+        return {
+            "scheduled": self.scheduled,
+            "cancelled": self.cancelled,
+            "pending": len(self._pending),
+            "prefetched_bytes": self.prefetched_bytes,
+        }
+
+    def shutdown(self):
+        self.cancel()
+        self._pool.shutdown(wait=False)
+
+    def _predict(
+        self, previous: Optional[tuple[int, GridSliceBox]], time: int, box: GridSliceBox, metadata: VolumeMetadata
+    ) -> list[tuple[int, GridSliceBox]]:
+        """
+        Returns (time, box) pairs of likely next requests, the most likely first
+        """
+        time_info = metadata.json_metadata()["volumes"].get("time_info") or {}
+        start, end = time_info.get("start", 0), time_info.get("end", 0)
+
+        time_step = 1
+        moved_box = None
+        if previous is not None:
+            previous_time, previous_box = previous
+            if previous_time != time:
+                time_step = 1 if time > previous_time else -1
+            elif previous_box.downsampling_rate == box.downsampling_rate:
+                moved_box = _shifted_box(previous_box, box, metadata)
+
+        predicted = []
+        if moved_box is not None:
+            predicted.append((time, moved_box))
+        for t in (time + time_step, time - time_step):
+            if start <= t <= end:
+                predicted.append((t, box))
+        return predicted
+
+    def _schedule(self, source: str, structure_id: str, requests: list[BoxSliceRequest]):
+        # NOTE: prefetches of previous requests are superseded
+        self.cancel()
+        stop = threading.Event()
+        with self._lock:
+            self._pending.add(stop)
+        self.scheduled += 1
+
+        def prefetch():
+            try:
+                if stop.is_set():
+                    return
+                with self.db.read(source, structure_id) as reader:
+                    read_bytes = asyncio.run(
+                        reader.prefetch_box_slices(requests, max_bytes=self.max_bytes, should_stop=stop.is_set)
+                    )
+                with self._lock:
+                    self.prefetched_bytes += read_bytes
+            except Exception as e:
+                logging.warning(f"prefetch of {source}/{structure_id} failed: {e}")
+            finally:
+                with self._lock:
+                    self._pending.discard(stop)
+
+        self._pool.submit(prefetch)
+
+def _shifted_box(previous: GridSliceBox, box: GridSliceBox, metadata: VolumeMetadata) -> Optional[GridSliceBox]:
+    """
+    Box moved by one box-width along each axis in which it moved since the previous request,
+    clipped to the grid. None if it did not move or the moved box is outside of the grid
+    """
+    direction = [
+        (b > p) - (b < p) for b, p in zip(box.bottom_left, previous.bottom_left)
+    ]
+    if not any(direction):
+        return None
+
+    dimensions = metadata.sampled_grid_dimensions(box.downsampling_rate)
+    bottom_left, top_right = [], []
+    for i in range(3):
+        size = box.top_right[i] - box.bottom_left[i] + 1
+        bl = max(0, box.bottom_left[i] + direction[i] * size)
+        tr = min(dimensions[i] - 1, box.top_right[i] + direction[i] * size)
+        if bl > tr:
+            return None
+        bottom_left.append(bl)
+        top_right.append(tr)
+
+    return GridSliceBox(downsampling_rate=box.downsampling_rate, bottom_left=tuple(bottom_left), top_right=tuple(top_right))
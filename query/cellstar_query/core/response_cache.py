@@ -0,0 +1,231 @@
+import asyncio
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import AsyncIterator, Hashable, Optional, Tuple, Union
+
+DEFAULT_RESPONSE_CACHE_SIZE_BYTES = 256 * 1024**2
+DEFAULT_RESPONSE_DISK_CACHE_SIZE_BYTES = 4 * 1024**3
+
+# normalized request, e.g. (source, entry id, data version, kind, ...)
+ResponseKey = Tuple[Hashable, ...]
+
+# part of every response key hash (ETags, disk cache and baked response names),
+# must be increased whenever serialized output of a request changes (e.g. new BinaryCIF categories or encodings)
+RESPONSE_FORMAT_VERSION = 2
+
+
+class ResponseBytes(bytes):
+    """
+    Serialized response together with its strong ETag, usable anywhere bytes are expected
+    """
+
+    etag: str
+
+    def __new__(cls, data: bytes, etag: str):
+        obj = super().__new__(cls, data)
+        obj.etag = etag
+        return obj
+
+
+class ResponseStream:
+    """
+    Response encoded in parts while it is being sent (too big to be cached or kept in memory at once),
+    chunks are encoded by BlockingTaskExecutor.iterate
+    """
+
+    def __init__(self, chunks: AsyncIterator[bytes], etag: str):
+        self.chunks = chunks
+        self.etag = etag
+
+
+class ProgressiveResponse:
+    """
+    Response sent as a sequence of complete parts of increasing detail (e.g. from the coarsest downsampling level),
+    each part with its own headers
+    """
+
+    def __init__(self, parts: AsyncIterator[Tuple[dict[str, str], Union[ResponseBytes, ResponseStream]]]):
+        self.parts = parts
+
+
+class NotModified(Exception):
+    """
+    Raised instead of computing the response if client already has the current version of it (If-None-Match)
+    """
+
+    def __init__(self, etag: str):
+        super().__init__(etag)
+        self.etag = etag
+
+
+def response_key_hash(key: ResponseKey) -> str:
+    return hashlib.blake2b(repr((RESPONSE_FORMAT_VERSION, key)).encode("utf-8"), digest_size=16).hexdigest()
+
+
+def response_etag(key: ResponseKey) -> str:
+    """
+    Strong ETag of response. Responses are deterministic for the same key
+    (which includes the data version of the entry) and RESPONSE_FORMAT_VERSION,
+    so the key hash identifies the exact bytes
+    """
+    return f'"{response_key_hash(key)}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = [t.strip() for t in if_none_match.split(",")]
+    # NOTE: If-None-Match uses weak comparison
+    return "*" in tags or etag in tags or f"W/{etag}" in tags
+
+
+class ResponseCache:
+    """
+    LRU cache of serialized responses with memory tier and optional disk tier, both bounded in bytes.
+    Responses evicted from memory stay on disk, disk hits are promoted back to memory
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = DEFAULT_RESPONSE_CACHE_SIZE_BYTES,
+        disk_path: Optional[Path] = None,
+        max_disk_bytes: int = DEFAULT_RESPONSE_DISK_CACHE_SIZE_BYTES,
+    ):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._responses: OrderedDict[str, ResponseBytes] = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.disk_path = disk_path
+        self.max_disk_bytes = max_disk_bytes
+        self.current_disk_bytes = 0
+        self._disk_files: OrderedDict[str, int] = OrderedDict()
+        if disk_path is not None:
+            disk_path.mkdir(parents=True, exist_ok=True)
+            self._load_disk_index()
+
+    async def get(self, key: ResponseKey) -> Optional[ResponseBytes]:
+        key_hash = response_key_hash(key)
+        with self._lock:
+            response = self._responses.get(key_hash)
+            if response is not None:
+                self._responses.move_to_end(key_hash)
+                self.hits += 1
+                return response
+
+        if self.disk_path is not None:
+            data = await asyncio.to_thread(self._read_from_disk, key_hash)
+            if data is not None:
+                response = ResponseBytes(data, f'"{key_hash}"')
+                self._put_to_memory(key_hash, response)
+                self.disk_hits += 1
+                return response
+
+        self.misses += 1
+        return None
+
+    async def put(self, key: ResponseKey, data: bytes) -> ResponseBytes:
+        key_hash = response_key_hash(key)
+        response = data if isinstance(data, ResponseBytes) else ResponseBytes(data, f'"{key_hash}"')
+        self._put_to_memory(key_hash, response)
+        if self.disk_path is not None and len(response) <= self.max_disk_bytes:
+            await asyncio.to_thread(self._write_to_disk, key_hash, response)
+        return response
+
+    def clear(self):
+        with self._lock:
+            self._responses.clear()
+            self.current_bytes = 0
+            for key_hash in list(self._disk_files):
+                self._remove_from_disk(key_hash)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "max_bytes": self.max_bytes,
+                "current_bytes": self.current_bytes,
+                "responses": len(self._responses),
+                "max_disk_bytes": self.max_disk_bytes if self.disk_path is not None else 0,
+                "current_disk_bytes": self.current_disk_bytes,
+                "disk_responses": len(self._disk_files),
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+            }
+
+    def _put_to_memory(self, key_hash: str, response: ResponseBytes):
+        if len(response) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._responses.pop(key_hash, None)
+            if previous is not None:
+                self.current_bytes -= len(previous)
+            self._responses[key_hash] = response
+            self.current_bytes += len(response)
+            while self.current_bytes > self.max_bytes:
+                _, evicted = self._responses.popitem(last=False)
+                self.current_bytes -= len(evicted)
+
+    def _file_path(self, key_hash: str) -> Path:
+        return self.disk_path / f"{key_hash}.bin"
+
+    def _load_disk_index(self):
+        files = []
+        for path in self.disk_path.glob("*.bin"):
+            stat = path.stat()
+            files.append((stat.st_mtime_ns, path.stem, stat.st_size))
+        # least recently used first
+        for _, key_hash, size in sorted(files):
+            self._disk_files[key_hash] = size
+            self.current_disk_bytes += size
+        with self._lock:
+            self._evict_from_disk()
+
+    def _read_from_disk(self, key_hash: str) -> Optional[bytes]:
+        with self._lock:
+            if key_hash not in self._disk_files:
+                return None
+            self._disk_files.move_to_end(key_hash)
+        try:
+            path = self._file_path(key_hash)
+            data = path.read_bytes()
+            os.utime(path)
+            return data
+        except FileNotFoundError:
+            with self._lock:
+                size = self._disk_files.pop(key_hash, None)
+                if size is not None:
+                    self.current_disk_bytes -= size
+            return None
+
+    def _write_to_disk(self, key_hash: str, data: bytes):
+        path = self._file_path(key_hash)
+        tmp_path = path.with_suffix(f".{threading.get_ident()}.tmp")
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, path)
+        with self._lock:
+            previous = self._disk_files.pop(key_hash, None)
+            if previous is not None:
+                self.current_disk_bytes -= previous
+            self._disk_files[key_hash] = len(data)
+            self.current_disk_bytes += len(data)
+            self._evict_from_disk()
+
+    def _evict_from_disk(self):
+        while self.current_disk_bytes > self.max_disk_bytes and self._disk_files:
+            key_hash = next(iter(self._disk_files))
+            self._remove_from_disk(key_hash)
+
+    def _remove_from_disk(self, key_hash: str):
+        size = self._disk_files.pop(key_hash)
+        self.current_disk_bytes -= size
+        try:
+            self._file_path(key_hash).unlink()
+        except FileNotFoundError:
+            pass
@@ -1,9 +1,10 @@
-import json
+import asyncio
+import heapq
 from collections import defaultdict
 from math import ceil, floor
-from typing import Optional, Tuple
+from typing import Awaitable, Callable, Optional, Tuple, Union
 
-from cellstar_db.models import GeometricSegmentationData, GeometricSegmentationJson, MeshesData, VolumeMetadata
+from cellstar_db.models import BoxSliceRequest, GeometricSegmentationData, GeometricSegmentationJson, MeshesData, ShapePrimitiveData, VolumeMetadata, VolumeSliceData
 from cellstar_db.protocol import VolumeServerDB
 
 from cellstar_query.requests import (
@@ -11,46 +12,136 @@ from cellstar_query.requests import (
     GeometricSegmentationRequest,
     MeshRequest,
     MetadataRequest,
+    SegmentsMeshesRequest,
+    VolumeChannelsRequestInfo,
     VolumeRequestBox,
     VolumeRequestDataKind,
+    VolumeRequestEncoding,
     VolumeRequestInfo,
+    VolumeRoisRequest,
+    VolumeTimeRangeRequestInfo,
 )
+from cellstar_query.core.executor import BlockingTaskExecutor, TaskKind
 from cellstar_query.core.models import GridSliceBox
+from cellstar_query.core.prefetch import Prefetcher
+from cellstar_query.core.response_cache import (
+    NotModified,
+    ProgressiveResponse,
+    ResponseBytes,
+    ResponseCache,
+    ResponseKey,
+    ResponseStream,
+    etag_matches,
+    response_etag,
+    response_key_hash,
+)
+from cellstar_query.core.single_flight import SingleFlight
 from cellstar_query.core.timing import Timing
-from cellstar_query.serialization.cif import serialize_meshes, serialize_volume_info, serialize_volume_slice
+from cellstar_query.serialization.cif import (
+    serialize_meshes,
+    serialize_roi_slices,
+    serialize_roi_slices_chunks,
+    serialize_segments_meshes,
+    serialize_shape_primitives,
+    serialize_volume_info,
+    serialize_volume_slice,
+    serialize_volume_slice_chunks,
+    serialize_volume_slices,
+    serialize_volume_slices_chunks,
+    serialize_volume_time_slices,
+    serialize_volume_time_slices_chunks,
+)
 
 __MAX_DOWN_SAMPLING_VALUE__ = 1000000
 
 
 class VolumeServerService:
-    def __init__(self, db: VolumeServerDB):
+    def __init__(
+        self,
+        db: VolumeServerDB,
+        executor: Optional[BlockingTaskExecutor] = None,
+        response_cache: Optional[ResponseCache] = None,
+        streaming_min_voxels: Optional[int] = None,
+        prefetcher: Optional[Prefetcher] = None,
+    ):
         self.db = db
-
-    async def _filter_entries_by_keyword(self, namespace: str, entries: list[str], keyword: str) -> list[str]:
-        filtered = []
-        for entry in entries:
-            if keyword in entry:
-                filtered.append(entry)
-                continue
-
-            annotations = await self.db.read_annotations(namespace, entry)
-            if keyword.lower() in json.dumps(annotations).lower():
-                filtered.append(entry)
-                continue
-
-        return filtered
+        # blocking reads and encoding are run off the event loop
+        self.executor = executor if executor is not None else BlockingTaskExecutor()
+        # serialized responses, no caching if None
+        self.response_cache = response_cache
+        # identical concurrent requests share one computation
+        self.single_flight: SingleFlight[ResponseBytes] = SingleFlight()
+        # volume responses of at least this many voxels are streamed (not cached), never if None
+        self.streaming_min_voxels = streaming_min_voxels
+        # warms chunk cache for likely next volume/segmentation requests, no prefetching if None
+        self.prefetcher = prefetcher
+
+    async def _cached_response(
+        self,
+        key: ResponseKey,
+        compute: Callable[[], Awaitable[bytes]],
+        if_none_match: Optional[str] = None,
+        baked: bool = False,
+    ) -> ResponseBytes:
+        """
+        Returns response for the normalized request key from cache or computes it,
+        concurrent requests with the same key wait for the same computation.
+        With baked=True, response stored at preprocessing time is used instead of computing it if there is one.
+        Raises NotModified if client already has it (its ETag is in if_none_match)
+        """
+        etag = response_etag(key)
+        if etag_matches(if_none_match, etag):
+            raise NotModified(etag)
+
+        async def compute_or_read_baked() -> bytes:
+            if baked:
+                data = await self._read_baked_response(key)
+                if data is not None:
+                    return data
+            return await compute()
+
+        async def get_or_compute() -> ResponseBytes:
+            if self.response_cache is None:
+                return ResponseBytes(await compute_or_read_baked(), etag)
+
+            cached = await self.response_cache.get(key)
+            if cached is not None:
+                return cached
+            return await self.response_cache.put(key, await compute_or_read_baked())
+
+        return await self.single_flight.do(key, get_or_compute)
+
+    async def _read_baked_response(self, key: ResponseKey) -> Optional[bytes]:
+        """
+        Baked responses are named by hash of the whole response key (starting with source, entry id
+        and data version), so a response baked for older data of the entry is never used
+        """
+        return await self.db.read_baked_response(key[0], key[1], response_key_hash(key))
+
+    def stats(self) -> dict:
+        return {
+            "response_cache": self.response_cache.stats() if self.response_cache is not None else None,
+            "single_flight": self.single_flight.stats(),
+            "prefetcher": self.prefetcher.stats() if self.prefetcher is not None else None,
+        }
 
     async def get_entries(self, req: EntriesRequest) -> dict[str, list[str]]:
         limit = req.limit
+        offset = req.offset
         entries: dict[str, list[str]] = {}
         if limit == 0:
             return entries
 
         sources = await self.db.list_sources()
         for source in sources:
-            retrieved = await self.db.list_entries(source, limit)
             if req.keyword:
-                retrieved = await self._filter_entries_by_keyword(source, retrieved, req.keyword)
+                # ranked by the keyword index, pages continue across sources
+                retrieved = await self.db.search_entries(source, req.keyword)
+                skipped = min(offset, len(retrieved))
+                offset -= skipped
+                retrieved = retrieved[skipped : skipped + limit]
+            else:
+                retrieved = await self.db.list_entries(source, limit)
 
             if len(retrieved) == 0:
                 continue
@@ -71,7 +162,22 @@ class VolumeServerService:
 
         return {"grid": grid.json_metadata(), "annotation": annotation}
 
-    async def get_volume_data(self, req: VolumeRequestInfo, req_box: Optional[VolumeRequestBox] = None) -> bytes:
+    async def get_volume_data(
+        self,
+        req: VolumeRequestInfo,
+        req_box: Optional[VolumeRequestBox] = None,
+        if_none_match: Optional[str] = None,
+        client_id: Optional[str] = None,
+        slice_box: Optional[GridSliceBox] = None,
+    ) -> Union[ResponseBytes, ResponseStream]:
+        """
+        Volume and/or segmentation data at the downsampling level decided by max_points,
+        or at the given slice_box (already converted to grid of its downsampling level)
+        """
+        if self.prefetcher is not None:
+            # background prefetching must not compete with real requests
+            self.prefetcher.cancel()
+
         metadata = await self.db.read_metadata(req.source, req.structure_id)
 
         lattice_ids = metadata.segmentation_lattice_ids() or []
@@ -80,7 +186,8 @@ class VolumeServerService:
         else:
             lattice_id = req.segmentation_id
 
-        slice_box = self._decide_slice_box(req.max_points, req_box, metadata)
+        if slice_box is None:
+            slice_box = self._decide_slice_box(req.max_points, req_box, metadata)
 
         if slice_box is None:
             # TODO: return empty result instead of exception?
@@ -92,34 +199,349 @@ class VolumeServerService:
         print(f"  Top Right: {slice_box.top_right}")
         print(f"  Volume: {slice_box.volume}")
 
-        with self.db.read(namespace=req.source, key=req.structure_id) as reader:
-            if req.data_kind == VolumeRequestDataKind.all:
-                db_slice = await reader.read_slice(
-                    lattice_id=lattice_id,
-                    down_sampling_ratio=slice_box.downsampling_rate,
-                    box=(slice_box.bottom_left, slice_box.top_right),
-                    channel_id=req.channel_id,
-                    time=req.time
+        key = (
+            req.source,
+            req.structure_id,
+            await self.db.data_version(req.source, req.structure_id),
+            "volume_data",
+            req.data_kind.value,
+            req.encoding.value,
+            slice_box.downsampling_rate,
+            tuple(slice_box.bottom_left),
+            tuple(slice_box.top_right),
+            req.time,
+            req.channel_id if req.data_kind != VolumeRequestDataKind.segmentation else None,
+            lattice_id if req.data_kind != VolumeRequestDataKind.volume else None,
+        )
+        task_kind = TaskKind.segmentation if req.data_kind == VolumeRequestDataKind.segmentation else TaskKind.volume
+
+        async def read_slice() -> VolumeSliceData:
+            decode_quantized = req.encoding != VolumeRequestEncoding.quantized
+            with self.db.read(namespace=req.source, key=req.structure_id) as reader:
+                if req.data_kind == VolumeRequestDataKind.all:
+                    db_slice = await self.executor.read(task_kind, reader.read_slice(
+                        lattice_id=lattice_id,
+                        down_sampling_ratio=slice_box.downsampling_rate,
+                        box=(slice_box.bottom_left, slice_box.top_right),
+                        channel_id=req.channel_id,
+                        time=req.time,
+                        decode_quantized=decode_quantized,
+                    ))
+                elif req.data_kind == VolumeRequestDataKind.volume:
+                    db_slice = await self.executor.read(task_kind, reader.read_volume_slice(
+                        down_sampling_ratio=slice_box.downsampling_rate,
+                        box=(slice_box.bottom_left, slice_box.top_right),
+                        channel_id=req.channel_id,
+                        time=req.time,
+                        decode_quantized=decode_quantized,
+                    ))
+                elif req.data_kind == VolumeRequestDataKind.segmentation:
+                    db_slice = await self.executor.read(task_kind, reader.read_segmentation_slice(
+                        lattice_id=lattice_id,
+                        down_sampling_ratio=slice_box.downsampling_rate,
+                        box=(slice_box.bottom_left, slice_box.top_right),
+                        time=req.time
+                    ))
+                else:
+                    # This should be validated on the Pydantic data model level, but one never knows...
+                    raise RuntimeError(f"{req.data_kind} is not a valid request data kind")
+
+            return db_slice
+
+        async def compute() -> bytes:
+            db_slice = await read_slice()
+            return await self.executor.encode(task_kind, serialize_volume_slice, db_slice, metadata, slice_box, req.encoding)
+
+        if self.streaming_min_voxels is not None and slice_box.volume >= self.streaming_min_voxels:
+            etag = response_etag(key)
+            if etag_matches(if_none_match, etag):
+                raise NotModified(etag)
+            response = await self.response_cache.get(key) if self.response_cache is not None else None
+            if response is None and req_box is None:
+                baked = await self._read_baked_response(key)
+                response = ResponseBytes(baked, etag) if baked is not None else None
+            if response is None:
+                # columns are encoded while the response is being sent
+                db_slice = await read_slice()
+                response = ResponseStream(
+                    self.executor.iterate(
+                        task_kind, serialize_volume_slice_chunks(db_slice, metadata, slice_box, req.encoding)
+                    ),
+                    etag,
                 )
-            elif req.data_kind == VolumeRequestDataKind.volume:
-                db_slice = await reader.read_volume_slice(
+        else:
+            # only cell queries are baked
+            response = await self._cached_response(key, compute, if_none_match, baked=req_box is None)
+
+        if self.prefetcher is not None:
+            self.prefetcher.observe(
+                client_id=client_id,
+                source=req.source,
+                structure_id=req.structure_id,
+                data_kind=req.data_kind.value,
+                channel_id=req.channel_id if req.data_kind != VolumeRequestDataKind.segmentation else None,
+                lattice_id=lattice_id if req.data_kind != VolumeRequestDataKind.volume else None,
+                time=req.time,
+                box=slice_box,
+                metadata=metadata,
+            )
+        return response
+
+    async def get_volume_data_progressive(
+        self,
+        req: VolumeRequestInfo,
+        req_box: Optional[VolumeRequestBox] = None,
+        client_id: Optional[str] = None,
+    ) -> ProgressiveResponse:
+        """
+        Same data as get_volume_data, delivered level by level from the coarsest stored downsampling
+        to the one decided by max_points. Each level is a complete response (cached like a regular one)
+        """
+        metadata = await self.db.read_metadata(req.source, req.structure_id)
+        slice_boxes = self._decide_progressive_slice_boxes(req.max_points, req_box, metadata)
+
+        if not slice_boxes:
+            raise RuntimeError("No data for request box")
+
+        async def parts():
+            for slice_box in slice_boxes:
+                response = await self.get_volume_data(req, req_box, client_id=client_id, slice_box=slice_box)
+                yield {"X-Downsampling-Rate": str(slice_box.downsampling_rate)}, response
+
+        return ProgressiveResponse(parts())
+
+    async def get_volume_channels_data(
+        self,
+        req: VolumeChannelsRequestInfo,
+        req_box: Optional[VolumeRequestBox] = None,
+        if_none_match: Optional[str] = None,
+    ) -> Union[ResponseBytes, ResponseStream]:
+        """
+        Volume data of several (or all) channels for the same box and time, one data block per channel
+        """
+        metadata = await self.db.read_metadata(req.source, req.structure_id)
+
+        available_channel_ids = metadata.json_metadata()["volumes"]["channel_ids"]
+        channel_ids = req.channel_ids if req.channel_ids is not None else available_channel_ids
+        unknown = [c for c in channel_ids if c not in available_channel_ids]
+        if unknown:
+            raise ValueError(f"Invalid channel_ids {unknown} (available channel_ids: {available_channel_ids})")
+
+        # NOTE: max_points applies to each channel, so all channels are at the same downsampling as single channel queries
+        slice_box = self._decide_slice_box(req.max_points, req_box, metadata)
+
+        if slice_box is None:
+            raise RuntimeError("No data for request box")
+
+        key = (
+            req.source,
+            req.structure_id,
+            await self.db.data_version(req.source, req.structure_id),
+            "volume_channels_data",
+            req.encoding.value,
+            slice_box.downsampling_rate,
+            tuple(slice_box.bottom_left),
+            tuple(slice_box.top_right),
+            req.time,
+            tuple(channel_ids),
+        )
+
+        async def read_slices() -> list[VolumeSliceData]:
+            with self.db.read(namespace=req.source, key=req.structure_id) as reader:
+                return await self.executor.read(TaskKind.volume, reader.read_volume_slices(
                     down_sampling_ratio=slice_box.downsampling_rate,
                     box=(slice_box.bottom_left, slice_box.top_right),
-                    channel_id=req.channel_id,
-                    time=req.time
-                )
-            elif req.data_kind == VolumeRequestDataKind.segmentation:
-                db_slice = await reader.read_segmentation_slice(
-                    lattice_id=lattice_id,
+                    channel_ids=channel_ids,
+                    time=req.time,
+                    decode_quantized=req.encoding != VolumeRequestEncoding.quantized,
+                ))
+
+        async def compute() -> bytes:
+            db_slices = await read_slices()
+            return await self.executor.encode(TaskKind.volume, serialize_volume_slices, db_slices, metadata, slice_box, req.encoding)
+
+        if self.streaming_min_voxels is not None and slice_box.volume * len(channel_ids) >= self.streaming_min_voxels:
+            etag = response_etag(key)
+            if etag_matches(if_none_match, etag):
+                raise NotModified(etag)
+            cached = await self.response_cache.get(key) if self.response_cache is not None else None
+            if cached is not None:
+                return cached
+            db_slices = await read_slices()
+            return ResponseStream(
+                self.executor.iterate(
+                    TaskKind.volume, serialize_volume_slices_chunks(db_slices, metadata, slice_box, req.encoding)
+                ),
+                etag,
+            )
+
+        return await self._cached_response(key, compute, if_none_match)
+
+    async def get_volume_time_range_data(
+        self,
+        req: VolumeTimeRangeRequestInfo,
+        req_box: Optional[VolumeRequestBox] = None,
+        if_none_match: Optional[str] = None,
+    ) -> Union[ResponseBytes, ResponseStream]:
+        """
+        Volume data of one channel for a range of timeframes at the same box and downsampling, one data block per timeframe
+        """
+        metadata = await self.db.read_metadata(req.source, req.structure_id)
+
+        time_info = metadata.json_metadata()["volumes"]["time_info"]
+        if req.time_start < time_info["start"] or req.time_end > time_info["end"]:
+            raise ValueError(
+                f"Invalid time range {req.time_start}-{req.time_end} (available timeframes: {time_info['start']}-{time_info['end']})"
+            )
+        times = list(range(req.time_start, req.time_end + 1))
+
+        # NOTE: max_points applies to each timeframe
+        slice_box = self._decide_slice_box(req.max_points, req_box, metadata)
+
+        if slice_box is None:
+            raise RuntimeError("No data for request box")
+
+        key = (
+            req.source,
+            req.structure_id,
+            await self.db.data_version(req.source, req.structure_id),
+            "volume_time_range_data",
+            req.encoding.value,
+            req.temporal_delta,
+            slice_box.downsampling_rate,
+            tuple(slice_box.bottom_left),
+            tuple(slice_box.top_right),
+            req.time_start,
+            req.time_end,
+            req.channel_id,
+        )
+
+        async def read_slices() -> list[VolumeSliceData]:
+            with self.db.read(namespace=req.source, key=req.structure_id) as reader:
+                return await self.executor.read(TaskKind.volume, reader.read_volume_time_slices(
                     down_sampling_ratio=slice_box.downsampling_rate,
                     box=(slice_box.bottom_left, slice_box.top_right),
-                    time=req.time
-                )
-            else:
-                # This should be validated on the Pydantic data model level, but one never knows...
-                raise RuntimeError(f"{req.data_kind} is not a valid request data kind")
+                    channel_id=req.channel_id,
+                    times=times,
+                    decode_quantized=req.encoding != VolumeRequestEncoding.quantized,
+                ))
+
+        async def compute() -> bytes:
+            db_slices = await read_slices()
+            return await self.executor.encode(
+                TaskKind.volume, serialize_volume_time_slices, db_slices, metadata, slice_box, req.encoding, req.temporal_delta
+            )
+
+        if self.streaming_min_voxels is not None and slice_box.volume * len(times) >= self.streaming_min_voxels:
+            etag = response_etag(key)
+            if etag_matches(if_none_match, etag):
+                raise NotModified(etag)
+            cached = await self.response_cache.get(key) if self.response_cache is not None else None
+            if cached is not None:
+                return cached
+            db_slices = await read_slices()
+            return ResponseStream(
+                self.executor.iterate(
+                    TaskKind.volume,
+                    serialize_volume_time_slices_chunks(db_slices, metadata, slice_box, req.encoding, req.temporal_delta),
+                ),
+                etag,
+            )
+
+        return await self._cached_response(key, compute, if_none_match)
+
+    async def get_volume_rois_data(
+        self, req: VolumeRoisRequest, if_none_match: Optional[str] = None
+    ) -> Union[ResponseBytes, ResponseStream]:
+        """
+        Volume and/or segmentation data of several regions of interest of one entry, read together
+        so that chunks shared by regions are decoded once
+        """
+        metadata = await self.db.read_metadata(req.source, req.structure_id)
+
+        lattice_ids = metadata.segmentation_lattice_ids() or []
+        channel_ids = metadata.json_metadata()["volumes"]["channel_ids"]
+        time_info = metadata.json_metadata()["volumes"]["time_info"]
+
+        box_requests: list[BoxSliceRequest] = []
+        # slice box and indices of its volume and segmentation requests for each roi
+        rois: list[tuple[GridSliceBox, Optional[int], Optional[int]]] = []
+        for roi in req.rois:
+            slice_box = self._decide_slice_box(req.max_points, roi, metadata)
+            if slice_box is None:
+                raise ValueError(f"No data for request box {roi.bottom_left}, {roi.top_right}")
+            if not time_info["start"] <= roi.time <= time_info["end"]:
+                raise ValueError(f"Invalid time {roi.time} (available timeframes: {time_info['start']}-{time_info['end']})")
+
+            volume_index, segmentation_index = None, None
+            common = {
+                "down_sampling_ratio": slice_box.downsampling_rate,
+                "box": (slice_box.bottom_left, slice_box.top_right),
+                "time": roi.time,
+            }
+            if roi.data_kind != VolumeRequestDataKind.segmentation:
+                channel_id = roi.channel_id if roi.channel_id is not None else channel_ids[0]
+                if channel_id not in channel_ids:
+                    raise ValueError(f"Invalid channel_id {channel_id} (available channel_ids: {channel_ids})")
+                volume_index = len(box_requests)
+                box_requests.append({"kind": "volume", "channel_id": channel_id, "lattice_id": None, **common})
+            if roi.data_kind != VolumeRequestDataKind.volume:
+                lattice_id = roi.segmentation_id if roi.segmentation_id is not None else next(iter(lattice_ids), None)
+                if lattice_id not in lattice_ids:
+                    raise ValueError(f"Invalid segmentation_id {lattice_id} (available segmentation_ids: {lattice_ids})")
+                segmentation_index = len(box_requests)
+                box_requests.append({"kind": "segmentation", "channel_id": None, "lattice_id": lattice_id, **common})
+            rois.append((slice_box, volume_index, segmentation_index))
+
+        key = (
+            req.source,
+            req.structure_id,
+            await self.db.data_version(req.source, req.structure_id),
+            "volume_rois_data",
+            req.encoding.value,
+            tuple(
+                (r["kind"], r["down_sampling_ratio"], tuple(r["box"][0]), tuple(r["box"][1]), r["time"], r["channel_id"], r["lattice_id"])
+                for r in box_requests
+            ),
+            tuple((v, s) for _, v, s in rois),
+        )
 
-        return serialize_volume_slice(db_slice, metadata, slice_box)
+        async def read_slices() -> list[tuple[VolumeSliceData, GridSliceBox]]:
+            with self.db.read(namespace=req.source, key=req.structure_id) as reader:
+                db_slices = await self.executor.read(TaskKind.volume, reader.read_box_slices(
+                    requests=box_requests,
+                    decode_quantized=req.encoding != VolumeRequestEncoding.quantized,
+                ))
+
+            roi_slices = []
+            for slice_box, volume_index, segmentation_index in rois:
+                roi_slice = {}
+                if volume_index is not None:
+                    roi_slice.update(db_slices[volume_index])
+                if segmentation_index is not None:
+                    roi_slice.update(db_slices[segmentation_index])
+                roi_slices.append((roi_slice, slice_box))
+            return roi_slices
+
+        async def compute() -> bytes:
+            roi_slices = await read_slices()
+            return await self.executor.encode(TaskKind.volume, serialize_roi_slices, roi_slices, metadata, req.encoding)
+
+        total_volume = sum(slice_box.volume for slice_box, _, _ in rois)
+        if self.streaming_min_voxels is not None and total_volume >= self.streaming_min_voxels:
+            etag = response_etag(key)
+            if etag_matches(if_none_match, etag):
+                raise NotModified(etag)
+            cached = await self.response_cache.get(key) if self.response_cache is not None else None
+            if cached is not None:
+                return cached
+            roi_slices = await read_slices()
+            return ResponseStream(
+                self.executor.iterate(TaskKind.volume, serialize_roi_slices_chunks(roi_slices, metadata, req.encoding)),
+                etag,
+            )
+
+        return await self._cached_response(key, compute, if_none_match)
 
     async def get_volume_info(self, req: MetadataRequest) -> bytes:
         metadata = await self.db.read_metadata(req.source, req.structure_id)
@@ -138,9 +560,63 @@ class VolumeServerService:
                 raise Exception("Exception in get_geometric_segmentation: " + str(e))
         return gs
 
-    async def get_meshes_bcif(self, req: MeshRequest) -> bytes:
+    async def get_geometric_segmentation_box(
+        self, req: GeometricSegmentationRequest, req_box: VolumeRequestBox
+    ) -> ShapePrimitiveData:
+        with self.db.read(req.source, req.structure_id) as context:
+            return await context.read_geometric_segmentation_box(
+                segmentation_id=req.segmentation_id,
+                time=req.time,
+                box=(req_box.bottom_left, req_box.top_right),
+                max_primitives=req.max_primitives,
+            )
+
+    async def get_geometric_segmentation_bcif(
+        self,
+        req: GeometricSegmentationRequest,
+        req_box: Optional[VolumeRequestBox] = None,
+        if_none_match: Optional[str] = None,
+    ) -> ResponseBytes:
+        """
+        Shape primitives of the timeframe (only those intersecting req_box if provided) as BinaryCIF
+        """
+        key = (
+            req.source,
+            req.structure_id,
+            await self.db.data_version(req.source, req.structure_id),
+            "geometric_segmentation_bcif",
+            req.segmentation_id,
+            req.time,
+            None if req_box is None else (req_box.bottom_left, req_box.top_right),
+            req.max_primitives,
+        )
+
+        async def compute() -> bytes:
+            with self.db.read(req.source, req.structure_id) as context:
+                if req_box is None:
+                    primitives = await self.executor.read(
+                        TaskKind.mesh,
+                        context.read_geometric_segmentation(segmentation_id=req.segmentation_id, time=req.time),
+                    )
+                else:
+                    primitives = await self.executor.read(
+                        TaskKind.mesh,
+                        context.read_geometric_segmentation_box(
+                            segmentation_id=req.segmentation_id,
+                            time=req.time,
+                            box=(req_box.bottom_left, req_box.top_right),
+                            max_primitives=req.max_primitives,
+                        ),
+                    )
+            with Timing("serialize shape primitives"):
+                return await self.executor.encode(TaskKind.mesh, serialize_shape_primitives, primitives, req.segmentation_id)
+
+        return await self._cached_response(key, compute, if_none_match)
+
+    async def get_meshes_bcif(self, req: MeshRequest, if_none_match: Optional[str] = None) -> ResponseBytes:
         with Timing("read metadata"):
             metadata = await self.db.read_metadata(req.source, req.structure_id)
+        req = self._apply_mesh_budget(req, metadata)
         # with Timing("decide box"):
         #     box = self._decide_slice_box(None, None, metadata)
         # for meshes instead can create box
@@ -150,42 +626,123 @@ class VolumeServerService:
                     bottom_left=(0, 0, 0),
                     top_right=tuple(d - 1 for d in metadata.sampled_grid_dimensions(1)),  # type: ignore  # length is 3
                 )
-        with Timing("read meshes"):
-            with self.db.read(req.source, req.structure_id) as context:
-                try:
-                    meshes = await context.read_meshes(
-                        segmentation_id=req.segmentation_id,
-                        time=req.time,
-                        segment_id=req.segment_id,
-                        detail_lvl=req.detail_lvl)
-                    # try:  # DEBUG, TODO REMOVE
-                    #     meshes1 = await context.read_meshes(req.segment_id+1, req.detail_lvl)
-                    #     for mesh in meshes1: mesh['mesh_id'] = 1
-                    #     meshes += meshes1
-                    #     meshes2 = await context.read_meshes(req.segment_id+2, req.detail_lvl)
-                    #     for mesh in meshes2: mesh['mesh_id'] = 2
-                    #     meshes += meshes2
-                    # except KeyError:
-                    #     pass
-                except KeyError as e:
-                    print("Exception in get_meshes: " + str(e))
-                    meta = await self.db.read_metadata(req.source, req.structure_id)
-                    segments_levels = self._extract_segments_detail_levels(meta, timeframe=req.time, segmentation_id=req.segmentation_id)
-                    error_msg = f"Invalid segment_id={req.segment_id} or detail_lvl={req.detail_lvl} (available segment_ids and detail_lvls: {segments_levels})"
-                    raise KeyError(error_msg)
-        with Timing("serialize meshes"):
-            bcif = serialize_meshes(meshes, metadata, box, req.time)
-
-        return bcif
+        key = (
+            req.source,
+            req.structure_id,
+            await self.db.data_version(req.source, req.structure_id),
+            "meshes_bcif",
+            req.segmentation_id,
+            req.time,
+            req.segment_id,
+            req.detail_lvl,
+        )
+
+        async def compute() -> bytes:
+            with Timing("read meshes"):
+                with self.db.read(req.source, req.structure_id) as context:
+                    try:
+                        meshes = await self.executor.read(TaskKind.mesh, context.read_meshes(
+                            segmentation_id=req.segmentation_id,
+                            time=req.time,
+                            segment_id=req.segment_id,
+                            detail_lvl=req.detail_lvl))
+                        # try:  # DEBUG, TODO REMOVE
+                        #     meshes1 = await context.read_meshes(req.segment_id+1, req.detail_lvl)
+                        #     for mesh in meshes1: mesh['mesh_id'] = 1
+                        #     meshes += meshes1
+                        #     meshes2 = await context.read_meshes(req.segment_id+2, req.detail_lvl)
+                        #     for mesh in meshes2: mesh['mesh_id'] = 2
+                        #     meshes += meshes2
+                        # except KeyError:
+                        #     pass
+                    except KeyError as e:
+                        print("Exception in get_meshes: " + str(e))
+                        segments_levels = self._extract_segments_detail_levels(metadata, timeframe=req.time, segmentation_id=req.segmentation_id)
+                        error_msg = f"Invalid segment_id={req.segment_id} or detail_lvl={req.detail_lvl} (available segment_ids and detail_lvls: {segments_levels})"
+                        raise KeyError(error_msg)
+            with Timing("serialize meshes"):
+                bcif = await self.executor.encode(TaskKind.mesh, serialize_meshes, meshes, metadata, box, req.time)
+
+            return bcif
+
+        return await self._cached_response(key, compute, if_none_match, baked=True)
+
+    async def get_segments_meshes_bcif(
+        self, req: SegmentsMeshesRequest, if_none_match: Optional[str] = None
+    ) -> ResponseBytes:
+        """
+        Meshes of several (or all) segments in one BCIF. Segments for which the requested detail_lvl
+        was not stored (simplification stops early for small meshes) are served at the closest available
+        finer level (or the finest one)
+        """
+        metadata = await self.db.read_metadata(req.source, req.structure_id)
+        segments_counts = self._extract_segments_mesh_counts(
+            metadata, timeframe=req.time, segmentation_id=req.segmentation_id
+        )
+        segments_levels = {s: sorted(counts.keys()) for s, counts in segments_counts.items()}
+        if not segments_levels:
+            raise ValueError(f"No meshes for segmentation_id={req.segmentation_id} and time={req.time}")
+        segment_ids = req.segment_ids if req.segment_ids is not None else list(segments_levels.keys())
+        invalid_ids = [s for s in segment_ids if s not in segments_levels]
+        if invalid_ids:
+            raise ValueError(
+                f"Invalid segment_ids={invalid_ids} (available segment_ids and detail_lvls: {segments_levels})"
+            )
+
+        detail_lvls = _decide_detail_lvls(
+            segments_counts, segment_ids, req.detail_lvl, max_vertices=req.max_vertices, max_triangles=req.max_triangles
+        )
+
+        box = GridSliceBox(
+            downsampling_rate=1,
+            bottom_left=(0, 0, 0),
+            top_right=tuple(d - 1 for d in metadata.sampled_grid_dimensions(1)),  # type: ignore  # length is 3
+        )
+        key = (
+            req.source,
+            req.structure_id,
+            await self.db.data_version(req.source, req.structure_id),
+            "segments_meshes_bcif",
+            req.segmentation_id,
+            req.time,
+            tuple(sorted(detail_lvls.items())),
+        )
+
+        async def compute() -> bytes:
+            with Timing("read meshes"):
+                with self.db.read(req.source, req.structure_id) as context:
+                    # segments are read concurrently, limited by the executor
+                    meshes = await asyncio.gather(
+                        *(
+                            self.executor.read(
+                                TaskKind.mesh,
+                                context.read_meshes(
+                                    segmentation_id=req.segmentation_id,
+                                    time=req.time,
+                                    segment_id=segment_id,
+                                    detail_lvl=detail_lvl,
+                                ),
+                            )
+                            for segment_id, detail_lvl in detail_lvls.items()
+                        )
+                    )
+            with Timing("serialize meshes"):
+                return await self.executor.encode(
+                    TaskKind.mesh, serialize_segments_meshes, list(zip(detail_lvls.keys(), meshes)), metadata, box, req.time
+                )
+
+        return await self._cached_response(key, compute, if_none_match, baked=True)
 
     async def get_meshes(self, req: MeshRequest) -> MeshesData:
+        if req.max_triangles is not None or req.max_vertices is not None:
+            req = self._apply_mesh_budget(req, await self.db.read_metadata(req.source, req.structure_id))
         with self.db.read(req.source, req.structure_id) as context:
             try:
-                meshes = await context.read_meshes(
+                meshes = await self.executor.read(TaskKind.mesh, context.read_meshes(
                         segmentation_id=req.segmentation_id,
                         time=req.time,
                         segment_id=req.segment_id,
-                        detail_lvl=req.detail_lvl)
+                        detail_lvl=req.detail_lvl))
             except KeyError as e:
                 print("Exception in get_meshes: " + str(e))
                 meta = await self.db.read_metadata(req.source, req.structure_id)
@@ -196,6 +753,48 @@ class VolumeServerService:
         return meshes
         # cif = convert_meshes(meshes, metadata, req.detail_lvl(), [10, 10, 10])  # TODO: replace 10,10,10 with cell size
 
+    def _apply_mesh_budget(self, req: MeshRequest, metadata: VolumeMetadata) -> MeshRequest:
+        """
+        Request with detail_lvl decided by max_triangles/max_vertices budget (if provided).
+        Unknown segments are left for the read to fail with the list of available ones
+        """
+        if req.max_triangles is None and req.max_vertices is None:
+            return req
+        segments_counts = self._extract_segments_mesh_counts(
+            metadata, timeframe=req.time, segmentation_id=req.segmentation_id
+        )
+        if req.segment_id not in segments_counts:
+            return req
+        detail_lvl = _decide_detail_lvls(
+            segments_counts, [req.segment_id], req.detail_lvl, max_vertices=req.max_vertices, max_triangles=req.max_triangles
+        )[req.segment_id]
+        return req.copy(update={"detail_lvl": detail_lvl})
+
+    def _extract_segments_mesh_counts(
+        self, meta: VolumeMetadata, timeframe: int, segmentation_id: str
+    ) -> dict[int, dict[int, Tuple[int, int]]]:
+        """
+        Total number of vertices and triangles of all meshes of each segment_id and detail_lvl, from metadata
+        """
+        segments_levels = (
+            meta.json_metadata().get("segmentation_meshes", {})
+            .get("segmentation_metadata", {})
+            .get(segmentation_id, {})
+            .get("mesh_timeframes", {})
+            .get(str(timeframe), {})
+            .get("segment_ids", {})
+        )
+        result: dict[int, dict[int, Tuple[int, int]]] = {}
+        for seg, obj in sorted(segments_levels.items(), key=lambda item: int(item[0])):
+            result[int(seg)] = {
+                int(lvl): (
+                    sum(m.get("num_vertices", 0) for m in lvl_obj.get("mesh_ids", {}).values()),
+                    sum(m.get("num_triangles", 0) for m in lvl_obj.get("mesh_ids", {}).values()),
+                )
+                for lvl, lvl_obj in obj.get("detail_lvls", {}).items()
+            }
+        return result
+
     def _extract_segments_detail_levels(self, meta: VolumeMetadata, timeframe: int, segmentation_id: str) -> dict[int, list[int]]:
         """Extract available segment_ids and detail_lvls for each segment_id"""
         meta_js = meta.json_metadata()
@@ -236,16 +835,7 @@ class VolumeServerService:
                 continue
             
             downsampling_rate = downsampling_level_info['level']
-            if req_box:
-                box = calc_slice_box(req_box.bottom_left, req_box.top_right, metadata, downsampling_rate)
-            # for cell query
-            # this branch works
-            else:
-                box = GridSliceBox(
-                    downsampling_rate=downsampling_rate,
-                    bottom_left=(0, 0, 0),
-                    top_right=tuple(d - 1 for d in metadata.sampled_grid_dimensions(downsampling_rate)),  # type: ignore  # length is 3
-                )
+            box = self._slice_box_at_level(req_box, metadata, downsampling_rate)
 
             # TODO: decide what to do when max_points is 0
             # e.g. whether to return the lowest downsampling or highest
@@ -262,6 +852,101 @@ class VolumeServerService:
         return box
 
 
+    def _slice_box_at_level(
+        self, req_box: Optional[VolumeRequestBox], metadata: VolumeMetadata, downsampling_rate: int
+    ) -> Optional[GridSliceBox]:
+        if req_box:
+            return calc_slice_box(req_box.bottom_left, req_box.top_right, metadata, downsampling_rate)
+        # for cell query
+        # this branch works
+        return GridSliceBox(
+            downsampling_rate=downsampling_rate,
+            bottom_left=(0, 0, 0),
+            top_right=tuple(d - 1 for d in metadata.sampled_grid_dimensions(downsampling_rate)),  # type: ignore  # length is 3
+        )
+
+    def _decide_progressive_slice_boxes(
+        self, max_points: Optional[int], req_box: Optional[VolumeRequestBox], metadata: VolumeMetadata
+    ) -> list[GridSliceBox]:
+        """
+        Boxes of all available downsampling levels from the coarsest one
+        to the one decided by `_decide_slice_box` (the finest fitting max_points)
+        """
+        finest = self._decide_slice_box(max_points, req_box, metadata)
+        if finest is None:
+            return []
+
+        boxes = []
+        for downsampling_level_info in metadata.volume_downsamplings():
+            downsampling_rate = downsampling_level_info['level']
+            if downsampling_level_info["available"] == False or downsampling_rate < finest.downsampling_rate:
+                continue
+            box = self._slice_box_at_level(req_box, metadata, downsampling_rate)
+            if box is not None:
+                boxes.append(box)
+
+        return sorted(boxes, key=lambda b: b.downsampling_rate, reverse=True)
+
+
+def _closest_detail_lvl(available: list[int], detail_lvl: int) -> int:
+    """
+    Requested detail lvl if available, otherwise the closest available finer one,
+    or the finest available one if there is none (original resolution may be removed)
+    """
+    finer = [lvl for lvl in available if lvl <= detail_lvl]
+    return max(finer) if finer else min(available)
+
+
+def _decide_detail_lvls(
+    segments_counts: dict[int, dict[int, Tuple[int, int]]],
+    segment_ids: list[int],
+    detail_lvl: int,
+    max_vertices: Optional[int] = None,
+    max_triangles: Optional[int] = None,
+) -> dict[int, int]:
+    """
+    Detail lvl for each segment, the requested detail_lvl or the closest available finer one if there is no budget.
+    With max_vertices/max_triangles budget, every segment starts at its coarsest lvl (not finer than that one)
+    and segments are refined one lvl at a time, the cheapest refinement first, while the total number
+    of vertices/triangles of all segments fits the budget. So a large segment does not force small ones
+    to coarse lvls. If even the coarsest lvls do not fit, they are returned
+    """
+    # available lvls of each segment not finer than the requested one, the finest first
+    candidates = {
+        s: sorted(lvl for lvl in segments_counts[s] if lvl >= _closest_detail_lvl(list(segments_counts[s]), detail_lvl))
+        for s in segment_ids
+    }
+    if max_vertices is None and max_triangles is None:
+        return {s: lvls[0] for s, lvls in candidates.items()}
+
+    # position of current lvl of each segment in its candidates
+    positions = {s: len(lvls) - 1 for s, lvls in candidates.items()}
+    total_vertices = sum(segments_counts[s][candidates[s][p]][0] for s, p in positions.items())
+    total_triangles = sum(segments_counts[s][candidates[s][p]][1] for s, p in positions.items())
+
+    def refinement(s: int) -> Tuple[int, int, int]:
+        vertices, triangles = segments_counts[s][candidates[s][positions[s]]]
+        finer_vertices, finer_triangles = segments_counts[s][candidates[s][positions[s] - 1]]
+        return finer_triangles - triangles, finer_vertices - vertices, s
+
+    heap = [refinement(s) for s, p in positions.items() if p > 0]
+    heapq.heapify(heap)
+    while heap:
+        added_triangles, added_vertices, s = heapq.heappop(heap)
+        if (max_vertices is not None and total_vertices + added_vertices > max_vertices) or (
+            max_triangles is not None and total_triangles + added_triangles > max_triangles
+        ):
+            # totals only grow, so this refinement will not fit later either
+            continue
+        total_vertices += added_vertices
+        total_triangles += added_triangles
+        positions[s] -= 1
+        if positions[s] > 0:
+            heapq.heappush(heap, refinement(s))
+
+    return {s: candidates[s][p] for s, p in positions.items()}
+
+
 def calc_slice_box(
     req_min: Tuple[float, float, float],
     req_max: Tuple[float, float, float],
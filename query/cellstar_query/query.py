@@ -1,5 +1,6 @@
+from typing import Optional
 
-from cellstar_query.requests import EntriesRequest, GeometricSegmentationRequest, MeshRequest, MetadataRequest, VolumeRequestBox, VolumeRequestDataKind, VolumeRequestInfo
+from cellstar_query.requests import EntriesRequest, GeometricSegmentationRequest, MeshRequest, MetadataRequest, SegmentsMeshesRequest, VolumeChannelsRequestInfo, VolumeRequestBox, VolumeRequestDataKind, VolumeRequestEncoding, VolumeRequestInfo, VolumeRoi, VolumeRoisRequest, VolumeTimeRangeRequestInfo
 from cellstar_query.core.service import VolumeServerService
 from cellstar_query.serialization.json_numpy_response import JSONNumpyResponse
 from fastapi import Response
@@ -20,18 +21,28 @@ async def get_segmentation_box_query(
         b1: float,
         b2: float,
         b3: float,
-        max_points: int
+        max_points: int,
+        if_none_match: Optional[str] = None,
+        client_id: Optional[str] = None,
+        progressive: bool = False,
 ):
+    req = VolumeRequestInfo(
+        source=source,
+        structure_id=id,
+        segmentation_id=segmentation_id,
+        time=time,
+        max_points=max_points,
+        data_kind=VolumeRequestDataKind.segmentation,
+    )
+    req_box = VolumeRequestBox(bottom_left=(a1, a2, a3), top_right=(b1, b2, b3))
+    if progressive:
+        return await volume_server.get_volume_data_progressive(req, req_box, client_id=client_id)
+
     response = await volume_server.get_volume_data(
-        req=VolumeRequestInfo(
-            source=source,
-            structure_id=id,
-            segmentation_id=segmentation_id,
-            time=time,
-            max_points=max_points,
-            data_kind=VolumeRequestDataKind.segmentation,
-        ),
-        req_box=VolumeRequestBox(bottom_left=(a1, a2, a3), top_right=(b1, b2, b3)),
+        req=req,
+        req_box=req_box,
+        if_none_match=if_none_match,
+        client_id=client_id,
     )
     return response
 
@@ -47,18 +58,30 @@ async def get_volume_box_query(
         b1: float,
         b2: float,
         b3: float,
-        max_points: int
+        max_points: int,
+        encoding: VolumeRequestEncoding = VolumeRequestEncoding.default,
+        if_none_match: Optional[str] = None,
+        client_id: Optional[str] = None,
+        progressive: bool = False,
 ):
+    req = VolumeRequestInfo(
+        source=source,
+        structure_id=id,
+        channel_id=channel_id,
+        time=time,
+        max_points=max_points,
+        data_kind=VolumeRequestDataKind.volume,
+        encoding=encoding,
+    )
+    req_box = VolumeRequestBox(bottom_left=(a1, a2, a3), top_right=(b1, b2, b3))
+    if progressive:
+        return await volume_server.get_volume_data_progressive(req, req_box, client_id=client_id)
+
     response = await volume_server.get_volume_data(
-        req=VolumeRequestInfo(
-            source=source,
-            structure_id=id,
-            channel_id=channel_id,
-            time=time,
-            max_points=max_points,
-            data_kind=VolumeRequestDataKind.volume,
-        ),
-        req_box=VolumeRequestBox(bottom_left=(a1, a2, a3), top_right=(b1, b2, b3)),
+        req=req,
+        req_box=req_box,
+        if_none_match=if_none_match,
+        client_id=client_id,
     )
     return response
 
@@ -69,17 +92,26 @@ async def get_segmentation_cell_query(
     id: str,
     segmentation: str,
     time: int,
-    max_points: int
+    max_points: int,
+    if_none_match: Optional[str] = None,
+    client_id: Optional[str] = None,
+    progressive: bool = False,
 ):
+    req = VolumeRequestInfo(
+        source=source,
+        structure_id=id,
+        segmentation_id=segmentation,
+        time=time,
+        max_points=max_points,
+        data_kind=VolumeRequestDataKind.segmentation,
+    )
+    if progressive:
+        return await volume_server.get_volume_data_progressive(req, client_id=client_id)
+
     response = await volume_server.get_volume_data(
-            req=VolumeRequestInfo(
-                source=source,
-                structure_id=id,
-                segmentation_id=segmentation,
-                time=time,
-                max_points=max_points,
-                data_kind=VolumeRequestDataKind.segmentation,
-            ),
+            req=req,
+            if_none_match=if_none_match,
+            client_id=client_id,
         )
     
     return response
@@ -91,15 +123,127 @@ async def get_volume_cell_query(
     id: str,
     time: int,
     channel_id: str,
-    max_points: int
+    max_points: int,
+    encoding: VolumeRequestEncoding = VolumeRequestEncoding.default,
+    if_none_match: Optional[str] = None,
+    client_id: Optional[str] = None,
+    progressive: bool = False,
 ):
+    req = VolumeRequestInfo(
+        source=source, structure_id=id,
+        time=time, channel_id=channel_id, max_points=max_points, data_kind=VolumeRequestDataKind.volume,
+        encoding=encoding
+    )
+    if progressive:
+        return await volume_server.get_volume_data_progressive(req, client_id=client_id)
+
     response = await volume_server.get_volume_data(
-            req=VolumeRequestInfo(
+            req=req,
+            if_none_match=if_none_match,
+            client_id=client_id,
+        )
+    
+    return response
+
+async def get_volume_channels_box_query(
+        volume_server: VolumeServerService,
+        source: str,
+        id: str,
+        time: int,
+        channel_ids: Optional[list[str]],
+        a1: float,
+        a2: float,
+        a3: float,
+        b1: float,
+        b2: float,
+        b3: float,
+        max_points: int,
+        encoding: VolumeRequestEncoding = VolumeRequestEncoding.default,
+        if_none_match: Optional[str] = None
+):
+    response = await volume_server.get_volume_channels_data(
+        req=VolumeChannelsRequestInfo(
+            source=source,
+            structure_id=id,
+            channel_ids=channel_ids,
+            time=time,
+            max_points=max_points,
+            encoding=encoding,
+        ),
+        req_box=VolumeRequestBox(bottom_left=(a1, a2, a3), top_right=(b1, b2, b3)),
+        if_none_match=if_none_match,
+    )
+    return response
+
+
+async def get_volume_time_range_box_query(
+        volume_server: VolumeServerService,
+        source: str,
+        id: str,
+        time_start: int,
+        time_end: int,
+        channel_id: str,
+        a1: float,
+        a2: float,
+        a3: float,
+        b1: float,
+        b2: float,
+        b3: float,
+        max_points: int,
+        encoding: VolumeRequestEncoding = VolumeRequestEncoding.default,
+        temporal_delta: bool = False,
+        if_none_match: Optional[str] = None
+):
+    response = await volume_server.get_volume_time_range_data(
+        req=VolumeTimeRangeRequestInfo(
+            source=source,
+            structure_id=id,
+            channel_id=channel_id,
+            time_start=time_start,
+            time_end=time_end,
+            max_points=max_points,
+            encoding=encoding,
+            temporal_delta=temporal_delta,
+        ),
+        req_box=VolumeRequestBox(bottom_left=(a1, a2, a3), top_right=(b1, b2, b3)),
+        if_none_match=if_none_match,
+    )
+    return response
+
+
+async def get_volume_channels_cell_query(
+    volume_server: VolumeServerService,
+    source: str,
+    id: str,
+    time: int,
+    channel_ids: Optional[list[str]],
+    max_points: int,
+    encoding: VolumeRequestEncoding = VolumeRequestEncoding.default,
+    if_none_match: Optional[str] = None
+):
+    response = await volume_server.get_volume_channels_data(
+            req=VolumeChannelsRequestInfo(
                 source=source, structure_id=id,
-                time=time, channel_id=channel_id, max_points=max_points, data_kind=VolumeRequestDataKind.volume
+                time=time, channel_ids=channel_ids, max_points=max_points, encoding=encoding
             ),
+            if_none_match=if_none_match,
         )
-    
+
+    return response
+
+async def get_volume_rois_query(
+    volume_server: VolumeServerService,
+    source: str,
+    id: str,
+    rois: list[VolumeRoi],
+    max_points: Optional[int] = None,
+    encoding: VolumeRequestEncoding = VolumeRequestEncoding.default,
+    if_none_match: Optional[str] = None
+):
+    response = await volume_server.get_volume_rois_data(
+        req=VolumeRoisRequest(source=source, structure_id=id, rois=rois, max_points=max_points, encoding=encoding),
+        if_none_match=if_none_match,
+    )
     return response
 
 async def get_metadata_query(
@@ -134,9 +278,10 @@ async def get_list_entries_query(
 async def get_list_entries_keyword_query(
         volume_server: VolumeServerService,
         limit: int,
-        keyword: str
+        keyword: str,
+        offset: int = 0,
 ):
-    request = EntriesRequest(limit=limit, keyword=keyword)
+    request = EntriesRequest(limit=limit, keyword=keyword, offset=offset)
     response = await volume_server.get_entries(request)
     return response
 
@@ -145,13 +290,16 @@ async def get_meshes_query(
         source: str, id: str, segmentation_id: str,
         time: int,
         segment_id: int,
-        detail_lvl: int
+        detail_lvl: int,
+        max_triangles: Optional[int] = None,
+        max_vertices: Optional[int] = None
 ):
     request = MeshRequest(
             source=source, structure_id=id,
             segmentation_id=segmentation_id,
             segment_id=segment_id,
-            detail_lvl=detail_lvl, time=time)
+            detail_lvl=detail_lvl, time=time,
+            max_triangles=max_triangles, max_vertices=max_vertices)
     meshes = await volume_server.get_meshes(request)
     return meshes
     
@@ -160,18 +308,76 @@ async def get_meshes_bcif_query(
         source: str, id: str, segmentation_id: str,
         time: int,
         segment_id: int,
-        detail_lvl: int
+        detail_lvl: int,
+        if_none_match: Optional[str] = None,
+        max_triangles: Optional[int] = None,
+        max_vertices: Optional[int] = None
 ):
     request = MeshRequest(
             source=source, structure_id=id,
             segmentation_id=segmentation_id,
             segment_id=segment_id,
-            detail_lvl=detail_lvl, time=time)
+            detail_lvl=detail_lvl, time=time,
+            max_triangles=max_triangles, max_vertices=max_vertices)
     
-    response_bytes = await volume_server.get_meshes_bcif(request)
+    response_bytes = await volume_server.get_meshes_bcif(request, if_none_match=if_none_match)
+    return response_bytes
+
+async def get_segments_meshes_bcif_query(
+        volume_server: VolumeServerService,
+        source: str, id: str, segmentation_id: str,
+        time: int,
+        segment_ids: Optional[list[int]],
+        detail_lvl: int,
+        if_none_match: Optional[str] = None,
+        max_triangles: Optional[int] = None,
+        max_vertices: Optional[int] = None
+):
+    request = SegmentsMeshesRequest(
+            source=source, structure_id=id,
+            segmentation_id=segmentation_id,
+            segment_ids=segment_ids,
+            detail_lvl=detail_lvl, time=time,
+            max_triangles=max_triangles, max_vertices=max_vertices)
+
+    response_bytes = await volume_server.get_segments_meshes_bcif(request, if_none_match=if_none_match)
     return response_bytes
 
-async def get_geometric_segmentation_query(volume_server: VolumeServerService, source: str, id: str, segmentation_id: str, time: int):
+async def get_geometric_segmentation_query(
+        volume_server: VolumeServerService,
+        source: str,
+        id: str,
+        segmentation_id: str,
+        time: int,
+        bcif: bool = False,
+        if_none_match: Optional[str] = None,
+):
         request = GeometricSegmentationRequest(source=source, structure_id=id, segmentation_id=segmentation_id, time=time)
+        if bcif:
+            return await volume_server.get_geometric_segmentation_bcif(request, if_none_match=if_none_match)
         geometric_segmentation = await volume_server.get_geometric_segmentation(request)
-        return geometric_segmentation
\ No newline at end of file
+        return geometric_segmentation
+
+async def get_geometric_segmentation_box_query(
+        volume_server: VolumeServerService,
+        source: str,
+        id: str,
+        segmentation_id: str,
+        time: int,
+        a1: float,
+        a2: float,
+        a3: float,
+        b1: float,
+        b2: float,
+        b3: float,
+        max_primitives: Optional[int] = None,
+        bcif: bool = False,
+        if_none_match: Optional[str] = None,
+):
+    request = GeometricSegmentationRequest(
+        source=source, structure_id=id, segmentation_id=segmentation_id, time=time, max_primitives=max_primitives
+    )
+    req_box = VolumeRequestBox(bottom_left=(a1, a2, a3), top_right=(b1, b2, b3))
+    if bcif:
+        return await volume_server.get_geometric_segmentation_bcif(request, req_box, if_none_match=if_none_match)
+    return await volume_server.get_geometric_segmentation_box(request, req_box)
@@ -10,6 +10,16 @@ class VolumeRequestDataKind(str, Enum):
     all = "all"
 
 
+class VolumeRequestEncoding(str, Enum):
+    # volume values are decoded and interval-quantized to uint8 during encoding
+    default = "default"
+    # quantized volumes are served as stored codes with quantization parameters for the client to decode
+    quantized = "quantized"
+    # float volumes are interval-quantized using min/max of the served level from descriptive statistics,
+    # without scanning the data for min/max
+    statistics = "statistics"
+
+
 class VolumeRequestInfo(BaseModel):
     source: str
     structure_id: str
@@ -18,6 +28,7 @@ class VolumeRequestInfo(BaseModel):
     time: int
     max_points: int
     data_kind: VolumeRequestDataKind = VolumeRequestDataKind.all
+    encoding: VolumeRequestEncoding = VolumeRequestEncoding.default
 
     @validator("segmentation_id")
     def _validate_segmentation_ui(cls, id: Optional[str], values):
@@ -31,6 +42,41 @@ class VolumeRequestInfo(BaseModel):
             raise ValueError("channel_id must be defined for volume queries")
         return id
 
+class VolumeChannelsRequestInfo(BaseModel):
+    source: str
+    structure_id: str
+    # None means all channels of the entry
+    channel_ids: Optional[list[str]] = None
+    time: int
+    max_points: int
+    encoding: VolumeRequestEncoding = VolumeRequestEncoding.default
+
+    @validator("channel_ids")
+    def _validate_channel_ids(cls, ids: Optional[list[str]]):
+        if ids is not None and len(ids) == 0:
+            raise ValueError("channel_ids must not be empty")
+        return ids
+
+
+class VolumeTimeRangeRequestInfo(BaseModel):
+    source: str
+    structure_id: str
+    channel_id: str
+    # inclusive range of timeframes
+    time_start: int
+    time_end: int
+    max_points: int
+    encoding: VolumeRequestEncoding = VolumeRequestEncoding.default
+    # quantization codes of each timeframe are sent as difference to the previous timeframe
+    temporal_delta: bool = False
+
+    @validator("time_end")
+    def _validate_time_end(cls, time_end: int, values):
+        if "time_start" in values and time_end < values["time_start"]:
+            raise ValueError("time_end must not be lower than time_start")
+        return time_end
+
+
 class VolumeRequestBox(BaseModel):
     bottom_left: Tuple[float, float, float]
     top_right: Tuple[float, float, float]
@@ -43,15 +89,55 @@ class VolumeRequestBox(BaseModel):
         return values
 
 
+
+class VolumeRoi(VolumeRequestBox):
+    data_kind: VolumeRequestDataKind = VolumeRequestDataKind.volume
+    time: int = 0
+    # first channel of the entry if not provided
+    channel_id: Optional[str] = None
+    # first lattice segmentation of the entry if not provided
+    segmentation_id: Optional[str] = None
+
+
+class VolumeRoisRequest(BaseModel):
+    source: str
+    structure_id: str
+    rois: list[VolumeRoi]
+    # applies to each region, None means original resolution
+    max_points: Optional[int] = None
+    encoding: VolumeRequestEncoding = VolumeRequestEncoding.default
+
+    @validator("rois")
+    def _validate_rois(cls, rois: list[VolumeRoi]):
+        if len(rois) == 0:
+            raise ValueError("rois must not be empty")
+        return rois
+
 class EntriesRequest(BaseModel):
     limit: int
     keyword: str
+    # number of best matching entries to skip (keyword search only)
+    offset: int = 0
+
+    @validator("offset")
+    def _validate_offset(cls, offset: int):
+        if offset < 0:
+            raise ValueError("offset must not be negative")
+        return offset
 
 class GeometricSegmentationRequest(BaseModel):
     source: str
     structure_id: str
     segmentation_id: str
     time: int
+    # used only by box queries, None means all primitives intersecting the box
+    max_primitives: Optional[int] = None
+
+    @validator("max_primitives")
+    def _validate_max_primitives(cls, max_primitives: Optional[int]):
+        if max_primitives is not None and max_primitives < 0:
+            raise ValueError("max_primitives must not be negative")
+        return max_primitives
     
 class MeshRequest(BaseModel):
     source: str
@@ -60,6 +146,28 @@ class MeshRequest(BaseModel):
     segment_id: int
     detail_lvl: int
     time: int
+    # if provided, the finest detail lvl not finer than detail_lvl that fits the budget is used
+    max_triangles: Optional[int] = None
+    max_vertices: Optional[int] = None
+
+
+class SegmentsMeshesRequest(BaseModel):
+    source: str
+    structure_id: str
+    segmentation_id: str
+    # None means all segments of the segmentation at the timeframe
+    segment_ids: Optional[list[int]] = None
+    detail_lvl: int
+    time: int
+    # budget for all requested segments together, each segment gets the finest lvl that still fits, see MeshRequest
+    max_triangles: Optional[int] = None
+    max_vertices: Optional[int] = None
+
+    @validator("segment_ids")
+    def _validate_segment_ids(cls, ids: Optional[list[int]]):
+        if ids is not None and len(ids) == 0:
+            raise ValueError("segment_ids must not be empty")
+        return ids
 
 
 class MetadataRequest(BaseModel):
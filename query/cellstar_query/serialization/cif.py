@@ -1,14 +1,19 @@
-from typing import Union
+from typing import Iterator, Optional, Tuple, Union
 from cellstar_query.serialization.data.meshes_for_cif import MeshesForCif
 
 import numpy as np
 from ciftools.serialization import create_binary_writer
-from cellstar_db.models import MeshesData, VolumeMetadata, VolumeSliceData
+from cellstar_db.models import MeshesData, ShapePrimitiveData, VolumeMetadata, VolumeSliceData
 
 from cellstar_query.core.models import GridSliceBox
 from cellstar_query.core.timing import Timing
+from cellstar_query.requests import VolumeRequestEncoding
 
+from cellstar_query.serialization.data.interval_quantized_volume import IntervalQuantizedVolume
 from cellstar_query.serialization.data.segment_set_table import SegmentSetTable
+from cellstar_query.serialization.data.shape_primitives_for_cif import shape_primitives_for_cif
+from cellstar_query.serialization.data.temporal_delta_volume import TemporalDeltaVolume
+from cellstar_query.serialization.streaming import StreamingBinaryCIFWriter, create_streaming_binary_writer
 from cellstar_query.serialization.data.volume_info import VolumeInfo
 from cellstar_query.serialization.volume_cif_categories.meshes import (
     CategoryWriterProvider_Mesh,
@@ -17,13 +22,46 @@ from cellstar_query.serialization.volume_cif_categories.meshes import (
 )
 from cellstar_query.serialization.volume_cif_categories.segmentation_data_3d import SegmentationData3dCategory
 from cellstar_query.serialization.volume_cif_categories.segmentation_table import SegmentationDataTableCategory
-from cellstar_query.serialization.volume_cif_categories.volume_data_3d import VolumeData3dCategory
+from cellstar_query.serialization.volume_cif_categories.shape_primitives import SHAPE_PRIMITIVE_CATEGORIES
+from cellstar_query.serialization.volume_cif_categories.volume_data_3d import (
+    IntervalQuantizedVolumeData3dCategory,
+    QuantizedVolumeData3dCategory,
+    TemporalDeltaVolumeData3dCategory,
+    VolumeData3dCategory,
+)
+from cellstar_query.serialization.volume_cif_categories.volume_data_3d_quantization import VolumeData3dQuantizationCategory
 from cellstar_query.serialization.volume_cif_categories.volume_data_3d_info import VolumeData3dInfoCategory
 from cellstar_query.serialization.volume_cif_categories.volume_data_time_and_channel_info import VolumeDataTimeAndChannelInfo
 
 
-def serialize_volume_slice(slice: VolumeSliceData, metadata: VolumeMetadata, box: GridSliceBox) -> Union[bytes, str]:
-    writer = create_binary_writer(encoder="cellstar-volume-server")
+def serialize_volume_slice(
+    slice: VolumeSliceData,
+    metadata: VolumeMetadata,
+    box: GridSliceBox,
+    encoding: VolumeRequestEncoding = VolumeRequestEncoding.default,
+) -> Union[bytes, str]:
+    return _write_volume_slice(slice, metadata, box, encoding).encode()
+
+
+def serialize_volume_slice_chunks(
+    slice: VolumeSliceData,
+    metadata: VolumeMetadata,
+    box: GridSliceBox,
+    encoding: VolumeRequestEncoding = VolumeRequestEncoding.default,
+) -> Iterator[bytes]:
+    """
+    Same output as serialize_volume_slice, yielded in parts as columns are encoded
+    """
+    return _write_volume_slice(slice, metadata, box, encoding).iter_encode()
+
+
+def _write_volume_slice(
+    slice: VolumeSliceData,
+    metadata: VolumeMetadata,
+    box: GridSliceBox,
+    encoding: VolumeRequestEncoding,
+) -> StreamingBinaryCIFWriter:
+    writer = create_streaming_binary_writer(encoder="cellstar-volume-server")
 
     writer.start_data_block("SERVER")
     # NOTE: the SERVER category left empty for now
@@ -42,34 +80,255 @@ def serialize_volume_slice(slice: VolumeSliceData, metadata: VolumeMetadata, box
 
     # volume
     if "volume_slice" in slice:
-        writer.start_data_block("volume")  # Currently needs to be EM for
+        _write_volume_data_block(writer, "volume", slice, volume_info, metadata, box, encoding)
+
+    # segmentation
+    if "segmentation_slice" in slice and slice["segmentation_slice"]["category_set_ids"] is not None:
+        _write_segmentation_data_block(writer, "segmentation_data", slice, volume_info)
+
+    return writer
+
+
+def serialize_volume_slices(
+    slices: list[VolumeSliceData],
+    metadata: VolumeMetadata,
+    box: GridSliceBox,
+    encoding: VolumeRequestEncoding = VolumeRequestEncoding.default,
+) -> bytes:
+    """
+    Volume slices of several channels (same box and time), each in its own data block
+    """
+    return _write_volume_slices(slices, metadata, box, encoding).encode()
+
+
+def serialize_volume_slices_chunks(
+    slices: list[VolumeSliceData],
+    metadata: VolumeMetadata,
+    box: GridSliceBox,
+    encoding: VolumeRequestEncoding = VolumeRequestEncoding.default,
+) -> Iterator[bytes]:
+    return _write_volume_slices(slices, metadata, box, encoding).iter_encode()
+
+
+def _write_volume_slices(
+    slices: list[VolumeSliceData],
+    metadata: VolumeMetadata,
+    box: GridSliceBox,
+    encoding: VolumeRequestEncoding,
+) -> StreamingBinaryCIFWriter:
+    writer = create_streaming_binary_writer(encoder="cellstar-volume-server")
+
+    writer.start_data_block("SERVER")
+
+    for slice in slices:
+        volume_info = VolumeInfo(name="volume", metadata=metadata, box=box, time=slice["time"],
+                                 channel_id=slice["channel_id"])
+        # NOTE: blocks are told apart by channel id in their header and in time and channel info category
+        _write_volume_data_block(writer, f"volume_{slice['channel_id']}", slice, volume_info, metadata, box, encoding)
+
+    return writer
+
+
+def serialize_volume_time_slices(
+    slices: list[VolumeSliceData],
+    metadata: VolumeMetadata,
+    box: GridSliceBox,
+    encoding: VolumeRequestEncoding = VolumeRequestEncoding.default,
+    temporal_delta: bool = False,
+) -> bytes:
+    """
+    Volume slices of consecutive timeframes (same box and channel), each in its own data block.
+    With temporal_delta, quantization codes of a timeframe are written as difference to the previous one
+    """
+    return _write_volume_time_slices(slices, metadata, box, encoding, temporal_delta).encode()
+
+
+def serialize_volume_time_slices_chunks(
+    slices: list[VolumeSliceData],
+    metadata: VolumeMetadata,
+    box: GridSliceBox,
+    encoding: VolumeRequestEncoding = VolumeRequestEncoding.default,
+    temporal_delta: bool = False,
+) -> Iterator[bytes]:
+    return _write_volume_time_slices(slices, metadata, box, encoding, temporal_delta).iter_encode()
+
+
+def _write_volume_time_slices(
+    slices: list[VolumeSliceData],
+    metadata: VolumeMetadata,
+    box: GridSliceBox,
+    encoding: VolumeRequestEncoding,
+    temporal_delta: bool,
+) -> StreamingBinaryCIFWriter:
+    writer = create_streaming_binary_writer(encoder="cellstar-volume-server")
+
+    writer.start_data_block("SERVER")
+
+    # float volumes of all timeframes are quantized on the same interval, so that their codes can be subtracted
+    interval = _common_volume_interval(slices, metadata, box, encoding) if temporal_delta else None
+    # codes and their quantization parameters of the previous block
+    previous: Optional[tuple] = None
+
+    for slice in slices:
+        volume_info = VolumeInfo(name="volume", metadata=metadata, box=box, time=slice["time"],
+                                 channel_id=slice["channel_id"])
+        header = f"volume_t{slice['time']}"
+
+        quantization = slice.get("volume_quantization")
+        volume = slice["volume_slice"]
+        if temporal_delta and quantization is not None and volume.dtype == np.uint8:
+            codes, params = np.ravel(volume, order='F'), dict(quantization)
+            keyframe_category, keyframe = QuantizedVolumeData3dCategory, codes
+        elif temporal_delta and quantization is None and interval is not None and volume.dtype in (np.float32, np.float64):
+            keyframe = IntervalQuantizedVolume(volume, minimum=interval[0], maximum=interval[1])
+            codes, params = keyframe.values, interval
+            keyframe_category = IntervalQuantizedVolumeData3dCategory
+        else:
+            _write_volume_data_block(writer, header, slice, volume_info, metadata, box, encoding)
+            previous = None
+            continue
+
+        writer.start_data_block(header)
         writer.write_category(VolumeData3dInfoCategory, [volume_info])
-        # which channel_id and time_id is it
         writer.write_category(VolumeDataTimeAndChannelInfo, [volume_info])
+        if quantization is not None:
+            writer.write_category(VolumeData3dQuantizationCategory, [quantization])
+
+        if previous is not None and previous[1] == params:
+            writer.write_category(TemporalDeltaVolumeData3dCategory, [TemporalDeltaVolume(codes, previous[0])])
+        else:
+            writer.write_category(keyframe_category, [keyframe])
+        previous = (codes, params)
+
+    return writer
+
+
+def _common_volume_interval(
+    slices: list[VolumeSliceData], metadata: VolumeMetadata, box: GridSliceBox, encoding: VolumeRequestEncoding
+) -> Optional[Tuple[float, float]]:
+    """Returns min and max over all (float) slices, from descriptive statistics for statistics encoding"""
+    volumes = [s["volume_slice"] for s in slices if s.get("volume_quantization") is None]
+    if not volumes or any(v.dtype not in (np.float32, np.float64) for v in volumes):
+        return None
+
+    if encoding == VolumeRequestEncoding.statistics:
+        intervals = [
+            _volume_interval_from_statistics(s["volume_slice"], metadata, box, s["time"], s["channel_id"])
+            for s in slices
+        ]
+        if all(i is not None for i in intervals):
+            return min(i[0] for i in intervals), max(i[1] for i in intervals)
+
+    return min(float(v.min()) for v in volumes), max(float(v.max()) for v in volumes)
 
+def _write_volume_data_block(
+    writer: StreamingBinaryCIFWriter,
+    header: str,
+    slice: VolumeSliceData,
+    volume_info: VolumeInfo,
+    metadata: VolumeMetadata,
+    box: GridSliceBox,
+    encoding: VolumeRequestEncoding,
+):
+    writer.start_data_block(header)
+    writer.write_category(VolumeData3dInfoCategory, [volume_info])
+    # which channel_id and time_id is it
+    writer.write_category(VolumeDataTimeAndChannelInfo, [volume_info])
+
+    quantization = slice.get("volume_quantization")
+    interval = None
+    if encoding == VolumeRequestEncoding.statistics:
+        interval = _volume_interval_from_statistics(slice["volume_slice"], metadata, box, slice["time"], volume_info.channel_id)
+
+    if quantization is not None:
+        # stored quantized codes are passed through, client decodes them
+        writer.write_category(VolumeData3dQuantizationCategory, [quantization])
+        writer.write_category(QuantizedVolumeData3dCategory, [np.ravel(slice["volume_slice"], order='F')])
+    elif interval is not None:
+        quantized_volume = IntervalQuantizedVolume(slice["volume_slice"], minimum=interval[0], maximum=interval[1])
+        writer.write_category(IntervalQuantizedVolumeData3dCategory, [quantized_volume])
+    else:
         data_category = VolumeData3dCategory()
         writer.write_category(data_category, [np.ravel(slice["volume_slice"], order='F')])
 
-    # segmentation
-    if "segmentation_slice" in slice and slice["segmentation_slice"]["category_set_ids"] is not None:
-        # TODO: add lattice_id info
-        writer.start_data_block("segmentation_data")
-        writer.write_category(VolumeData3dInfoCategory, [volume_info])
-        # which channel_id and time_id is it
-        writer.write_category(VolumeDataTimeAndChannelInfo, [volume_info])
 
-        segmentation = slice["segmentation_slice"]
+def _write_segmentation_data_block(
+    writer: StreamingBinaryCIFWriter,
+    header: str,
+    slice: VolumeSliceData,
+    volume_info: VolumeInfo,
+):
+    # TODO: add lattice_id info
+    writer.start_data_block(header)
+    writer.write_category(VolumeData3dInfoCategory, [volume_info])
+    # which channel_id and time_id is it
+    writer.write_category(VolumeDataTimeAndChannelInfo, [volume_info])
 
-        # table
-        set_dict = segmentation["category_set_dict"]
-        segment_set_table = SegmentSetTable.from_dict(set_dict)
-        writer.write_category(SegmentationDataTableCategory, [segment_set_table])
+    segmentation = slice["segmentation_slice"]
 
-        # 3d_ids
-        # uint32
-        writer.write_category(SegmentationData3dCategory, [np.ravel(segmentation["category_set_ids"], order='F')])
+    # table
+    set_dict = segmentation["category_set_dict"]
+    segment_set_table = SegmentSetTable.from_dict(set_dict)
+    writer.write_category(SegmentationDataTableCategory, [segment_set_table])
 
-    return writer.encode()
+    # 3d_ids
+    # uint32
+    writer.write_category(SegmentationData3dCategory, [np.ravel(segmentation["category_set_ids"], order='F')])
+
+
+def serialize_roi_slices(
+    slices: list[Tuple[VolumeSliceData, GridSliceBox]],
+    metadata: VolumeMetadata,
+    encoding: VolumeRequestEncoding = VolumeRequestEncoding.default,
+) -> bytes:
+    """
+    Slices of several regions of interest, each with its own box.
+    Volume and segmentation of i-th region are in data blocks roi_<i>_volume and roi_<i>_segmentation_data
+    """
+    return _write_roi_slices(slices, metadata, encoding).encode()
+
+
+def serialize_roi_slices_chunks(
+    slices: list[Tuple[VolumeSliceData, GridSliceBox]],
+    metadata: VolumeMetadata,
+    encoding: VolumeRequestEncoding = VolumeRequestEncoding.default,
+) -> Iterator[bytes]:
+    return _write_roi_slices(slices, metadata, encoding).iter_encode()
+
+
+def _write_roi_slices(
+    slices: list[Tuple[VolumeSliceData, GridSliceBox]],
+    metadata: VolumeMetadata,
+    encoding: VolumeRequestEncoding,
+) -> StreamingBinaryCIFWriter:
+    writer = create_streaming_binary_writer(encoder="cellstar-volume-server")
+
+    writer.start_data_block("SERVER")
+
+    default_channel_id = metadata.json_metadata()["volumes"]["channel_ids"][0]
+    for i, (slice, box) in enumerate(slices):
+        channel_id = slice.get("channel_id") or default_channel_id
+        volume_info = VolumeInfo(name="volume", metadata=metadata, box=box, time=slice["time"], channel_id=channel_id)
+        if "volume_slice" in slice:
+            _write_volume_data_block(writer, f"roi_{i}_volume", slice, volume_info, metadata, box, encoding)
+        if "segmentation_slice" in slice:
+            _write_segmentation_data_block(writer, f"roi_{i}_segmentation_data", slice, volume_info)
+
+    return writer
+
+def _volume_interval_from_statistics(
+    volume: np.ndarray, metadata: VolumeMetadata, box: GridSliceBox, time: int, channel_id: str
+) -> Optional[Tuple[float, float]]:
+    """Returns min and max of the served downsampling level if volume is float and statistics are available"""
+    if volume.dtype not in (np.float32, np.float64):
+        return None
+    try:
+        return (
+            metadata.min(box.downsampling_rate, time=time, channel_id=channel_id),
+            metadata.max(box.downsampling_rate, time=time, channel_id=channel_id),
+        )
+    except KeyError:
+        return None
 
 
 def serialize_volume_info(metadata: VolumeMetadata, box: GridSliceBox) -> bytes:
@@ -101,3 +360,43 @@ def serialize_meshes(meshes: MeshesData, metadata: VolumeMetadata, box: GridSlic
     with Timing("  get bytes"):
         bcif = writer.encode()
     return bcif
+
+
+def serialize_segments_meshes(
+    segments_meshes: list[Tuple[int, MeshesData]], metadata: VolumeMetadata, box: GridSliceBox, time: int
+) -> bytes:
+    """
+    Meshes of several segments, each segment in its own data block (segment_<segment_id>)
+    with the same categories as in serialize_meshes
+    """
+    writer = create_binary_writer(encoder="cellstar-volume-server")
+
+    writer.start_data_block("volume_info")
+    volume_info = VolumeInfo(name="volume", metadata=metadata, box=box, time=time)
+    writer.write_category(VolumeData3dInfoCategory, [volume_info])
+
+    for segment_id, meshes in segments_meshes:
+        meshes_for_cif = MeshesForCif(meshes)
+        writer.start_data_block(f"segment_{segment_id}")
+        writer.write_category(CategoryWriterProvider_Mesh, [meshes_for_cif])
+        writer.write_category(CategoryWriterProvider_MeshVertex, [meshes_for_cif])
+        writer.write_category(CategoryWriterProvider_MeshTriangle, [meshes_for_cif])
+
+    return writer.encode()
+
+
+def serialize_shape_primitives(primitives: ShapePrimitiveData, segmentation_id: str) -> bytes:
+    """
+    Shape primitives of one timeframe, one category per kind (shape_primitive_<kind>) in data block
+    named by segmentation_id. Column index is the position of primitive in shape_primitive_list
+    """
+    with Timing("  prepare shape primitives for cif"):
+        primitives_for_cif = shape_primitives_for_cif(primitives)
+
+    # NOTE: streaming writer also encodes masks of presence arrays (color, label), see _presence_mask
+    writer = create_streaming_binary_writer(encoder="cellstar-volume-server")
+    writer.start_data_block(segmentation_id)
+    for primitives_of_kind in primitives_for_cif:
+        writer.write_category(SHAPE_PRIMITIVE_CATEGORIES[primitives_of_kind.kind], [primitives_of_kind])
+
+    return writer.encode()
@@ -0,0 +1,42 @@
+import numpy as np
+
+# edge of blocks (along the first and the last axis) quantized at once
+_BLOCK_SIZE = 32
+
+
+class IntervalQuantizedVolume:
+    """
+    Volume values quantized to uint8 codes on a known interval (e.g. min/max from descriptive statistics),
+    so no min/max scan over the data is needed during encoding
+    """
+
+    def __init__(self, volume: np.ndarray, minimum: float, maximum: float, num_steps: int = 255):
+        self.min = float(minimum)
+        self.max = float(maximum)
+        self.num_steps = num_steps
+        self.src_dtype = volume.dtype
+        # NOTE: codes are computed into Fortran-ordered array, so raveling in CIF (Fortran) order is a view
+        self.values = np.ravel(_quantize_blockwise(volume, self.min, self.max, num_steps), order="F")
+
+
+def _quantize_blockwise(volume: np.ndarray, minimum: float, maximum: float, num_steps: int) -> np.ndarray:
+    """
+    Same as ciftools IntervalQuantization (round((clip(v) - min) / delta)), computed in a single pass
+    over the data. Works on blocks small enough to stay in cache while being transposed
+    from C order of the volume to Fortran order of the codes
+    """
+    codes = np.empty(volume.shape, dtype=np.uint8, order="F")
+    if maximum <= minimum:
+        codes.fill(0)
+        return codes
+
+    scale = (num_steps - 1) / (maximum - minimum)
+    b = _BLOCK_SIZE
+    for i in range(0, volume.shape[0], b):
+        for k in range(0, volume.shape[2], b):
+            block = np.subtract(volume[i : i + b, :, k : k + b], minimum, dtype=np.float32)
+            np.multiply(block, scale, out=block)
+            np.clip(block, 0, num_steps - 1, out=block)
+            np.rint(block, out=block)
+            codes[i : i + b, :, k : k + b] = block
+    return codes
@@ -0,0 +1,121 @@
+from typing import Optional
+
+import numpy as np
+from cellstar_db.models import ShapePrimitiveData, ShapePrimitiveKind
+
+# numeric columns of each primitive kind, named <parameter>_<component> for vector parameters
+SHAPE_PRIMITIVE_COLUMNS: dict[ShapePrimitiveKind, dict[str, tuple[str, ...]]] = {
+    ShapePrimitiveKind.sphere: {"center": ("x", "y", "z"), "radius": ()},
+    ShapePrimitiveKind.box: {"translation": ("x", "y", "z"), "scaling": ("x", "y", "z"), "rotation": ()},
+    ShapePrimitiveKind.pyramid: {"translation": ("x", "y", "z"), "scaling": ("x", "y", "z"), "rotation": ()},
+    ShapePrimitiveKind.cylinder: {"start": ("x", "y", "z"), "end": ("x", "y", "z"), "radius_bottom": (), "radius_top": ()},
+    ShapePrimitiveKind.ellipsoid: {
+        "center": ("x", "y", "z"),
+        "dir_major": ("x", "y", "z"),
+        "dir_minor": ("x", "y", "z"),
+        "radius_scale": ("x", "y", "z"),
+    },
+}
+
+
+class ShapePrimitivesOfKindForCif:
+    """Columns of all shape primitives of one kind prepared for conversion to binary CIF."""
+
+    kind: ShapePrimitiveKind
+    # position of primitive in shape_primitive_list, to restore the order of primitives of all kinds
+    index: np.ndarray  # int
+    id: np.ndarray  # int
+    # float columns, e.g. center_x, radius, rotation_axis_x, rotation_radians
+    columns: dict[str, np.ndarray]
+    # 0xRRGGBB, color_presence is 0 where color is defined and 2 where it is not
+    color: np.ndarray  # uint32
+    color_presence: Optional[np.ndarray]  # uint8
+    # alpha of RGBA colors in 0..1, color_alpha_presence is 2 where color has no alpha
+    color_alpha: np.ndarray  # float32
+    color_alpha_presence: Optional[np.ndarray]  # uint8
+    label: list[str]
+    label_presence: Optional[np.ndarray]  # uint8
+
+    def __init__(self, kind: ShapePrimitiveKind, positions: list[int], primitives: list[dict]) -> None:
+        self.kind = kind
+        self.index = np.array(positions, dtype=np.int32)
+        self.id = np.array([p["id"] for p in primitives], dtype=np.int32)
+
+        self.columns = {}
+        for parameter, components in SHAPE_PRIMITIVE_COLUMNS[kind].items():
+            if parameter == "rotation":
+                axes = np.array([p[parameter]["axis"] for p in primitives], dtype=np.float32).reshape(-1, 3)
+                for i, component in enumerate(("x", "y", "z")):
+                    self.columns[f"rotation_axis_{component}"] = axes[:, i]
+                self.columns["rotation_radians"] = np.array(
+                    [p[parameter]["radians"] for p in primitives], dtype=np.float32
+                )
+            elif len(components) == 0:
+                self.columns[parameter] = np.array([p[parameter] for p in primitives], dtype=np.float32)
+            else:
+                values = np.array([p[parameter] for p in primitives], dtype=np.float32).reshape(-1, len(components))
+                for i, component in enumerate(components):
+                    self.columns[f"{parameter}_{component}"] = values[:, i]
+
+        # NOTE: color and label are stored only for some primitives (e.g. particles from star files)
+        colors = [_color_to_int(p.get("color")) for p in primitives]
+        self.color = np.array([c if c is not None else 0 for c in colors], dtype=np.uint32)
+        self.color_presence = _presence([c is not None for c in colors])
+        alphas = [_color_alpha(p.get("color")) for p in primitives]
+        self.color_alpha = np.array([a if a is not None else 0.0 for a in alphas], dtype=np.float32)
+        self.color_alpha_presence = _presence([a is not None for a in alphas])
+        labels = [p.get("label") for p in primitives]
+        self.label = [str(label) if label is not None else "" for label in labels]
+        self.label_presence = _presence([label is not None for label in labels])
+
+    @property
+    def size(self) -> int:
+        return self.id.shape[0]
+
+
+def shape_primitives_for_cif(primitives: ShapePrimitiveData) -> list[ShapePrimitivesOfKindForCif]:
+    """
+    Splits primitives by kind, kinds in the order of ShapePrimitiveKind, only the kinds present
+    """
+    positions_by_kind: dict[ShapePrimitiveKind, list[int]] = {}
+    for position, primitive in enumerate(primitives["shape_primitive_list"]):
+        kind = ShapePrimitiveKind(primitive["kind"])
+        if kind not in SHAPE_PRIMITIVE_COLUMNS:
+            raise ValueError(f"Shape primitive kind {kind.value} is not supported in BinaryCIF")
+        positions_by_kind.setdefault(kind, []).append(position)
+
+    return [
+        ShapePrimitivesOfKindForCif(
+            kind, positions_by_kind[kind], [primitives["shape_primitive_list"][p] for p in positions_by_kind[kind]]
+        )
+        for kind in ShapePrimitiveKind
+        if kind in positions_by_kind
+    ]
+
+
+def _color_to_int(color) -> Optional[int]:
+    """
+    Color as 0xRRGGBB int or [r, g, b(, a)] floats in 0..1
+    """
+    if isinstance(color, int):
+        return color
+    if isinstance(color, (list, tuple)) and len(color) >= 3:
+        r, g, b = (int(round(min(max(c, 0.0), 1.0) * 255)) for c in color[:3])
+        return (r << 16) | (g << 8) | b
+    return None
+
+
+def _color_alpha(color) -> Optional[float]:
+    """
+    Alpha of [r, g, b, a] color, None for colors without alpha
+    """
+    if isinstance(color, (list, tuple)) and len(color) >= 4:
+        return float(min(max(color[3], 0.0), 1.0))
+    return None
+
+
+def _presence(defined: list[bool]) -> Optional[np.ndarray]:
+    if all(defined):
+        return None
+    # 0 = defined, 2 = ? (unknown)
+    return np.where(np.array(defined, dtype=bool), 0, 2).astype(np.uint8)
@@ -0,0 +1,14 @@
+import numpy as np
+
+
+class TemporalDeltaVolume:
+    """
+    Quantization codes (uint8) of a timeframe stored as difference to codes of the previous timeframe,
+    wrapping modulo 256, so that voxels which did not change between timeframes are zeros
+    """
+
+    def __init__(self, codes: np.ndarray, previous_codes: np.ndarray):
+        assert codes.dtype == np.uint8 and previous_codes.dtype == np.uint8
+        self.values = np.subtract(codes, previous_codes, dtype=np.uint8)
+        # number of runs of equal values, decides whether run-length encoding pays off
+        self.runs = int(np.count_nonzero(self.values[1:] != self.values[:-1])) + 1 if self.values.size else 0
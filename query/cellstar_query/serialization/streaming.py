@@ -0,0 +1,119 @@
+from typing import Any, Iterator, List, Optional
+
+import msgpack
+import numpy as np
+from ciftools.binary.encoded_data import EncodedCIFColumn, EncodedCIFData
+from ciftools.binary.encoder import BYTE_ARRAY, RUN_LENGTH, ComposeEncoders
+# NOTE: private helpers of ciftools BinaryCIFWriter, valid for ciftools pinned to commit b074526a
+# in environment*.yaml, check them when updating the pin
+from ciftools.binary.writer import _DataWrapper, _encode_field
+from ciftools.models.writer import CIFCategoryDesc, CIFFieldDesc
+
+
+class StreamingBinaryCIFWriter:
+    """
+    Same interface and output as ciftools BinaryCIFWriter, but categories are only recorded when written
+    and encoded column by column while the output is iterated, so at most one encoded column
+    is held in memory at a time (instead of all encoded columns plus the whole packed file)
+    """
+
+    def __init__(self, encoder: str):
+        self._encoder = encoder
+        self._data_blocks: list[tuple[str, list[tuple[CIFCategoryDesc, list[_DataWrapper], int]]]] = []
+
+    def start_data_block(self, header: str) -> None:
+        _header = header.replace(" ", "").replace("\n", "").replace("\t", "").upper()
+        self._data_blocks.append((_header, []))
+
+    def write_category(self, category: CIFCategoryDesc, data: List[Any]) -> None:
+        if not self._data_blocks:
+            raise Exception("No data block created.")
+
+        instances = [_DataWrapper(data=d, count=category.get_row_count(d)) for d in data]
+        instances = [i for i in instances if i.count > 0]
+        total_count = sum(i.count for i in instances)
+        if not total_count:
+            return
+
+        self._data_blocks[-1][1].append((category, instances, total_count))
+
+    def iter_encode(self) -> Iterator[bytes]:
+        """
+        Yields msgpack encoded file in parts, each column is encoded only when it is reached
+        """
+        packer = msgpack.Packer()
+        yield packer.pack_map_header(3)
+        yield packer.pack("version") + packer.pack("0.3.0")
+        yield packer.pack("encoder") + packer.pack(self._encoder)
+        yield packer.pack("dataBlocks") + packer.pack_array_header(len(self._data_blocks))
+
+        data_blocks = self._data_blocks
+        # NOTE: written data is released as soon as it is encoded
+        self._data_blocks = []
+        while data_blocks:
+            header, categories = data_blocks.pop(0)
+            yield packer.pack_map_header(2)
+            yield packer.pack("header") + packer.pack(header)
+            yield packer.pack("categories") + packer.pack_array_header(len(categories))
+            while categories:
+                category, instances, total_count = categories.pop(0)
+                fields = category.get_field_descriptors(instances[0].data)
+                yield packer.pack_map_header(3)
+                yield packer.pack("name") + packer.pack(f"_{category.name}")
+                yield packer.pack("rowCount") + packer.pack(total_count)
+                yield packer.pack("columns") + packer.pack_array_header(len(fields))
+                for field in fields:
+                    yield packer.pack(_encode_column(field, instances, total_count))
+
+    def encode(self) -> bytes:
+        return b"".join(self.iter_encode())
+
+
+def _encode_column(field: CIFFieldDesc, instances: list[_DataWrapper], total_count: int) -> EncodedCIFColumn:
+    """
+    Encodes array of a single category instance directly, without copying it to a new column array first
+    (encoders do not modify their input). Everything else is encoded by ciftools
+    (with mask of presence arrays added, see _presence_mask)
+    """
+    if len(instances) == 1 and field.value_array is not None and field.presence_array is None:
+        values = field.value_array(instances[0].data)
+        column_array = field.create_array(0)
+        if (
+            isinstance(values, np.ndarray)
+            and isinstance(column_array, np.ndarray)
+            and values.ndim == 1
+            and values.dtype == column_array.dtype
+            and len(values) == total_count
+        ):
+            encoder = field.encoder(instances[0].data)
+            return {"name": field.name, "data": encoder.encode(values), "mask": None}
+
+    column = _encode_field(field, instances, total_count)
+    if column["mask"] is None and field.presence_array is not None:
+        column["mask"] = _presence_mask(field, instances, total_count)
+    return column
+
+
+_MASK_RLE_ENCODER = ComposeEncoders(RUN_LENGTH, BYTE_ARRAY)
+
+
+def _presence_mask(field: CIFFieldDesc, instances: list[_DataWrapper], total_count: int) -> Optional[EncodedCIFData]:
+    """
+    Mask of presence arrays (number_array presence, string_array mask), ciftools encodes them
+    into the column mask but then drops it as if all values were present
+    """
+    mask = np.zeros(total_count, dtype=np.uint8)
+    offset = 0
+    for instance in instances:
+        presence = field.presence_array(instance.data)
+        if presence is not None:
+            mask[offset : offset + instance.count] = presence
+        offset += instance.count
+    if not mask.any():
+        return None
+    mask_rle = _MASK_RLE_ENCODER.encode(mask)
+    return mask_rle if len(mask_rle["data"]) < len(mask) else BYTE_ARRAY.encode(mask)
+
+
+def create_streaming_binary_writer(*, encoder: str = "ciftools-python") -> StreamingBinaryCIFWriter:
+    return StreamingBinaryCIFWriter(encoder=encoder)
@@ -1,6 +1,8 @@
 import numpy as np
 from ciftools.binary import encoder
 from ciftools.binary.data_types import DataType, DataTypeEnum
+from ciftools.binary.encoded_data import EncodedCIFData
+from ciftools.binary.encoding_types import EncodingEnun
 from ciftools.binary.encoder import BinaryCIFEncoder
 
 
@@ -25,6 +27,13 @@ def delta_rl_encoder(_) -> BinaryCIFEncoder:
     return _DELTA_RLE_ENCODER
 
 
+_RLE_ENCODER = encoder.ComposeEncoders(encoder.RUN_LENGTH, encoder.BYTE_ARRAY)
+
+
+def rl_encoder(_) -> BinaryCIFEncoder:
+    """Applies encodings: run-length, byte-array"""
+    return _RLE_ENCODER
+
 _DELTA_PACK_ENCODER = encoder.ComposeEncoders(encoder.DELTA, encoder.INTEGER_PACKING)
 
 
@@ -47,6 +56,26 @@ def coord_encoder(coords: np.ndarray) -> BinaryCIFEncoder:
     )
 
 
+class IntervalQuantizedByteArray(BinaryCIFEncoder):
+    """
+    Byte-array encoder for data already quantized to uint8 on [minimum, maximum],
+    which records interval-quantization encoding so that clients decode it as usual
+    """
+
+    def __init__(self, minimum: float, maximum: float, num_steps: int, src_dtype: np.dtype):
+        self._encoding = {
+            "min": float(minimum),
+            "max": float(maximum),
+            "numSteps": num_steps,
+            "srcType": DataType.from_dtype(np.dtype(src_dtype)),
+            "kind": EncodingEnun.IntervalQuantization,
+        }
+
+    def encode(self, data: np.ndarray) -> EncodedCIFData:
+        encoded = encoder.BYTE_ARRAY.encode(data)
+        return EncodedCIFData(data=encoded["data"], encoding=[self._encoding, *encoded["encoding"]])
+
+
 def decide_encoder(ctx: np.ndarray, data_name: str) -> tuple[BinaryCIFEncoder, np.dtype]:
     """Return an encoder appropriate for the given array and corresponding dtype"""
     data_type = DataType.from_dtype(ctx.dtype)
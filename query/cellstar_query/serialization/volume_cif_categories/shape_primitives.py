@@ -0,0 +1,93 @@
+"""CIF categories for shape primitives encoding (_shape_primitive_sphere, _shape_primitive_box etc.)"""
+
+from ciftools.models.writer import CIFCategoryDesc
+from ciftools.models.writer import CIFFieldDesc as Field
+
+from cellstar_db.models import ShapePrimitiveKind
+from cellstar_query.serialization.data.shape_primitives_for_cif import ShapePrimitivesOfKindForCif
+from cellstar_query.serialization.volume_cif_categories import encoders
+
+
+def _field_descriptors(data: ShapePrimitivesOfKindForCif):
+    fields = [
+        Field[ShapePrimitivesOfKindForCif].number_array(
+            name="index", array=lambda d: d.index, dtype=data.index.dtype, encoder=encoders.delta_rl_encoder
+        ),
+        Field[ShapePrimitivesOfKindForCif].number_array(
+            name="id", array=lambda d: d.id, dtype=data.id.dtype, encoder=encoders.delta_rl_encoder
+        ),
+    ]
+    for name, column in data.columns.items():
+        fields.append(
+            Field[ShapePrimitivesOfKindForCif].number_array(
+                # NOTE: name bound as default argument, lambdas are called after the loop
+                name=name, array=lambda d, name=name: d.columns[name], dtype=column.dtype, encoder=encoders.bytearray_encoder
+            )
+        )
+    fields.append(
+        Field[ShapePrimitivesOfKindForCif].number_array(
+            name="color",
+            array=lambda d: d.color,
+            dtype=data.color.dtype,
+            encoder=encoders.rl_encoder,
+            presence=lambda d: d.color_presence,
+        )
+    )
+    fields.append(
+        Field[ShapePrimitivesOfKindForCif].number_array(
+            name="color_alpha",
+            array=lambda d: d.color_alpha,
+            dtype=data.color_alpha.dtype,
+            encoder=encoders.bytearray_encoder,
+            presence=lambda d: d.color_alpha_presence,
+        )
+    )
+    fields.append(
+        Field[ShapePrimitivesOfKindForCif].string_array(
+            name="label", array=lambda d: d.label, mask=lambda d: d.label_presence
+        )
+    )
+    return fields
+
+
+def _row_count(data: ShapePrimitivesOfKindForCif) -> int:
+    return data.size
+
+
+class ShapePrimitiveSphereCategory(CIFCategoryDesc):
+    name = "shape_primitive_sphere"
+    get_row_count = staticmethod(_row_count)
+    get_field_descriptors = staticmethod(_field_descriptors)
+
+
+class ShapePrimitiveBoxCategory(CIFCategoryDesc):
+    name = "shape_primitive_box"
+    get_row_count = staticmethod(_row_count)
+    get_field_descriptors = staticmethod(_field_descriptors)
+
+
+class ShapePrimitivePyramidCategory(CIFCategoryDesc):
+    name = "shape_primitive_pyramid"
+    get_row_count = staticmethod(_row_count)
+    get_field_descriptors = staticmethod(_field_descriptors)
+
+
+class ShapePrimitiveCylinderCategory(CIFCategoryDesc):
+    name = "shape_primitive_cylinder"
+    get_row_count = staticmethod(_row_count)
+    get_field_descriptors = staticmethod(_field_descriptors)
+
+
+class ShapePrimitiveEllipsoidCategory(CIFCategoryDesc):
+    name = "shape_primitive_ellipsoid"
+    get_row_count = staticmethod(_row_count)
+    get_field_descriptors = staticmethod(_field_descriptors)
+
+
+SHAPE_PRIMITIVE_CATEGORIES: dict[ShapePrimitiveKind, CIFCategoryDesc] = {
+    ShapePrimitiveKind.sphere: ShapePrimitiveSphereCategory,
+    ShapePrimitiveKind.box: ShapePrimitiveBoxCategory,
+    ShapePrimitiveKind.pyramid: ShapePrimitivePyramidCategory,
+    ShapePrimitiveKind.cylinder: ShapePrimitiveCylinderCategory,
+    ShapePrimitiveKind.ellipsoid: ShapePrimitiveEllipsoidCategory,
+}
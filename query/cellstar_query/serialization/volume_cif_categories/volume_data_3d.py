@@ -2,6 +2,8 @@ import numpy as np
 from ciftools.models.writer import CIFCategoryDesc
 from ciftools.models.writer import CIFFieldDesc as Field
 
+from cellstar_query.serialization.data.interval_quantized_volume import IntervalQuantizedVolume
+from cellstar_query.serialization.data.temporal_delta_volume import TemporalDeltaVolume
 from cellstar_query.serialization.volume_cif_categories import encoders
 
 
@@ -18,3 +20,63 @@ class VolumeData3dCategory(CIFCategoryDesc):
         return [
             Field.number_array(name="values", array=lambda volume: volume, encoder=lambda _: encoder, dtype=dtype),
         ]
+
+
+class QuantizedVolumeData3dCategory(CIFCategoryDesc):
+    """Stored quantized codes (uint8/uint16), decoded by client using volume_data_3d_quantization category"""
+
+    name = "volume_data_3d"
+
+    @staticmethod
+    def get_row_count(ctx: np.ndarray) -> int:
+        return ctx.size
+
+    @staticmethod
+    def get_field_descriptors(ctx: np.ndarray):
+        return [
+            Field.number_array(
+                name="values", array=lambda volume: volume, encoder=encoders.bytearray_encoder, dtype=ctx.dtype
+            ),
+        ]
+
+
+class IntervalQuantizedVolumeData3dCategory(CIFCategoryDesc):
+    """Volume values quantized in advance on known interval, written without scanning for min/max"""
+
+    name = "volume_data_3d"
+
+    @staticmethod
+    def get_row_count(ctx: IntervalQuantizedVolume) -> int:
+        return ctx.values.size
+
+    @staticmethod
+    def get_field_descriptors(ctx: IntervalQuantizedVolume):
+        encoder = encoders.IntervalQuantizedByteArray(ctx.min, ctx.max, ctx.num_steps, ctx.src_dtype)
+        return [
+            Field[IntervalQuantizedVolume].number_array(
+                name="values", array=lambda d: d.values, encoder=lambda _: encoder, dtype=ctx.values.dtype
+            ),
+        ]
+
+
+class TemporalDeltaVolumeData3dCategory(CIFCategoryDesc):
+    """
+    Quantization codes of a timeframe as uint8 differences to codes of volume_data_3d in the previous data block:
+    codes = (previous codes + values) mod 256, decoded with the same quantization as the previous block
+    """
+
+    name = "volume_data_3d_delta"
+
+    @staticmethod
+    def get_row_count(ctx: TemporalDeltaVolume) -> int:
+        return ctx.values.size
+
+    @staticmethod
+    def get_field_descriptors(ctx: TemporalDeltaVolume):
+        # NOTE: run-length encoding writes 8 bytes per run instead of 1 byte per value
+        encoder = encoders.rl_encoder if ctx.runs * 8 < ctx.values.size else encoders.bytearray_encoder
+        return [
+            Field[TemporalDeltaVolume].number_array(
+                name="values", array=lambda d: d.values, encoder=encoder, dtype=ctx.values.dtype
+            ),
+        ]
@@ -0,0 +1,31 @@
+from cellstar_db.models import VolumeQuantizationData
+from ciftools.models.writer import CIFCategoryDesc
+from ciftools.models.writer import CIFFieldDesc as Field
+
+from cellstar_query.serialization.volume_cif_categories import encoders
+
+
+class VolumeData3dQuantizationCategory(CIFCategoryDesc):
+    """
+    Parameters for decoding quantized volume_data_3d values:
+    exp(value * (max - min) / (num_steps - 1) + min) - 1 + to_remove_negatives
+    """
+
+    name = "volume_data_3d_quantization"
+
+    @staticmethod
+    def get_row_count(_) -> int:
+        return 1
+
+    @staticmethod
+    def get_field_descriptors(ctx: VolumeQuantizationData):
+        byte_array = encoders.bytearray_encoder
+        return [
+            Field.numbers(name="min", value=lambda d, i: ctx["min"], encoder=byte_array, dtype="f8"),
+            Field.numbers(name="max", value=lambda d, i: ctx["max"], encoder=byte_array, dtype="f8"),
+            Field.numbers(name="num_steps", value=lambda d, i: ctx["num_steps"], encoder=byte_array, dtype="i4"),
+            Field.numbers(
+                name="to_remove_negatives", value=lambda d, i: ctx["to_remove_negatives"], encoder=byte_array, dtype="f8"
+            ),
+            Field.strings(name="src_type", value=lambda d, i: ctx["src_type"]),
+        ]
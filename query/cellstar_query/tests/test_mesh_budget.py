@@ -0,0 +1,65 @@
+from pathlib import Path
+
+from cellstar_db.file_system.db import FileSystemVolumeServerDB
+from cellstar_db.file_system.models import FileSystemVolumeMedatada
+from cellstar_query.core.service import VolumeServerService, _decide_detail_lvls
+from cellstar_query.requests import MeshRequest
+
+# segment id => detail lvl => (vertices, triangles)
+COUNTS = {
+    1: {1: (1000, 2000), 2: (400, 800), 4: (100, 200)},
+    2: {1: (10, 20), 2: (5, 10)},
+    3: {2: (50, 100), 4: (20, 40)},
+}
+
+
+def test_decide_detail_lvls_without_budget():
+    # segment 3 has no lvl 1, closest finer is lvl 2
+    assert _decide_detail_lvls(COUNTS, [1, 2, 3], 1) == {1: 1, 2: 1, 3: 2}
+    assert _decide_detail_lvls(COUNTS, [1, 2, 3], 4) == {1: 4, 2: 2, 3: 4}
+
+
+def test_decide_detail_lvls_per_segment():
+    # large segment 1 does not fit at lvl 1, small segment 2 still does
+    counts = {1: {1: (1000, 2000), 2: (400, 800)}, 2: {1: (10, 20), 2: (5, 10)}}
+    assert _decide_detail_lvls(counts, [1, 2], 1, max_triangles=900) == {1: 2, 2: 1}
+    assert _decide_detail_lvls(COUNTS, [1, 2, 3], 1, max_triangles=1000) == {1: 2, 2: 1, 3: 2}
+    assert _decide_detail_lvls(COUNTS, [1, 2, 3], 1, max_vertices=200) == {1: 4, 2: 1, 3: 2}
+    assert _decide_detail_lvls(COUNTS, [1, 2, 3], 1, max_vertices=10000, max_triangles=10000) == {1: 1, 2: 1, 3: 2}
+
+
+def test_decide_detail_lvls_coarsest_if_nothing_fits():
+    assert _decide_detail_lvls(COUNTS, [1, 2, 3], 1, max_triangles=10) == {1: 4, 2: 2, 3: 4}
+    # never coarser than available, never finer than requested
+    assert _decide_detail_lvls(COUNTS, [2], 2, max_triangles=1000) == {2: 2}
+
+
+def _metadata(counts: dict) -> FileSystemVolumeMedatada:
+    segment_ids = {
+        str(s): {
+            "detail_lvls": {
+                str(lvl): {"mesh_ids": {"0": {"num_vertices": v, "num_triangles": t}}} for lvl, (v, t) in lvls.items()
+            }
+        }
+        for s, lvls in counts.items()
+    }
+    return FileSystemVolumeMedatada(
+        {
+            "segmentation_meshes": {
+                "segmentation_metadata": {"0": {"mesh_timeframes": {"0": {"segment_ids": segment_ids}}}}
+            }
+        }
+    )
+
+
+def test_apply_mesh_budget(tmp_path: Path):
+    service = VolumeServerService(FileSystemVolumeServerDB(folder=tmp_path))
+    metadata = _metadata(COUNTS)
+    req = MeshRequest(source="emdb", structure_id="emd-1", segmentation_id="0", segment_id=1, detail_lvl=1, time=0)
+
+    assert service._apply_mesh_budget(req, metadata) is req
+    assert service._apply_mesh_budget(req.copy(update={"max_triangles": 1000}), metadata).detail_lvl == 2
+    assert service._apply_mesh_budget(req.copy(update={"max_vertices": 50}), metadata).detail_lvl == 4
+    # unknown segment is left for the read to fail
+    unknown = req.copy(update={"segment_id": 9, "max_triangles": 1000})
+    assert service._apply_mesh_budget(unknown, metadata).detail_lvl == 1
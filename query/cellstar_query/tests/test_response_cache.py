@@ -0,0 +1,57 @@
+import asyncio
+from pathlib import Path
+from unittest import mock
+
+import pytest
+
+from cellstar_db.file_system.db import FileSystemVolumeServerDB
+from cellstar_query.core import response_cache
+from cellstar_query.core.response_cache import NotModified, ResponseCache, etag_matches, response_etag
+from cellstar_query.core.service import VolumeServerService
+
+KEY = ("emdb", "emd-1", "1-2.3-4.-", "volume_cell", "0", 0, 10000)
+
+
+def test_etag_matches():
+    etag = response_etag(KEY)
+    assert etag_matches(etag, etag)
+    assert etag_matches(f'"other", W/{etag}', etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches('"other"', etag)
+    assert not etag_matches(None, etag)
+
+
+def test_etag_changes_with_data_and_format_version():
+    etag = response_etag(KEY)
+    assert response_etag(KEY[:2] + ("2-2.3-4.-",) + KEY[3:]) != etag
+    with mock.patch.object(response_cache, "RESPONSE_FORMAT_VERSION", response_cache.RESPONSE_FORMAT_VERSION + 1):
+        assert response_etag(KEY) != etag
+
+
+def test_cached_response_hit_and_not_modified(tmp_path: Path):
+    service = VolumeServerService(
+        FileSystemVolumeServerDB(folder=tmp_path / "db"), response_cache=ResponseCache(disk_path=tmp_path / "cache")
+    )
+    computed = []
+
+    async def compute() -> bytes:
+        computed.append(1)
+        return b"response"
+
+    first = asyncio.run(service._cached_response(KEY, compute))
+    assert first == b"response" and first.etag == response_etag(KEY)
+    # memory hit
+    assert asyncio.run(service._cached_response(KEY, compute)).etag == first.etag
+    assert len(computed) == 1
+
+    # client already has it, nothing is computed or read
+    with pytest.raises(NotModified) as e:
+        asyncio.run(service._cached_response(KEY, compute, if_none_match=first.etag))
+    assert e.value.etag == first.etag
+    assert len(computed) == 1
+
+    # disk hit after restart
+    restarted = ResponseCache(disk_path=tmp_path / "cache")
+    cached = asyncio.run(restarted.get(KEY))
+    assert cached == b"response" and cached.etag == first.etag
+    assert restarted.stats()["disk_hits"] == 1
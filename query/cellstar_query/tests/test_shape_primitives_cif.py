@@ -0,0 +1,21 @@
+from ciftools.serialization import loads
+
+from cellstar_query.serialization.cif import serialize_shape_primitives
+
+
+def test_shape_primitive_colors_and_labels():
+    primitives = {
+        "shape_primitive_list": [
+            {"id": 1, "kind": "sphere", "center": [1, 2, 3], "radius": 4.0, "color": [1.0, 0.0, 0.5, 0.25], "label": "a"},
+            {"id": 2, "kind": "sphere", "center": [4, 5, 6], "radius": 1.0, "color": 0x00FF00},
+            {"id": 3, "kind": "sphere", "center": [7, 8, 9], "radius": 1.0},
+        ]
+    }
+    category = loads(serialize_shape_primitives(primitives, "colors"), lazy=False).data_blocks[0]["shape_primitive_sphere"]
+
+    assert [category["color"].get_integer(i) for i in range(2)] == [0xFF0080, 0x00FF00]
+    assert list(category["color"].value_presences) == [0, 0, 2]
+    # alpha of RGBA colors only
+    assert category["color_alpha"].get_float(0) == 0.25
+    assert list(category["color_alpha"].value_presences) == [0, 2, 2]
+    assert list(category["label"].value_presences) == [0, 2, 2]
@@ -1,19 +1,97 @@
-from typing import Optional
+import uuid
+from typing import Optional, Union
 from cellstar_db.file_system.annotations_context import AnnnotationsEditContext
+from cellstar_db.file_system.chunk_cache import get_chunk_cache
 from cellstar_db.file_system.db import FileSystemVolumeServerDB
 from cellstar_db.models import AnnotationsMetadata, DescriptionData, SegmentAnnotationData
 
-from fastapi import Body, FastAPI, Query, Response
-from starlette.responses import JSONResponse
+from fastapi import Body, FastAPI, Header, Query, Request, Response
+from starlette.responses import JSONResponse, StreamingResponse
 
+from cellstar_query.core.response_cache import NotModified, ProgressiveResponse, ResponseStream
 from cellstar_query.core.service import VolumeServerService
 from cellstar_query.serialization.json_numpy_response import JSONNumpyResponse
 from cellstar_server.app.settings import settings
-from cellstar_query.requests import GeometricSegmentationRequest
-from cellstar_query.query import HTTP_CODE_UNPROCESSABLE_ENTITY, get_geometric_segmentation_query, get_list_entries_query, get_meshes_bcif_query, get_meshes_query, get_metadata_query, get_segmentation_box_query, get_segmentation_cell_query, get_volume_box_query, get_volume_cell_query, get_volume_info_query, get_list_entries_keyword_query
+from cellstar_query.requests import GeometricSegmentationRequest, VolumeRequestEncoding, VolumeRoi
+from cellstar_query.query import HTTP_CODE_UNPROCESSABLE_ENTITY, get_geometric_segmentation_box_query, get_geometric_segmentation_query, get_list_entries_query, get_meshes_bcif_query, get_meshes_query, get_metadata_query, get_segments_meshes_bcif_query, get_segmentation_box_query, get_segmentation_cell_query, get_volume_box_query, get_volume_cell_query, get_volume_channels_box_query, get_volume_channels_cell_query, get_volume_time_range_box_query, get_volume_rois_query, get_volume_info_query, get_list_entries_keyword_query
+
+# Accept header values for which shape primitives are served as BinaryCIF instead of JSON
+BCIF_MEDIA_TYPES = ("application/octet-stream", "application/x-bcif", "application/bcif")
+
+
+def _bcif_response(response: Union[bytes, ResponseStream, ProgressiveResponse], filename: str) -> Response:
+    if isinstance(response, ProgressiveResponse):
+        return _multipart_response(response, filename)
+    headers = {"Content-Disposition": f'attachment;filename="{filename}"'}
+    etag = getattr(response, "etag", None)
+    if etag is not None:
+        headers["ETag"] = etag
+    if isinstance(response, ResponseStream):
+        # sent with chunked transfer encoding while being encoded by the executor (within its task kind limit)
+        return StreamingResponse(response.chunks, headers=headers)
+    return Response(response, headers=headers)
+
+
+def _accepts_bcif(accept: Optional[str]) -> bool:
+    """
+    True if client asks for BinaryCIF in Accept header, JSON is served otherwise
+    """
+    if accept is None:
+        return False
+    media_types = [part.split(";")[0].strip().lower() for part in accept.split(",")]
+    return any(t in BCIF_MEDIA_TYPES for t in media_types)
+
+
+def _shape_primitives_response(response: Union[bytes, dict], bcif: bool, filename: str) -> Response:
+    response = _bcif_response(response, filename) if bcif else JSONResponse(response)
+    # the same URL is served as JSON or BinaryCIF
+    response.headers["Vary"] = "Accept"
+    return response
+
+
+def _shape_primitives_not_modified(exc: NotModified) -> Response:
+    return Response(status_code=304, headers={"ETag": exc.etag, "Vary": "Accept"})
+
+
+def _multipart_response(response: ProgressiveResponse, filename: str) -> Response:
+    """
+    Parts of progressive response as multipart/mixed body, each part is sent as soon as it is ready
+    """
+    boundary = uuid.uuid4().hex
+
+    async def body():
+        async for part_headers, part in response.parts:
+            headers = {
+                "Content-Type": "application/octet-stream",
+                "Content-Disposition": f'attachment;filename="{filename}"',
+                **part_headers,
+            }
+            etag = getattr(part, "etag", None)
+            if etag is not None:
+                headers["ETag"] = etag
+            if not isinstance(part, ResponseStream):
+                headers["Content-Length"] = str(len(part))
+            yield (f"--{boundary}\r\n" + "".join(f"{k}: {v}\r\n" for k, v in headers.items()) + "\r\n").encode()
+            if isinstance(part, ResponseStream):
+                async for chunk in part.chunks:
+                    yield chunk
+            else:
+                yield bytes(part)
+            yield b"\r\n"
+        yield f"--{boundary}--\r\n".encode()
+
+    return StreamingResponse(body(), media_type=f"multipart/mixed; boundary={boundary}")
+
+
+def _client_id(request: Request) -> Optional[str]:
+    return request.client.host if request.client is not None else None
 
 
 def configure_endpoints(app: FastAPI, volume_server: VolumeServerService):
+    @app.exception_handler(NotModified)
+    async def not_modified_handler(request: Request, exc: NotModified):
+        return Response(status_code=304, headers={"ETag": exc.etag})
+
     # TODO: make it pydantic model for validation purposes
     @app.post("/v1/{source}/{id}/annotations_json/update")
     async def annotations_json_update(source: str, id: str,
@@ -75,20 +153,35 @@ def configure_endpoints(app: FastAPI, volume_server: VolumeServerService):
         }
 
 
+    @app.get("/v1/stats")
+    async def get_stats():
+        return {
+            **volume_server.stats(),
+            "chunk_cache": get_chunk_cache().stats(),
+        }
+
     @app.get("/v1/list_entries/{limit}")
     async def get_entries(limit: int = 100):
         response = await get_list_entries_query(volume_server=volume_server, limit=limit)
         return response
 
     @app.get("/v1/list_entries/{limit}/{keyword}")
-    async def get_entries_keyword(keyword: str, limit: int = 100):
-        response = await get_list_entries_keyword_query(
-            volume_server=volume_server, limit=limit, keyword=keyword
-        )
+    async def get_entries_keyword(
+        keyword: str,
+        limit: int = 100,
+        offset: int = Query(0, description="Number of best matching entries to skip, for pagination"),
+    ):
+        try:
+            response = await get_list_entries_keyword_query(
+                volume_server=volume_server, limit=limit, keyword=keyword, offset=offset
+            )
+        except ValueError as e:
+            return JSONResponse({"error": str(e)}, status_code=HTTP_CODE_UNPROCESSABLE_ENTITY)
         return response
 
     @app.get("/v1/{source}/{id}/segmentation/box/{segmentation}/{time}/{a1}/{a2}/{a3}/{b1}/{b2}/{b3}")
     async def get_segmentation_box(
+        request: Request,
         source: str,
         id: str,
         segmentation: str,
@@ -99,7 +192,9 @@ def configure_endpoints(app: FastAPI, volume_server: VolumeServerService):
         b1: float,
         b2: float,
         b3: float,
-        max_points: Optional[int] = Query(0)
+        max_points: Optional[int] = Query(0),
+        progressive: bool = Query(False, description="Send all downsampling levels from the coarsest one as multipart/mixed response"),
+        if_none_match: Optional[str] = Header(None),
     ):
         response = await get_segmentation_box_query(
             volume_server=volume_server,
@@ -113,13 +208,17 @@ def configure_endpoints(app: FastAPI, volume_server: VolumeServerService):
             b1=b1,
             b2=b2,
             b3=b3,
-            max_points=max_points
+            max_points=max_points,
+            if_none_match=if_none_match,
+            client_id=_client_id(request),
+            progressive=progressive,
         )
 
-        return Response(response, headers={"Content-Disposition": f'attachment;filename="{id}.bcif"'})
+        return _bcif_response(response, f"{id}.bcif")
 
     @app.get("/v1/{source}/{id}/volume/box/{time}/{channel_id}/{a1}/{a2}/{a3}/{b1}/{b2}/{b3}")
     async def get_volume_box(
+        request: Request,
         source: str,
         id: str,
         time: int,
@@ -131,6 +230,9 @@ def configure_endpoints(app: FastAPI, volume_server: VolumeServerService):
         b2: float,
         b3: float,
         max_points: Optional[int] = Query(0),
+        encoding: VolumeRequestEncoding = Query(VolumeRequestEncoding.default),
+        progressive: bool = Query(False, description="Send all downsampling levels from the coarsest one as multipart/mixed response"),
+        if_none_match: Optional[str] = Header(None),
     ):
         response = await get_volume_box_query(
             volume_server=volume_server,
@@ -144,36 +246,196 @@ def configure_endpoints(app: FastAPI, volume_server: VolumeServerService):
             b1=b1,
             b2=b2,
             b3=b3,
-            max_points=max_points
+            max_points=max_points,
+            encoding=encoding,
+            if_none_match=if_none_match,
+            client_id=_client_id(request),
+            progressive=progressive,
         )
 
-        return Response(response, headers={"Content-Disposition": f'attachment;filename="{id}.bcif"'})
+        return _bcif_response(response, f"{id}.bcif")
 
     @app.get("/v1/{source}/{id}/segmentation/cell/{segmentation}/{time}")
-    async def get_segmentation_cell(source: str, id: str, segmentation: str, time: int, max_points: Optional[int] = Query(0)):
+    async def get_segmentation_cell(
+        request: Request,
+        source: str,
+        id: str,
+        segmentation: str,
+        time: int,
+        max_points: Optional[int] = Query(0),
+        progressive: bool = Query(False, description="Send all downsampling levels from the coarsest one as multipart/mixed response"),
+        if_none_match: Optional[str] = Header(None),
+    ):
         response = await get_segmentation_cell_query(
             volume_server=volume_server,
             source=source,
             id=id,
             segmentation=segmentation,
             time=time,
-            max_points=max_points
+            max_points=max_points,
+            if_none_match=if_none_match,
+            client_id=_client_id(request),
+            progressive=progressive,
         )
 
-        return Response(response, headers={"Content-Disposition": f'attachment;filename="{id}.bcif"'})
+        return _bcif_response(response, f"{id}.bcif")
 
     @app.get("/v1/{source}/{id}/volume/cell/{time}/{channel_id}")
-    async def get_volume_cell(source: str, id: str, time: int, channel_id: str, max_points: Optional[int] = Query(0)):
+    async def get_volume_cell(
+        request: Request,
+        source: str,
+        id: str,
+        time: int,
+        channel_id: str,
+        max_points: Optional[int] = Query(0),
+        encoding: VolumeRequestEncoding = Query(VolumeRequestEncoding.default),
+        progressive: bool = Query(False, description="Send all downsampling levels from the coarsest one as multipart/mixed response"),
+        if_none_match: Optional[str] = Header(None),
+    ):
         response = await get_volume_cell_query(
             volume_server=volume_server,
             source=source,
             id=id,
             time=time,
             channel_id=channel_id,
-            max_points=max_points
+            max_points=max_points,
+            encoding=encoding,
+            if_none_match=if_none_match,
+            client_id=_client_id(request),
+            progressive=progressive,
         )
 
-        return Response(response, headers={"Content-Disposition": f'attachment;filename="{id}.bcif"'})
+        return _bcif_response(response, f"{id}.bcif")
+
+    @app.get("/v1/{source}/{id}/volume/channels/box/{time}/{a1}/{a2}/{a3}/{b1}/{b2}/{b3}")
+    async def get_volume_channels_box(
+        source: str,
+        id: str,
+        time: int,
+        a1: float,
+        a2: float,
+        a3: float,
+        b1: float,
+        b2: float,
+        b3: float,
+        channel_ids: Optional[list[str]] = Query(None, description="Channels to return, all channels if not provided"),
+        max_points: Optional[int] = Query(0),
+        encoding: VolumeRequestEncoding = Query(VolumeRequestEncoding.default),
+        if_none_match: Optional[str] = Header(None),
+    ):
+        try:
+            response = await get_volume_channels_box_query(
+                volume_server=volume_server,
+                source=source,
+                id=id,
+                time=time,
+                channel_ids=channel_ids,
+                a1=a1,
+                a2=a2,
+                a3=a3,
+                b1=b1,
+                b2=b2,
+                b3=b3,
+                max_points=max_points,
+                encoding=encoding,
+                if_none_match=if_none_match
+            )
+        except ValueError as e:
+            return JSONResponse({"error": str(e)}, status_code=HTTP_CODE_UNPROCESSABLE_ENTITY)
+
+        return _bcif_response(response, f"{id}.bcif")
+
+    @app.get("/v1/{source}/{id}/volume/box_range/{time_start}/{time_end}/{channel_id}/{a1}/{a2}/{a3}/{b1}/{b2}/{b3}")
+    async def get_volume_time_range_box(
+        source: str,
+        id: str,
+        time_start: int,
+        time_end: int,
+        channel_id: str,
+        a1: float,
+        a2: float,
+        a3: float,
+        b1: float,
+        b2: float,
+        b3: float,
+        max_points: Optional[int] = Query(0),
+        encoding: VolumeRequestEncoding = Query(VolumeRequestEncoding.default),
+        temporal_delta: bool = Query(False, description="Send quantization codes as differences to the previous timeframe"),
+        if_none_match: Optional[str] = Header(None),
+    ):
+        try:
+            response = await get_volume_time_range_box_query(
+                volume_server=volume_server,
+                source=source,
+                id=id,
+                time_start=time_start,
+                time_end=time_end,
+                channel_id=channel_id,
+                a1=a1,
+                a2=a2,
+                a3=a3,
+                b1=b1,
+                b2=b2,
+                b3=b3,
+                max_points=max_points,
+                encoding=encoding,
+                temporal_delta=temporal_delta,
+                if_none_match=if_none_match
+            )
+        except ValueError as e:
+            return JSONResponse({"error": str(e)}, status_code=HTTP_CODE_UNPROCESSABLE_ENTITY)
+
+        return _bcif_response(response, f"{id}.bcif")
+
+    @app.get("/v1/{source}/{id}/volume/channels/cell/{time}")
+    async def get_volume_channels_cell(
+        source: str,
+        id: str,
+        time: int,
+        channel_ids: Optional[list[str]] = Query(None, description="Channels to return, all channels if not provided"),
+        max_points: Optional[int] = Query(0),
+        encoding: VolumeRequestEncoding = Query(VolumeRequestEncoding.default),
+        if_none_match: Optional[str] = Header(None),
+    ):
+        try:
+            response = await get_volume_channels_cell_query(
+                volume_server=volume_server,
+                source=source,
+                id=id,
+                time=time,
+                channel_ids=channel_ids,
+                max_points=max_points,
+                encoding=encoding,
+                if_none_match=if_none_match
+            )
+        except ValueError as e:
+            return JSONResponse({"error": str(e)}, status_code=HTTP_CODE_UNPROCESSABLE_ENTITY)
+
+        return _bcif_response(response, f"{id}.bcif")
+
+    @app.post("/v1/{source}/{id}/volume/rois")
+    async def get_volume_rois(
+        source: str,
+        id: str,
+        rois: list[VolumeRoi] = Body(..., embed=True),
+        max_points: Optional[int] = Body(None, embed=True),
+        encoding: VolumeRequestEncoding = Body(VolumeRequestEncoding.default, embed=True),
+        if_none_match: Optional[str] = Header(None),
+    ):
+        try:
+            response = await get_volume_rois_query(
+                volume_server=volume_server,
+                source=source,
+                id=id,
+                rois=rois,
+                max_points=max_points,
+                encoding=encoding,
+                if_none_match=if_none_match
+            )
+        except ValueError as e:
+            return JSONResponse({"error": str(e)}, status_code=HTTP_CODE_UNPROCESSABLE_ENTITY)
+
+        return _bcif_response(response, f"{id}.bcif")
 
     @app.get("/v1/{source}/{id}/metadata")
     async def get_metadata(
@@ -188,7 +450,10 @@ def configure_endpoints(app: FastAPI, volume_server: VolumeServerService):
     async def get_meshes(source: str, id: str, segmentation_id: str,
                           time: int,
                           segment_id: int,
-                          detail_lvl: int):
+                          detail_lvl: int,
+                          max_triangles: Optional[int] = Query(None, description="Use the finest detail level not finer than detail_lvl with at most this number of triangles"),
+                          max_vertices: Optional[int] = Query(None, description="Use the finest detail level not finer than detail_lvl with at most this number of vertices"),
+                          ):
         try:
             response = await get_meshes_query(
                 volume_server=volume_server,
@@ -197,22 +462,80 @@ def configure_endpoints(app: FastAPI, volume_server: VolumeServerService):
                 segmentation_id=segmentation_id,
                 time=time,
                 segment_id=segment_id,
-                detail_lvl=detail_lvl
+                detail_lvl=detail_lvl,
+                max_triangles=max_triangles,
+                max_vertices=max_vertices,
             )
             return JSONNumpyResponse(response)
         except Exception as e:
             return JSONResponse({"error": str(e)}, status_code=HTTP_CODE_UNPROCESSABLE_ENTITY)
         
     @app.get("/v1/{source}/{id}/geometric_segmentation/{segmentation_id}/{time}")
-    async def get_geometric_segmentation(source: str, id: str, segmentation_id: str, time: int):
-        response = await get_geometric_segmentation_query(
-            volume_server=volume_server,
-            source=source,
-            id=id,
-            segmentation_id=segmentation_id,
-            time=time
-        )
-        return response
+    async def get_geometric_segmentation(
+        source: str,
+        id: str,
+        segmentation_id: str,
+        time: int,
+        accept: Optional[str] = Header(None),
+        if_none_match: Optional[str] = Header(None),
+    ):
+        bcif = _accepts_bcif(accept)
+        try:
+            response = await get_geometric_segmentation_query(
+                volume_server=volume_server,
+                source=source,
+                id=id,
+                segmentation_id=segmentation_id,
+                time=time,
+                bcif=bcif,
+                if_none_match=if_none_match,
+            )
+        except NotModified as e:
+            return _shape_primitives_not_modified(e)
+        except ValueError as e:
+            # e.g. primitive kinds not supported in BinaryCIF
+            return JSONResponse({"error": str(e)}, status_code=HTTP_CODE_UNPROCESSABLE_ENTITY, headers={"Vary": "Accept"})
+        return _shape_primitives_response(response, bcif, f"{id}-{segmentation_id}-{time}.bcif")
+
+    @app.get("/v1/{source}/{id}/geometric_segmentation/{segmentation_id}/{time}/box/{a1}/{a2}/{a3}/{b1}/{b2}/{b3}")
+    async def get_geometric_segmentation_box(
+        source: str,
+        id: str,
+        segmentation_id: str,
+        time: int,
+        a1: float,
+        a2: float,
+        a3: float,
+        b1: float,
+        b2: float,
+        b3: float,
+        max_primitives: Optional[int] = Query(None, description="Return at most this number of primitives, in the stored order"),
+        accept: Optional[str] = Header(None),
+        if_none_match: Optional[str] = Header(None),
+    ):
+        bcif = _accepts_bcif(accept)
+        try:
+            response = await get_geometric_segmentation_box_query(
+                volume_server=volume_server,
+                source=source,
+                id=id,
+                segmentation_id=segmentation_id,
+                time=time,
+                a1=a1,
+                a2=a2,
+                a3=a3,
+                b1=b1,
+                b2=b2,
+                b3=b3,
+                max_primitives=max_primitives,
+                bcif=bcif,
+                if_none_match=if_none_match,
+            )
+        except NotModified as e:
+            return _shape_primitives_not_modified(e)
+        except Exception as e:
+            return JSONResponse({"error": str(e)}, status_code=HTTP_CODE_UNPROCESSABLE_ENTITY, headers={"Vary": "Accept"})
+        return _shape_primitives_response(response, bcif, f"{id}-{segmentation_id}-{time}-box.bcif")
         
     @app.get("/v1/{source}/{id}/volume_info")
     async def get_volume_info(
@@ -227,7 +550,10 @@ def configure_endpoints(app: FastAPI, volume_server: VolumeServerService):
     async def get_meshes_bcif(source: str, id: str, segmentation_id: str,
                           time: int,
                           segment_id: int,
-                          detail_lvl: int):
+                          detail_lvl: int,
+                          max_triangles: Optional[int] = Query(None, description="Use the finest detail level not finer than detail_lvl with at most this number of triangles"),
+                          max_vertices: Optional[int] = Query(None, description="Use the finest detail level not finer than detail_lvl with at most this number of vertices"),
+                          if_none_match: Optional[str] = Header(None)):
     
         try:
             response_bytes = await get_meshes_bcif_query(
@@ -237,12 +563,41 @@ def configure_endpoints(app: FastAPI, volume_server: VolumeServerService):
                 segmentation_id=segmentation_id,
                 time=time,
                 segment_id=segment_id,
-                detail_lvl=detail_lvl
-            )
-            return Response(
-                response_bytes, headers={"Content-Disposition": f'attachment;filename="{id}-volume_info.bcif"'}
+                detail_lvl=detail_lvl,
+                if_none_match=if_none_match,
+                max_triangles=max_triangles,
+                max_vertices=max_vertices,
             )
+            return _bcif_response(response_bytes, f"{id}-volume_info.bcif")
+        except NotModified:
+            raise
         except Exception as e:
             return JSONResponse({"error": str(e)}, status_code=HTTP_CODE_UNPROCESSABLE_ENTITY)
         finally:
-            pass
\ No newline at end of file
+            pass
+
+    @app.get("/v1/{source}/{id}/meshes_bcif/{segmentation_id}/{time}/{detail_lvl}")
+    async def get_segments_meshes_bcif(source: str, id: str, segmentation_id: str,
+                          time: int,
+                          detail_lvl: int,
+                          segment_ids: Optional[list[int]] = Query(None, description="Segments to return, all segments if not provided"),
+                          max_triangles: Optional[int] = Query(None, description="Use the finest detail level not finer than detail_lvl with at most this number of triangles in all segments"),
+                          max_vertices: Optional[int] = Query(None, description="Use the finest detail level not finer than detail_lvl with at most this number of vertices in all segments"),
+                          if_none_match: Optional[str] = Header(None)):
+        try:
+            response_bytes = await get_segments_meshes_bcif_query(
+                volume_server=volume_server,
+                source=source,
+                id=id,
+                segmentation_id=segmentation_id,
+                time=time,
+                segment_ids=segment_ids,
+                detail_lvl=detail_lvl,
+                if_none_match=if_none_match,
+                max_triangles=max_triangles,
+                max_vertices=max_vertices,
+            )
+        except ValueError as e:
+            return JSONResponse({"error": str(e)}, status_code=HTTP_CODE_UNPROCESSABLE_ENTITY)
+
+        return _bcif_response(response_bytes, f"{id}-meshes.bcif")
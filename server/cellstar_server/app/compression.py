@@ -0,0 +1,295 @@
+import gzip
+import hashlib
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Callable, Optional
+
+import anyio
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+DEFAULT_COMPRESSION_CACHE_SIZE_BYTES = 256 * 1024**2
+# bodies bigger than this are compressed in a worker thread instead of on the event loop
+_THREAD_COMPRESSION_MIN_SIZE = 64 * 1024
+
+
+class _Codec:
+    def __init__(self, compress: Callable[[bytes], bytes], compressor: Callable[[], "_StreamCompressor"]):
+        self.compress = compress
+        self.compressor = compressor
+
+
+class _StreamCompressor:
+    def __init__(self, compress: Callable[[bytes], bytes], flush: Callable[[], bytes], sync: Callable[[], bytes]):
+        self.compress = compress
+        self.flush = flush
+        # emits all data compressed so far without ending the stream
+        self.sync = sync
+
+
+def _gzip_compressor() -> _StreamCompressor:
+    # wbits=31 writes gzip header and trailer
+    c = zlib.compressobj(3, zlib.DEFLATED, 31)
+    return _StreamCompressor(c.compress, c.flush, lambda: c.flush(zlib.Z_SYNC_FLUSH))
+
+
+# NOTE: levels are chosen for speed, default gzip level 9 is very slow
+_CODECS: dict[str, _Codec] = {
+    "gzip": _Codec(lambda data: gzip.compress(data, compresslevel=3, mtime=0), _gzip_compressor),
+}
+
+if brotli is not None:
+
+    def _brotli_compressor() -> _StreamCompressor:
+        c = brotli.Compressor(quality=4)
+        return _StreamCompressor(c.process, c.finish, c.flush)
+
+    _CODECS["br"] = _Codec(lambda data: brotli.compress(data, quality=4), _brotli_compressor)
+
+if zstandard is not None:
+
+    def _zstd_compressor() -> _StreamCompressor:
+        c = zstandard.ZstdCompressor(level=3).compressobj()
+        return _StreamCompressor(c.compress, c.flush, lambda: c.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK))
+
+    _CODECS["zstd"] = _Codec(lambda data: zstandard.ZstdCompressor(level=3).compress(data), _zstd_compressor)
+
+# server preference if client accepts several encodings with the same quality
+_PREFERENCE = ["zstd", "br", "gzip"]
+
+
+def available_encodings() -> list[str]:
+    return [e for e in _PREFERENCE if e in _CODECS]
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """
+    Returns the best available content coding accepted by client (Accept-Encoding), None for identity
+    """
+    qualities: dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        qualities[coding] = q
+
+    best, best_q = None, 0.0
+    for coding in available_encodings():
+        q = qualities.get(coding, qualities.get("*", 0.0))
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+class CompressedVariantCache:
+    """
+    LRU cache of compressed response bodies bounded in bytes, keyed by (ETag or body hash, content coding).
+    Also remembers bodies for which compression does not pay off (stored as None)
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_COMPRESSION_CACHE_SIZE_BYTES):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._variants: OrderedDict[tuple[str, str], Optional[bytes]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple[str, str]) -> tuple[bool, Optional[bytes]]:
+        with self._lock:
+            if key not in self._variants:
+                self.misses += 1
+                return False, None
+            self._variants.move_to_end(key)
+            self.hits += 1
+            return True, self._variants[key]
+
+    def put(self, key: tuple[str, str], body: Optional[bytes]):
+        size = len(body) if body is not None else 0
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._variants.pop(key, None)
+            if previous is not None:
+                self.current_bytes -= len(previous)
+            self._variants[key] = body
+            self.current_bytes += size
+            # NOTE: None markers are tiny but still limited in number
+            while self.current_bytes > self.max_bytes or len(self._variants) > 100_000:
+                _, evicted = self._variants.popitem(last=False)
+                if evicted is not None:
+                    self.current_bytes -= len(evicted)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "max_bytes": self.max_bytes,
+                "current_bytes": self.current_bytes,
+                "variants": len(self._variants),
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+class CompressionMiddleware:
+    """
+    Replacement of GZipMiddleware which negotiates zstd, brotli or gzip (if available) based on Accept-Encoding,
+    reuses compressed variants of identical responses and does not compress responses
+    for which compressed size is not below max_ratio of the original size
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 1000,
+        max_ratio: float = 0.9,
+        cache: Optional[CompressedVariantCache] = None,
+    ) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        self.max_ratio = max_ratio
+        self.cache = cache if cache is not None else CompressedVariantCache()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http":
+            coding = negotiate_encoding(Headers(scope=scope).get("Accept-Encoding", ""))
+            if coding is not None:
+                responder = _CompressionResponder(self, coding)
+                await responder(scope, receive, send)
+                return
+        await self.app(scope, receive, send)
+
+
+class _CompressionResponder:
+    def __init__(self, middleware: CompressionMiddleware, coding: str) -> None:
+        self.middleware = middleware
+        self.app = middleware.app
+        self.coding = coding
+        self.send: Send = _unattached_send
+        self.initial_message: Message = {}
+        self.started = False
+        self.content_encoding_set = False
+        self.compressor: Optional[_StreamCompressor] = None
+        # parts of multipart responses (e.g. progressive levels) are flushed as soon as they are sent
+        self.sync_parts = False
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        self.send = send
+        await self.app(scope, receive, self.send_compressed)
+
+    async def send_compressed(self, message: Message) -> None:
+        message_type = message["type"]
+        if message_type == "http.response.start":
+            # Don't send the initial message until we've determined how to
+            # modify the outgoing headers correctly.
+            self.initial_message = message
+            headers = Headers(raw=self.initial_message["headers"])
+            self.content_encoding_set = "content-encoding" in headers
+            if message.get("status") == 304:
+                # the same (compressed) variant would be sent
+                _weaken_etag(MutableHeaders(raw=self.initial_message["headers"]))
+        elif message_type == "http.response.body" and self.content_encoding_set:
+            if not self.started:
+                self.started = True
+                await self.send(self.initial_message)
+            await self.send(message)
+        elif message_type == "http.response.body" and not self.started:
+            self.started = True
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if len(body) < self.middleware.minimum_size and not more_body:
+                await self.send(self.initial_message)
+                await self.send(message)
+            elif not more_body:
+                compressed = await self._compress_whole(body)
+                if compressed is not None:
+                    headers = MutableHeaders(raw=self.initial_message["headers"])
+                    headers["Content-Encoding"] = self.coding
+                    headers["Content-Length"] = str(len(compressed))
+                    _weaken_etag(headers)
+                    message["body"] = compressed
+                MutableHeaders(raw=self.initial_message["headers"]).add_vary_header("Accept-Encoding")
+                await self.send(self.initial_message)
+                await self.send(message)
+            else:
+                # streamed response, compressed part by part and not cached
+                headers = MutableHeaders(raw=self.initial_message["headers"])
+                headers["Content-Encoding"] = self.coding
+                headers.add_vary_header("Accept-Encoding")
+                del headers["Content-Length"]
+                _weaken_etag(headers)
+
+                self.compressor = _CODECS[self.coding].compressor()
+                self.sync_parts = headers.get("content-type", "").startswith("multipart/")
+                message["body"] = await _run(self.compressor.compress, body)
+                if self.sync_parts:
+                    message["body"] += self.compressor.sync()
+                await self.send(self.initial_message)
+                await self.send(message)
+        elif message_type == "http.response.body":
+            # remaining body of streamed response
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            data = await _run(self.compressor.compress, body)
+            if not more_body:
+                data += self.compressor.flush()
+            elif self.sync_parts:
+                data += self.compressor.sync()
+            message["body"] = data
+            await self.send(message)
+
+    async def _compress_whole(self, body: bytes) -> Optional[bytes]:
+        """
+        Returns compressed body or None if compression does not pay off
+        """
+        headers = Headers(raw=self.initial_message["headers"])
+        etag = headers.get("etag")
+        tag = etag.removeprefix("W/") if etag else hashlib.blake2b(body, digest_size=16).hexdigest()
+        key = (tag, self.coding)
+
+        found, compressed = self.middleware.cache.get(key)
+        if found:
+            return compressed
+
+        compressed = await _run(_CODECS[self.coding].compress, body)
+        if len(compressed) > self.middleware.max_ratio * len(body):
+            compressed = None
+        self.middleware.cache.put(key, compressed)
+        return compressed
+
+
+async def _run(fn: Callable[[bytes], bytes], data: bytes) -> bytes:
+    if len(data) < _THREAD_COMPRESSION_MIN_SIZE:
+        return fn(data)
+    return await anyio.to_thread.run_sync(fn, data)
+
+
+def _weaken_etag(headers: MutableHeaders):
+    # NOTE: compressed body is a different representation, so a strong ETag of the original body
+    # can only be used as a weak one (If-None-Match uses weak comparison, so 304 still works)
+    etag = headers.get("etag")
+    if etag is not None and not etag.startswith("W/"):
+        headers["ETag"] = f"W/{etag}"
+
+
+async def _unattached_send(message: Message):
+    raise RuntimeError("send awaitable not set")  # pragma: no cover
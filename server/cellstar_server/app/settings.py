@@ -1,4 +1,5 @@
 from pathlib import Path
+from typing import Optional
 from pydantic import BaseSettings
 
 class _Settings(BaseSettings):
@@ -8,5 +9,35 @@ class _Settings(BaseSettings):
     DB_PATH: Path = Path('preprocessor/temp/test_db')
     GIT_TAG: str = ''
     GIT_SHA: str = ''
+    # max number of entry stores kept open by the DB
+    MAX_OPEN_FILES: int = 128
+    # max number of parsed metadata/annotations files kept in memory
+    MAX_CACHED_FILES: int = 256
+    # memory budget of the cache of decompressed data chunks
+    CHUNK_CACHE_SIZE_MB: int = 512
+    # 'thread' or 'process' pool for encoding responses, reads always use threads
+    EXECUTOR_KIND: str = 'thread'
+    EXECUTOR_MAX_WORKERS: Optional[int] = None
+    # max number of requests of each kind processed at the same time
+    VOLUME_CONCURRENCY: int = 4
+    SEGMENTATION_CONCURRENCY: int = 4
+    MESH_CONCURRENCY: int = 8
+    # memory budget of the cache of serialized responses, 0 disables the cache
+    RESPONSE_CACHE_SIZE_MB: int = 256
+    # optional on-disk tier of the response cache
+    RESPONSE_CACHE_DIR: Optional[Path] = None
+    RESPONSE_CACHE_DISK_SIZE_MB: int = 4096
+    # volume responses with at least this many voxels are streamed instead of cached, 0 disables streaming
+    STREAMING_MIN_VOXELS: int = 32 * 1024**2
+    # responses are compressed (zstd, br or gzip, by Accept-Encoding) if at least this big
+    COMPRESSION_MIN_SIZE: int = 1000
+    # response is sent uncompressed if compressed size is above this fraction of the original size
+    COMPRESSION_MAX_RATIO: float = 0.9
+    # memory budget of the cache of compressed responses
+    COMPRESSION_CACHE_SIZE_MB: int = 256
+    # warm chunk cache in background for next/previous timeframe and next box of each client
+    PREFETCH_ENABLED: bool = False
+    # max size of decoded chunks prefetched after each request
+    PREFETCH_MAX_MB: int = 64
 
 settings = _Settings()
@@ -1,10 +1,14 @@
+from cellstar_db.file_system.chunk_cache import configure_chunk_cache
 from cellstar_db.file_system.db import FileSystemVolumeServerDB
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.middleware.gzip import GZipMiddleware
 
 import cellstar_server.app.api.v1 as api_v1
+from cellstar_query.core.executor import BlockingTaskExecutor
+from cellstar_query.core.prefetch import Prefetcher
+from cellstar_query.core.response_cache import ResponseCache
 from cellstar_query.core.service import VolumeServerService
+from cellstar_server.app.compression import CompressedVariantCache, CompressionMiddleware
 from cellstar_server.app.settings import settings
 
 print("Server Settings: ", settings.dict())
@@ -28,13 +32,59 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
-app.add_middleware(GZipMiddleware, minimum_size=1000, compresslevel=3)  # Default compresslevel=9 is veeery slow
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=settings.COMPRESSION_MIN_SIZE,
+    max_ratio=settings.COMPRESSION_MAX_RATIO,
+    cache=CompressedVariantCache(max_bytes=settings.COMPRESSION_CACHE_SIZE_MB * 1024**2),
+)
 
 # initialize dependencies
-db = FileSystemVolumeServerDB(folder=settings.DB_PATH)
+configure_chunk_cache(max_bytes=settings.CHUNK_CACHE_SIZE_MB * 1024**2)
+db = FileSystemVolumeServerDB(
+    folder=settings.DB_PATH,
+    max_open_files=settings.MAX_OPEN_FILES,
+    max_cached_files=settings.MAX_CACHED_FILES,
+)
+
+executor = BlockingTaskExecutor(
+    kind=settings.EXECUTOR_KIND,
+    max_workers=settings.EXECUTOR_MAX_WORKERS,
+    concurrency_limits={
+        "volume": settings.VOLUME_CONCURRENCY,
+        "segmentation": settings.SEGMENTATION_CONCURRENCY,
+        "mesh": settings.MESH_CONCURRENCY,
+    },
+)
+
+response_cache = None
+if settings.RESPONSE_CACHE_SIZE_MB > 0:
+    response_cache = ResponseCache(
+        max_bytes=settings.RESPONSE_CACHE_SIZE_MB * 1024**2,
+        disk_path=settings.RESPONSE_CACHE_DIR,
+        max_disk_bytes=settings.RESPONSE_CACHE_DISK_SIZE_MB * 1024**2,
+    )
+
+prefetcher = None
+if settings.PREFETCH_ENABLED:
+    prefetcher = Prefetcher(db, max_bytes=settings.PREFETCH_MAX_MB * 1024**2)
 
 # initialize server
-volume_server = VolumeServerService(db)
+volume_server = VolumeServerService(
+    db,
+    executor=executor,
+    response_cache=response_cache,
+    streaming_min_voxels=settings.STREAMING_MIN_VOXELS or None,
+    prefetcher=prefetcher,
+)
+
+
+@app.on_event("shutdown")
+def shutdown_executor():
+    executor.shutdown()
+    if prefetcher is not None:
+        prefetcher.shutdown()
+
 
 # api_v1.configure_endpoints(app, volume_server)
 api_v1.configure_endpoints(app, volume_server)